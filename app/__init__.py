@@ -15,8 +15,10 @@ def create_app():
     from app.config import Config
     app.config.from_object(Config)
     
-    # Ensure upload folder exists
+    # Ensure upload, word store and preview folders exist
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['WORD_STORE_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['PREVIEW_FOLDER'], exist_ok=True)
     
     # Initialize extensions
     db.init_app(app)
@@ -29,14 +31,48 @@ def create_app():
     from app.routes.auth import auth_bp
     from app.routes.dashboard import dashboard_bp
     from app.routes.reader import reader_bp
+    from app.routes.metrics import metrics_bp
+    from app.routes.search import search_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(reader_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(search_bp)
     
-    # Create database tables
+    # Register CLI commands
+    from app.cli import wordflow_cli
+    app.cli.add_command(wordflow_cli)
+    
+    # Tune SQLite connections; migrations run as a separate deploy step
     with app.app_context():
-        from app.models import user, document, progress
-        db.create_all()
+        from app.utils.sqlite import configure_sqlite
+        from app.migrations import check_schema
+        configure_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
+        check_schema(app)
+    
+    # Time requests, SQL statements and ingestion stages for /metrics
+    from app.utils.metrics import metrics
+    metrics.init_app(app)
+    
+    # Serve Flask-Login's per-request user lookups from memory
+    from app.utils.user_cache import user_cache
+    user_cache.init_app(app)
+    
+    # Size the decoded document cache
+    from app.utils.doc_cache import document_cache
+    document_cache.init_app(app)
+    
+    # Render page previews on demand into the on-disk cache
+    from app.utils.page_previews import preview_cache
+    preview_cache.init_app(app)
+    
+    # Buffer reading progress saves and write them in batches
+    from app.utils.progress_buffer import progress_buffer
+    progress_buffer.init_app(app)
+    
+    # Queue extraction jobs; they run in the ingest worker (or in process with INGEST_IN_WEB)
+    from app.utils.ingest_queue import ingest_queue
+    ingest_queue.init_app(app)
     
     return app
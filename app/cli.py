@@ -0,0 +1,175 @@
+import os
+import signal
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app import db
+from app.models.document import Document
+from app.models.user import User
+from app.migrations import applied_version, latest_version, run_migrations
+from app.utils.reading_stats import rebuild_reading_stats
+from app.utils.search_index import clear_search_index, index_word_store, unindexed_documents
+from app.utils.word_store import migrate_legacy_words, write_word_payloads
+
+wordflow_cli = AppGroup('wordflow', help='WordFlow maintenance commands.')
+
+
+@wordflow_cli.command('migrate-word-store')
+@click.option('--batch-size', default=20, show_default=True, help='Documents converted per transaction.')
+@click.option('--vacuum', is_flag=True, help='Reclaim the space freed in the SQLite database afterwards.')
+def migrate_word_store(batch_size, vacuum):
+    """Move extracted words into word store files and precompress finished documents."""
+    folder = current_app.config['WORD_STORE_FOLDER']
+    converted = 0
+    
+    while True:
+        documents = Document.query.filter(
+            Document.word_store.is_(None),
+            Document.extracted_text.isnot(None)
+        ).limit(batch_size).all()
+        if not documents:
+            break
+        
+        for document in documents:
+            migrate_legacy_words(document, folder)
+            index_word_store(folder, document.word_store, document.word_count, document.page_boundaries)
+        db.session.commit()
+        
+        converted += len(documents)
+        click.echo(f'Converted {converted} documents...')
+        # Release the decoded rows before loading the next batch
+        db.session.expunge_all()
+    
+    # Finished documents also get their precompressed /api/words payloads
+    compressed = 0
+    while True:
+        documents = Document.query.filter(
+            Document.word_store.isnot(None),
+            Document.is_complete.is_(True),
+            Document.words_hash.is_(None)
+        ).limit(batch_size).all()
+        if not documents:
+            break
+        
+        for document in documents:
+            write_word_payloads(document, folder)
+        db.session.commit()
+        compressed += len(documents)
+        db.session.expunge_all()
+    
+    if vacuum:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.exec_driver_sql('VACUUM')
+    
+    click.echo(f'Migrated {converted} documents to the word store.')
+    click.echo(f'Precompressed payloads for {compressed} documents.')
+
+
+@wordflow_cli.command('rebuild-stats')
+def rebuild_stats():
+    """Recompute the reading stats rollups from reading activity history."""
+    replayed = rebuild_reading_stats()
+    db.session.commit()
+    click.echo(f'Rebuilt reading stats from {replayed} activity rows.')
+
+
+@wordflow_cli.command('index-search')
+@click.option('--batch-size', default=20, show_default=True, help='Documents indexed per transaction.')
+@click.option('--rebuild', is_flag=True, help='Drop the whole index and index every document again.')
+def index_search(batch_size, rebuild):
+    """Add documents whose words are not searchable yet to the full-text index."""
+    folder = current_app.config['WORD_STORE_FOLDER']
+    if rebuild:
+        clear_search_index()
+        db.session.commit()
+    
+    indexed = 0
+    last_id = 0
+    while True:
+        documents = unindexed_documents(last_id, batch_size)
+        if not documents:
+            break
+        
+        for document in documents:
+            try:
+                index_word_store(folder, document.word_store, document.word_count, document.page_boundaries)
+            except OSError as e:
+                click.echo(f'Skipped document {document.id}: {e}', err=True)
+        db.session.commit()
+        
+        indexed += len(documents)
+        last_id = documents[-1].id
+        click.echo(f'Indexed {indexed} documents...')
+        db.session.expunge_all()
+    
+    click.echo(f'Indexed {indexed} documents for search.')
+
+
+@wordflow_cli.command('db-upgrade')
+def db_upgrade():
+    """Apply pending schema migrations."""
+    applied = run_migrations()
+    for version, description in applied:
+        click.echo(f'Applied migration {version}: {description}')
+    click.echo(f'Schema is at version {applied_version()}.')
+
+
+@wordflow_cli.command('db-version')
+def db_version():
+    """Show the applied and latest schema versions."""
+    click.echo(f'Applied: {applied_version()}, latest: {latest_version()}')
+
+
+@wordflow_cli.command('ingest-worker')
+def ingest_worker():
+    """Run queued extraction jobs until stopped; start one per deployment."""
+    if not current_app.config['INGEST_QUEUE_ENABLED']:
+        raise click.ClickException('INGEST_QUEUE_ENABLED is off.')
+    # Stop like Ctrl-C so unfinished jobs go back to the queue
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    click.echo(f'Running extraction jobs with {current_app.config["INGEST_WORKERS"]} workers...')
+    current_app.extensions['ingest_queue'].serve()
+    click.echo('Ingest worker stopped.')
+
+
+@wordflow_cli.command('import')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--user', 'email', required=True, help='Email of the account that will own the documents.')
+@click.option('--workers', type=int, default=None, help='Extraction processes (default: all cores).')
+@click.option('--batch-size', default=20, show_default=True, help='Documents inserted per transaction.')
+@click.option('--checkpoint', type=click.Path(dir_okay=False),
+              help='Progress file for resuming (default: .wordflow-import-<user id>.jsonl in DIRECTORY).')
+@click.option('--recursive/--no-recursive', default=True, show_default=True, help='Descend into subdirectories.')
+@click.option('--retry-failed', is_flag=True, help='Try files that failed in an earlier run again.')
+def import_directory(directory, email, workers, batch_size, checkpoint, recursive, retry_failed):
+    """Import every PDF in DIRECTORY for a user, resuming an interrupted run."""
+    from app.utils.bulk_import import BulkImporter
+    
+    user = User.query.filter_by(email=email.strip().lower()).first()
+    if user is None:
+        raise click.ClickException(f'No user with email {email}.')
+    checkpoint = checkpoint or os.path.join(directory, f'.wordflow-import-{user.id}.jsonl')
+    
+    def report(result):
+        if result.status == 'imported':
+            click.echo(f'imported  {result.path}: {result.words:,} words, {result.pages} pages in '
+                       f'{result.seconds:.2f}s ({result.pages / max(result.seconds, 1e-9):.1f} pages/s)')
+        elif result.status == 'failed':
+            click.echo(f'failed    {result.path}: {result.error}', err=True)
+        else:
+            click.echo(f'{result.status:9s} {result.path}')
+    
+    importer = BulkImporter(current_app._get_current_object(), user.id, directory, checkpoint,
+                            workers=workers, batch_size=batch_size, recursive=recursive,
+                            retry_failed=retry_failed, report=report)
+    totals = importer.run()
+    
+    seconds = max(totals['seconds'], 1e-9)
+    click.echo(f'{totals["found"]} PDFs found, {totals["resumed"]} already handled by earlier runs.')
+    click.echo(f'Imported {totals["imported"]}, shared words for {totals["shared"]}, '
+               f'skipped {totals["exists"]} already in the library, {totals["failed"]} failed.')
+    click.echo(f'Extracted {totals["pages"]:,} pages and {totals["words"]:,} words in {seconds:.1f}s with '
+               f'{importer.workers} workers: {totals["pages"] / seconds:.1f} pages/s, '
+               f'{(totals["imported"] + totals["shared"]) / seconds:.2f} files/s, '
+               f'{totals["bytes"] / 1048576 / seconds:.2f} MB/s.')
+    click.echo(f'Checkpoint: {checkpoint}')
@@ -11,14 +11,108 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         f'sqlite:///{os.path.join(BASE_DIR, "wordflow.db")}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'connect_args': {'timeout': 30}  # Seconds the sqlite3 driver waits on a locked database
+    }
+    
+    # Schema upgrades run once per deploy with 'flask wordflow db-upgrade'
+    # (run.py does it for the development server); workers only check the
+    # version. AUTO_MIGRATE=1 applies pending migrations at every startup.
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', '0') == '1'
+    
+    # Applied to every SQLite connection. WAL lets readers run alongside the
+    # single writer; synchronous=NORMAL is safe against app crashes in WAL mode.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL',
+        'busy_timeout': 5000,  # Milliseconds
+        'cache_size': -64000,  # Negative means KiB: 64 MB page cache per connection
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY'
+    }
     
     # File uploads
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max request (single-request uploads and upload chunks)
     ALLOWED_EXTENSIONS = {'pdf'}
     
+    # Chunked, resumable uploads (/api/uploads) for books of any size. Each
+    # chunk is one request, so UPLOAD_CHUNK_SIZE must stay below MAX_CONTENT_LENGTH.
+    # Requests for one upload are serialized with flock on files in
+    # UPLOAD_FOLDER/tmp: POSIX only, on a filesystem shared by all workers.
+    UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE') or 8 * 1024 * 1024)
+    UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE') or 1024 * 1024 * 1024)  # Bytes per file
+    UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL') or 24 * 60 * 60)  # Idle seconds before an upload is dropped
+    
+    # Extracted words (memory-mapped word store files)
+    WORD_STORE_FOLDER = os.path.join(BASE_DIR, 'word_store')
+    
+    # Rendered page previews (/api/preview), cached on disk with LRU eviction
+    PREVIEW_FOLDER = os.path.join(BASE_DIR, 'previews')
+    PREVIEW_CACHE_MAX_BYTES = int(os.environ.get('PREVIEW_CACHE_MAX_BYTES') or 256 * 1024 * 1024)
+    PREVIEW_WIDTH = 360  # Pixels; the height follows the page
+    PREVIEW_QUALITY = 70  # JPEG quality
+    PREVIEW_WORKERS = int(os.environ.get('PREVIEW_WORKERS') or 1)  # Render processes
+    PREVIEW_RENDER_TIMEOUT = 30  # Seconds a request waits for its page to render
+    PREVIEW_PREWARM_BEHIND = 1  # Pages before the requested one rendered in the background
+    PREVIEW_PREWARM_AHEAD = 3  # Pages after it
+    PREVIEW_MAX_AGE = 24 * 60 * 60  # Seconds browsers reuse a preview without revalidating
+    
+    # Process-local cache of decoded documents
+    DOCUMENT_CACHE_MAX_BYTES = int(os.environ.get('DOCUMENT_CACHE_MAX_BYTES') or 64 * 1024 * 1024)
+    
+    # Background ingestion. Web processes queue jobs and one 'flask wordflow
+    # ingest-worker' process runs them; INGEST_IN_WEB=1 dispatches inside the
+    # web process instead (run.py does this for the development server).
+    INGEST_QUEUE_ENABLED = os.environ.get('INGEST_QUEUE_ENABLED', '1') != '0'
+    INGEST_IN_WEB = os.environ.get('INGEST_IN_WEB', '0') == '1'
+    INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS') or max(1, (os.cpu_count() or 2) - 1))
+    INGEST_POLL_INTERVAL = 0.5  # Seconds between dispatcher passes
+    INGEST_JOB_LEASE = 60  # Seconds before a silent running job is requeued
+    INGEST_RESULT_GRACE = 30  # Seconds a finished job waits for page batches still in transit before it is retried
+    INGEST_MAX_ATTEMPTS = 3
+    INGEST_BATCH_PAGES = 5  # Pages persisted per batch once the first page with text is readable
+    
+    # Page-range parallelism within a single document (1 = serial)
+    PDF_EXTRACT_WORKERS = int(os.environ.get('PDF_EXTRACT_WORKERS') or 1)
+    PDF_EXTRACT_CHUNK_PAGES = int(os.environ.get('PDF_EXTRACT_CHUNK_PAGES') or 25)
+    
+    # Write-behind buffering of reading progress saves
+    PROGRESS_BUFFER_ENABLED = os.environ.get('PROGRESS_BUFFER_ENABLED', '1') != '0'
+    PROGRESS_FLUSH_INTERVAL = float(os.environ.get('PROGRESS_FLUSH_INTERVAL') or 5)  # Max seconds of progress a crash can lose
+    PROGRESS_FLUSH_MAX_PENDING = 500  # Flush early once this many documents have unsaved progress
+    
+    # Batched progress events (/api/progress/events)
+    PROGRESS_EVENTS_MAX_BATCH = 1000
+    PROGRESS_SESSION_TTL_DAYS = 7  # Idempotency marks of idle reader sessions are kept this long
+    
+    # Request, SQL and ingestion metrics served on /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Scrapes send "Authorization: Bearer <token>"; unset, /metrics is a 404
+    
+    # Process-local cache of the users Flask-Login loads on every request
+    USER_CACHE_ENABLED = os.environ.get('USER_CACHE_ENABLED', '1') != '0'
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL') or 60)  # Seconds other processes may serve a changed user
+    USER_CACHE_MAX_ENTRIES = 10000
+    
+    # Library
+    LIBRARY_PAGE_SIZE = 24  # Books per library page
+    
+    # Reading activity timeline
+    TIMELINE_PAGE_SIZE = 5  # Entries per dashboard timeline page
+    TIMELINE_PAGE_MAX = 100  # Largest page /api/timeline serves
+    
+    # Full-text search (/api/search)
+    SEARCH_RESULTS_DEFAULT = 20
+    SEARCH_RESULTS_MAX = 100
+    SEARCH_QUERY_MAX_LENGTH = 256
+    
     # Reader settings
     WPM_MIN = 60
     WPM_MAX = 600
     WPM_DEFAULT = 200
     FONT_SIZE_DEFAULT = 48
+    WORDS_WINDOW_DEFAULT = 1000  # Words per /api/words window
+    WORDS_WINDOW_MAX = 5000
+    WORDS_STREAM_MIN_BYTES = 256 * 1024  # Whole-document /api/words bodies this large are streamed
+    WORDS_STREAM_CHUNK_BYTES = 64 * 1024  # Bytes of words copied per streamed chunk
@@ -0,0 +1,254 @@
+"""
+Versioned schema migrations.
+
+Applied versions are recorded in the schema_version table and pending ones
+run in order with 'flask wordflow db-upgrade', once per deploy rather than in
+every worker (or at startup with AUTO_MIGRATE=1). Every
+migration is idempotent, so databases created by the old create_all()
+startup path, at any point in its history, upgrade cleanly.
+"""
+from datetime import datetime
+import sqlalchemy as sa
+from sqlalchemy.exc import IntegrityError
+from app import db
+
+schema_version = sa.Table(
+    'schema_version', sa.MetaData(),
+    sa.Column('version', sa.Integer, primary_key=True),
+    sa.Column('description', sa.String(256), nullable=False),
+    sa.Column('applied_at', sa.DateTime, nullable=False)
+)
+
+MIGRATIONS = []  # (version, description, upgrade function), in version order
+
+LEGACY_BATCH_SIZE = 20  # Documents loaded at a time by data migrations
+
+
+def migration(version, description):
+    """Register an upgrade function as a numbered migration."""
+    def register(upgrade):
+        MIGRATIONS.append((version, description, upgrade))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return upgrade
+    return register
+
+
+def add_missing_columns(model):
+    """
+    Add columns defined on a model but missing from its existing table.
+    
+    db.create_all() only creates missing tables, so databases created before a
+    column was introduced need it added in place before the model can be queried.
+    """
+    inspector = db.inspect(db.session.connection())
+    table = model.__table__
+    if not inspector.has_table(table.name):
+        return []
+    
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=db.engine.dialect)}'
+        default = column.default.arg if column.default is not None and column.default.is_scalar else None
+        if default is not None:
+            ddl += f' NOT NULL DEFAULT {int(default) if isinstance(default, bool) else repr(default)}'
+        db.session.execute(db.text(ddl))
+        added.append(column.name)
+    return added
+
+
+def add_missing_unique_indexes(model):
+    """
+    Back a model's unique constraints with unique indexes on existing tables.
+    
+    SQLite cannot add constraints to a table in place, but a unique index is
+    enough for ON CONFLICT upserts to target.
+    """
+    inspector = db.inspect(db.session.connection())
+    table = model.__table__
+    if not inspector.has_table(table.name):
+        return []
+    
+    existing = {tuple(constraint['column_names']) for constraint in inspector.get_unique_constraints(table.name)}
+    existing |= {tuple(index['column_names']) for index in inspector.get_indexes(table.name) if index['unique']}
+    added = []
+    for constraint in table.constraints:
+        if not isinstance(constraint, db.UniqueConstraint):
+            continue
+        columns = tuple(column.name for column in constraint.columns)
+        if columns in existing:
+            continue
+        db.session.execute(db.text(
+            f'CREATE UNIQUE INDEX {constraint.name} ON {table.name} ({", ".join(columns)})'
+        ))
+        added.append(constraint.name)
+    return added
+
+
+def merge_duplicate_activity():
+    """Fold duplicate (user, document, date) activity rows into the oldest one."""
+    from app.models.activity import ReadingActivity
+    
+    duplicates = db.session.query(
+        ReadingActivity.user_id, ReadingActivity.document_id, ReadingActivity.date,
+        db.func.min(ReadingActivity.id), db.func.sum(ReadingActivity.words_read),
+        db.func.sum(ReadingActivity.minutes_read)
+    ).group_by(ReadingActivity.user_id, ReadingActivity.document_id, ReadingActivity.date)\
+        .having(db.func.count(ReadingActivity.id) > 1).all()
+    
+    for user_id, document_id, day, keep_id, words_read, minutes_read in duplicates:
+        ReadingActivity.query.filter_by(id=keep_id).update({'words_read': words_read, 'minutes_read': minutes_read})
+        ReadingActivity.query.filter(
+            ReadingActivity.user_id == user_id,
+            ReadingActivity.document_id == document_id,
+            ReadingActivity.date == day,
+            ReadingActivity.id != keep_id
+        ).delete(synchronize_session=False)
+    return len(duplicates)
+
+
+def add_missing_indexes(model):
+    """Create indexes declared on a model that its existing table lacks."""
+    table = model.__table__
+    existing = {index['name'] for index in db.inspect(db.session.connection()).get_indexes(table.name)}
+    added = []
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(db.session.connection())
+            added.append(index.name)
+    return added
+
+
+def baseline_models():
+    """
+    Models whose tables make up schema version 1. Frozen: tables added later
+    are created by their own numbered migrations.
+    """
+    from app.models import (
+        User, Document, ReadingProgress, ReadingActivity, IngestJob, ProgressSession,
+        DailyReadingStats, DocumentReadingStats, UserReadingStats
+    )
+    return (User, Document, ReadingProgress, ReadingActivity, IngestJob, ProgressSession,
+            DailyReadingStats, DocumentReadingStats, UserReadingStats)
+
+
+@migration(1, 'Baseline schema')
+def create_baseline():
+    # Fresh databases get the baseline tables; older ones get what they are missing
+    models = baseline_models()
+    db.metadata.create_all(db.session.connection(), tables=[model.__table__ for model in models])
+    for model in models:
+        add_missing_columns(model)
+    
+    # Progress saves upsert one activity row per user, document and day
+    from app.models.activity import ReadingActivity
+    merge_duplicate_activity()
+    add_missing_unique_indexes(ReadingActivity)
+
+
+@migration(2, 'Composite indexes for progress, activity, timeline, library and job lookups')
+def add_composite_indexes():
+    for model in baseline_models():
+        add_missing_indexes(model)
+
+
+@migration(3, 'Full-text search index of extracted words')
+def add_search_index():
+    # Existing documents are indexed by 'flask wordflow index-search', not at startup
+    from app.models.document import Document
+    from app.models.search_source import SearchSource
+    from app.utils.search_index import create_search_table
+    SearchSource.__table__.create(db.session.connection(), checkfirst=True)
+    add_missing_indexes(Document)
+    create_search_table()
+
+
+@migration(4, 'Covering index for the keyset-paginated activity timeline')
+def add_timeline_covering_index():
+    from app.models.activity import ReadingActivity
+    add_missing_indexes(ReadingActivity)
+    # Superseded: the covering index starts with the same columns
+    db.session.execute(db.text('DROP INDEX IF EXISTS ix_reading_activity_user_timeline'))
+
+
+@migration(5, 'Upload sessions for chunked, resumable uploads')
+def add_upload_sessions():
+    from app.models.upload_session import UploadSession
+    UploadSession.__table__.create(db.session.connection(), checkfirst=True)
+
+
+@migration(6, 'Word offset index for documents not moved to the word store')
+def index_legacy_word_offsets():
+    # /api/words only reads; rows stored before the offset index get theirs here
+    from app.models.document import Document
+    from app.utils.pdf_processor import extend_word_offsets, json_to_words
+    last_id = 0
+    while True:
+        documents = Document.query.filter(
+            Document.id > last_id,
+            Document.word_store.is_(None),
+            Document.extracted_text.isnot(None),
+            Document.word_offsets.is_(None),
+            Document.is_complete.is_(True)
+        ).order_by(Document.id).limit(LEGACY_BATCH_SIZE).all()
+        if not documents:
+            break
+        for document in documents:
+            document.word_offsets = extend_word_offsets(None, None, json_to_words(document.extracted_text), 0)
+        db.session.flush()
+        last_id = documents[-1].id
+        # Release the decoded rows before loading the next batch
+        db.session.expunge_all()
+
+
+def applied_version():
+    """Highest migration version recorded in the database (0 if none)."""
+    if not db.inspect(db.engine).has_table(schema_version.name):
+        return 0
+    return db.session.execute(sa.select(sa.func.max(schema_version.c.version))).scalar() or 0
+
+
+def latest_version():
+    return MIGRATIONS[-1][0]
+
+
+def run_migrations():
+    """Apply pending migrations in order; returns [(version, description)] applied."""
+    schema_version.create(db.engine, checkfirst=True)
+    current = applied_version()
+    applied = []
+    
+    for version, description, upgrade in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            upgrade()
+            db.session.execute(schema_version.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+            db.session.commit()
+        except IntegrityError:
+            # Another process recorded this version first; the upgrade is idempotent
+            db.session.rollback()
+            continue
+        applied.append((version, description))
+    return applied
+
+
+def check_schema(app):
+    """
+    Startup check: apply pending migrations if AUTO_MIGRATE is set, otherwise
+    only warn when the database is behind. Costs two queries when current.
+    """
+    current = applied_version()
+    if current >= latest_version():
+        return
+    if app.config['AUTO_MIGRATE']:
+        run_migrations()
+        return
+    app.logger.warning(
+        "Database schema is at version %s, latest is %s; run 'flask wordflow db-upgrade'.",
+        current, latest_version()
+    )
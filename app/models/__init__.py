@@ -1,5 +1,17 @@
 from app.models.user import User
 from app.models.document import Document
 from app.models.progress import ReadingProgress
+from app.models.activity import ReadingActivity
+from app.models.job import IngestJob
+from app.models.progress_session import ProgressSession
+from app.models.daily_stats import DailyReadingStats
+from app.models.document_stats import DocumentReadingStats
+from app.models.user_stats import UserReadingStats
+from app.models.search_source import SearchSource
+from app.models.upload_session import UploadSession
 
-__all__ = ['User', 'Document', 'ReadingProgress']
+__all__ = [
+    'User', 'Document', 'ReadingProgress', 'ReadingActivity', 'IngestJob', 'ProgressSession',
+    'DailyReadingStats', 'DocumentReadingStats', 'UserReadingStats', 'SearchSource',
+    'UploadSession'
+]
@@ -11,9 +11,18 @@ class ReadingActivity(db.Model):
     document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), nullable=False)
     date = db.Column(db.Date, nullable=False, index=True)
     words_read = db.Column(db.Integer, default=0)
-    minutes_read = db.Column(db.Integer, default=0)
+    minutes_read = db.Column(db.Float, default=0)  # Words divided by the reader's WPM
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # One row per user, document and day so saves can be upserted
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'document_id', 'date', name='unique_user_document_date'),
+        # Timeline: a user's activity newest first, keyset by (date, created_at, id). Also
+        # covers the other timeline columns so pages never read table rows
+        db.Index('ix_reading_activity_timeline_covering', 'user_id', 'date', 'created_at', 'id',
+                 'document_id', 'words_read', 'minutes_read'),
+    )
+    
     # Relationships (optional, but good for queries)
     document = db.relationship('Document', backref=db.backref('activities', cascade='all, delete-orphan'))
     
@@ -0,0 +1,15 @@
+from app import db
+
+
+class DailyReadingStats(db.Model):
+    """Rollup of a user's reading per day, updated as activity is recorded."""
+    
+    __tablename__ = 'daily_reading_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    words_read = db.Column(db.Integer, nullable=False, default=0)
+    minutes_read = db.Column(db.Float, nullable=False, default=0.0)  # Words divided by the reader's WPM
+    
+    def __repr__(self):
+        return f'<DailyReadingStats user={self.user_id} date={self.date} words={self.words_read}>'
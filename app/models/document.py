@@ -11,11 +11,25 @@ class Document(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     file_path = db.Column(db.String(512), nullable=False)
     original_name = db.Column(db.String(256), nullable=False)
+    content_sha256 = db.Column(db.String(64), nullable=True, index=True)  # Hash of the uploaded bytes (shared file)
     word_count = db.Column(db.Integer, default=0)
-    extracted_text = db.Column(db.Text, nullable=True)  # Stored as JSON array of words
-    page_boundaries = db.Column(db.Text, nullable=True)  # JSON array of {page, start, end}
+    word_store = db.Column(db.String(64), nullable=True)  # Key of the memory-mapped word store holding the words
+    # Large columns are deferred: only loaded when accessed, never by listing queries
+    extracted_text = db.deferred(db.Column(db.Text, nullable=True))  # Legacy: JSON array of words (rows not yet migrated)
+    word_offsets = db.deferred(db.Column(db.LargeBinary, nullable=True))  # Legacy: sparse uint32 char offsets into extracted_text
+    page_boundaries = db.deferred(db.Column(db.Text, nullable=True))  # JSON array of {page, start, end}
+    is_complete = db.Column(db.Boolean, nullable=False, default=True)  # False while pages are still being extracted
+    words_hash = db.Column(db.String(64), nullable=True)  # SHA-256 of the precompressed full /api/words payload
+    content_version = db.Column(db.Integer, nullable=False, default=1)  # Bumped whenever words or pages change
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Keyset pagination of a user's library, newest first
+        db.Index('ix_documents_user_created', 'user_id', 'created_at', 'id'),
+        # Search hits and shared-file reference counts look documents up by word store
+        db.Index('ix_documents_word_store', 'word_store', 'user_id'),
+    )
+    
     # Relationship to reading progress
     progress = db.relationship('ReadingProgress', backref='document', uselist=False, cascade='all, delete-orphan')
     
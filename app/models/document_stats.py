@@ -0,0 +1,31 @@
+from app import db
+
+
+class DocumentReadingStats(db.Model):
+    """Rollup of a user's reading per document, updated as activity is recorded."""
+    
+    __tablename__ = 'document_reading_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='CASCADE'), primary_key=True)
+    words_read = db.Column(db.Integer, nullable=False, default=0)
+    minutes_read = db.Column(db.Float, nullable=False, default=0.0)
+    days_read = db.Column(db.Integer, nullable=False, default=0)
+    first_read_date = db.Column(db.Date, nullable=True)
+    last_read_date = db.Column(db.Date, nullable=True)
+    
+    document = db.relationship('Document', backref=db.backref('reading_stats', cascade='all, delete-orphan'))
+    
+    def to_dict(self):
+        """Serialize for the stats API."""
+        return {
+            'document_id': self.document_id,
+            'words_read': self.words_read,
+            'minutes_read': round(self.minutes_read, 1),
+            'days_read': self.days_read,
+            'first_read_date': self.first_read_date.isoformat() if self.first_read_date else None,
+            'last_read_date': self.last_read_date.isoformat() if self.last_read_date else None
+        }
+    
+    def __repr__(self):
+        return f'<DocumentReadingStats user={self.user_id} doc={self.document_id} words={self.words_read}>'
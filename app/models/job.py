@@ -0,0 +1,67 @@
+import uuid
+from datetime import datetime
+from app import db
+
+
+class IngestJob(db.Model):
+    """Model for tracking background PDF extraction jobs."""
+
+    __tablename__ = 'ingest_jobs'
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='SET NULL'), nullable=True)
+    file_path = db.Column(db.String(512), nullable=False)
+    original_name = db.Column(db.String(256), nullable=False)
+    content_sha256 = db.Column(db.String(64), nullable=True)
+    status = db.Column(db.String(16), nullable=False, default=STATUS_QUEUED, index=True)
+    attempts = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text, nullable=True)
+    pages_total = db.Column(db.Integer, default=0)
+    pages_processed = db.Column(db.Integer, default=0)
+    words_processed = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # The dispatcher claims the oldest queued jobs first
+        db.Index('ix_ingest_jobs_status_created', 'status', 'created_at'),
+    )
+
+    @property
+    def elapsed_seconds(self):
+        """Seconds spent extracting so far (or in total once finished)."""
+        if not self.started_at:
+            return 0.0
+        end = self.finished_at or datetime.utcnow()
+        return max((end - self.started_at).total_seconds(), 0.0)
+
+    def to_dict(self):
+        """Serialize job state for the status API."""
+        elapsed = self.elapsed_seconds
+        return {
+            'id': self.id,
+            'status': self.status,
+            'original_name': self.original_name,
+            'document_id': self.document_id,
+            'attempts': self.attempts,
+            'error': self.error,
+            'pages_total': self.pages_total,
+            'pages_processed': self.pages_processed,
+            'words_processed': self.words_processed,
+            'elapsed_seconds': round(elapsed, 3),
+            'pages_per_second': round(self.pages_processed / elapsed, 2) if elapsed > 0 else 0.0,
+            'words_per_second': round(self.words_processed / elapsed, 1) if elapsed > 0 else 0.0,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<IngestJob {self.id} {self.status}>'
@@ -18,6 +18,8 @@ class ReadingProgress(db.Model):
     # Unique constraint for user-document pair
     __table_args__ = (
         db.UniqueConstraint('user_id', 'document_id', name='unique_user_document'),
+        # Covers the library join, which only needs the position
+        db.Index('ix_reading_progress_user_document_position', 'user_id', 'document_id', 'last_word_index'),
     )
     
     def __repr__(self):
@@ -0,0 +1,20 @@
+from datetime import datetime
+from app import db
+
+
+class ProgressSession(db.Model):
+    """High-water mark of progress events applied per reader session and document."""
+
+    __tablename__ = 'progress_sessions'
+
+    session_id = db.Column(db.String(64), primary_key=True)  # Random id chosen by the reader page
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    last_seq = db.Column(db.Integer, nullable=False, default=0)  # Highest event sequence number applied
+    last_word_index = db.Column(db.Integer, nullable=False, default=0)  # Position as of last_seq
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    document = db.relationship('Document', backref=db.backref('progress_sessions', cascade='all, delete-orphan'))
+    
+    def __repr__(self):
+        return f'<ProgressSession {self.session_id} doc={self.document_id} seq={self.last_seq}>'
@@ -0,0 +1,22 @@
+from app import db
+
+
+class SearchSource(db.Model):
+    """
+    Full-text search bookkeeping for one word store.
+    
+    Documents with the same content share a word store, so they share its
+    passages in the search_passages FTS5 table. Passage rowids are
+    id * PASSAGE_ROWID_STRIDE + passage number, keeping each source's rows in
+    one rowid range.
+    """
+    
+    __tablename__ = 'search_sources'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    word_store = db.Column(db.String(64), nullable=False, unique=True)
+    words_indexed = db.Column(db.Integer, nullable=False, default=0)  # Words [0, words_indexed) are searchable
+    passages = db.Column(db.Integer, nullable=False, default=0)  # Passages indexed so far
+    
+    def __repr__(self):
+        return f'<SearchSource {self.word_store} words={self.words_indexed}>'
@@ -0,0 +1,46 @@
+import uuid
+from datetime import datetime
+from app import db
+
+
+class UploadSession(db.Model):
+    """Model for a chunked upload; clients resume from received_size."""
+    
+    __tablename__ = 'upload_sessions'
+    
+    STATUS_OPEN = 'open'
+    STATUS_COMPLETE = 'complete'
+    
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    original_name = db.Column(db.String(256), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received_size = db.Column(db.BigInteger, nullable=False, default=0)  # Bytes acknowledged, all checksummed
+    status = db.Column(db.String(16), nullable=False, default=STATUS_OPEN)
+    content_sha256 = db.Column(db.String(64), nullable=True)  # Set once the file is assembled
+    job_id = db.Column(db.String(32), nullable=True)  # Extraction job started for the file
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='SET NULL'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Abandoned sessions are expired by last activity
+        db.Index('ix_upload_sessions_updated', 'updated_at'),
+    )
+    
+    def to_dict(self):
+        """Serialize upload state for the uploads API."""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'original_name': self.original_name,
+            'size': self.total_size,
+            'offset': self.received_size,
+            'job_id': self.job_id,
+            'document_id': self.document_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
+    def __repr__(self):
+        return f'<UploadSession {self.id} {self.received_size}/{self.total_size}>'
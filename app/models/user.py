@@ -33,5 +33,6 @@ class User(UserMixin, db.Model):
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user by ID for Flask-Login."""
-    return User.query.get(int(user_id))
+    """Load user by ID for Flask-Login, from the user cache when possible."""
+    from app.utils.user_cache import user_cache
+    return user_cache.load(int(user_id))
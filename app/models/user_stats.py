@@ -0,0 +1,25 @@
+from datetime import timedelta
+from app import db
+
+
+class UserReadingStats(db.Model):
+    """Running totals and reading streaks for a user, updated as activity is recorded."""
+    
+    __tablename__ = 'user_reading_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_words = db.Column(db.Integer, nullable=False, default=0)
+    total_minutes = db.Column(db.Float, nullable=False, default=0.0)
+    days_read = db.Column(db.Integer, nullable=False, default=0)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)  # Consecutive days ending at last_read_date
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    last_read_date = db.Column(db.Date, nullable=True)
+    
+    def active_streak(self, today):
+        """The current streak, or 0 if it was broken before yesterday."""
+        if self.last_read_date is None or self.last_read_date < today - timedelta(days=1):
+            return 0
+        return self.current_streak
+    
+    def __repr__(self):
+        return f'<UserReadingStats user={self.user_id} streak={self.current_streak}>'
@@ -1,12 +1,25 @@
-import os
-import uuid
+import re
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from app import db
 from app.models.document import Document
-from app.models.progress import ReadingProgress
-from app.utils.pdf_processor import extract_text_from_pdf, words_to_json, page_boundaries_to_json
+from app.models.job import IngestJob
+from app.models.upload_session import UploadSession
+from app.utils.ingest_queue import ingest_queue
+from app.utils.blob_store import (
+    find_extracted_document, release_document_files, save_upload_blob
+)
+from app.utils.chunked_upload import (
+    OffsetMismatch, assemble_upload, create_upload_session, delete_upload_session,
+    expire_upload_sessions, locked_upload, remove_upload_lock, write_chunk
+)
+from app.utils.library import library_page, library_stats
+from app.utils.pdf_processor import json_to_page_boundaries
+from app.utils.reading_stats import reading_summary
+from app.utils.timeline import timeline_page
+from app.utils.word_store import write_word_payloads
+from app.utils.doc_cache import document_cache
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -33,26 +46,18 @@ def dashboard():
         
     user_name = current_user.name if current_user.name else current_user.email.split('@')[0]
     
-    # Fetch reading activity for timeline with pagination
-    from app.models.activity import ReadingActivity
+    # Fetch reading activity for the timeline, one keyset page at a time
     from itertools import groupby
     
-    page = request.args.get('page', 1, type=int)
-    per_page = 5
-    
-    pagination = ReadingActivity.query.filter_by(user_id=current_user.id)\
-        .join(Document)\
-        .order_by(ReadingActivity.date.desc(), ReadingActivity.created_at.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
-        
-    activities = pagination.items
+    cursor = request.args.get('after')
+    activities, next_cursor = timeline_page(current_user.id, current_app.config['TIMELINE_PAGE_SIZE'], cursor)
         
     # Group by date
     timeline = []
     today = date.today()
     yesterday = today - timedelta(days=1)
     
-    for activity_date, group in groupby(activities, key=lambda x: x.date):
+    for activity_date, group in groupby(activities, key=lambda x: x['date']):
         if activity_date == today:
             date_label = "Today"
         elif activity_date == yesterday:
@@ -67,7 +72,8 @@ def dashboard():
     
     return render_template('dashboard.html', 
                          timeline=timeline, 
-                         pagination=pagination,
+                         next_cursor=next_cursor,
+                         is_first_page=not cursor,
                          greeting=greeting, 
                          user_name=user_name)
 
@@ -76,23 +82,59 @@ def dashboard():
 @login_required
 def library():
     """Display user's library of uploaded books."""
-    documents = Document.query.filter_by(user_id=current_user.id).order_by(Document.created_at.desc()).all()
+    cursor = request.args.get('after')
+    documents, next_cursor = library_page(current_user.id, current_app.config['LIBRARY_PAGE_SIZE'], cursor)
+    stats = library_stats(current_user.id)
+    
+    return render_template('library.html',
+                           documents=documents,
+                           stats=stats,
+                           next_cursor=next_cursor,
+                           is_first_page=not cursor)
+
+
+def ingest_upload(content_sha256, file_path, original_name, commit=True):
+    """
+    Make an uploaded blob readable for the current user.
     
-    # Get progress for each document
-    docs_with_progress = []
-    for doc in documents:
-        progress = ReadingProgress.query.filter_by(
+    Returns (document, None) when a finished document with the same content
+    can share its words, otherwise (None, job) for a queued extraction job.
+    Without commit, the caller commits.
+    """
+    # Same content already extracted: share its words instead of extracting again
+    source = find_extracted_document(content_sha256)
+    if source:
+        document = Document(
             user_id=current_user.id,
-            document_id=doc.id
-        ).first()
-        
-        docs_with_progress.append({
-            'document': doc,
-            'progress': progress.last_word_index if progress else 0,
-            'percentage': round((progress.last_word_index / doc.word_count * 100) if progress and doc.word_count > 0 else 0, 1)
-        })
+            file_path=file_path,
+            original_name=original_name,
+            content_sha256=content_sha256,
+            word_count=source.word_count,
+            word_store=source.word_store,
+            page_boundaries=source.page_boundaries,
+            words_hash=source.words_hash,
+            is_complete=True
+        )
+        if source.original_name != original_name or not source.words_hash:
+            # The payload carries the document name, so it cannot be shared
+            write_word_payloads(document, current_app.config['WORD_STORE_FOLDER'])
+        db.session.add(document)
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+        return document, None
     
-    return render_template('library.html', documents=docs_with_progress)
+    # Hand extraction to the background queue; the document goes live when it finishes
+    return None, ingest_queue.submit(current_user.id, file_path, original_name, content_sha256, commit=commit)
+
+
+def upload_message(document, original_name):
+    """Status line shown once an upload is accepted."""
+    if document:
+        page_count = len(json_to_page_boundaries(document.page_boundaries))
+        return f'Successfully uploaded "{original_name}" ({document.word_count} words, {page_count} pages).'
+    return f'Uploaded "{original_name}". Extracting text in the background...'
 
 
 @dashboard_bp.route('/upload', methods=['POST'])
@@ -120,45 +162,34 @@ def upload():
         return redirect(url_for('dashboard.dashboard'))
     
     try:
-        # Create user directory
-        user_upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], str(current_user.id))
-        os.makedirs(user_upload_dir, exist_ok=True)
-        
-        # Generate unique filename
         original_name = secure_filename(file.filename)
-        unique_name = f"{uuid.uuid4().hex}_{original_name}"
-        file_path = os.path.join(user_upload_dir, unique_name)
-        
-        # Save file
-        file.save(file_path)
         
-        # Extract text from PDF (now also returns page boundaries)
-        words, word_count, page_boundaries = extract_text_from_pdf(file_path)
+        # Save file under its content hash; identical uploads share one copy
+        content_sha256, file_path = save_upload_blob(file.stream, current_app.config['UPLOAD_FOLDER'])
         
-        if word_count == 0:
-            os.remove(file_path)
+        document, job = ingest_upload(content_sha256, file_path, original_name)
+        message = upload_message(document, original_name)
+        if document:
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                return jsonify({'error': 'PDF appears to be empty or contains no readable text.'}), 400
-            flash('PDF appears to be empty or contains no readable text.', 'warning')
-            return redirect(url_for('dashboard.dashboard'))
-        
-        # Create document record with page boundaries
-        document = Document(
-            user_id=current_user.id,
-            file_path=file_path,
-            original_name=original_name,
-            word_count=word_count,
-            extracted_text=words_to_json(words),
-            page_boundaries=page_boundaries_to_json(page_boundaries)
-        )
-        db.session.add(document)
-        db.session.commit()
+                return jsonify({
+                    'success': True,
+                    'message': message,
+                    'document_id': document.id
+                })
+            
+            flash(message, 'success')
+            return redirect(url_for('dashboard.library'))
         
-        message = f'Successfully uploaded "{original_name}" ({word_count} words, {len(page_boundaries)} pages).'
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return jsonify({'success': True, 'message': message})
+            return jsonify({
+                'success': True,
+                'message': message,
+                'job_id': job.id,
+                'status_url': url_for('dashboard.job_status', job_id=job.id)
+            }), 202
             
         flash(message, 'success')
+        return redirect(url_for('dashboard.library'))
     
     except ValueError as e:
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -173,6 +204,179 @@ def upload():
     return redirect(url_for('dashboard.dashboard'))
 
 
+def upload_session_json(session):
+    """Upload state plus what the client needs to send the next chunk or follow extraction."""
+    data = session.to_dict()
+    data['chunk_size'] = current_app.config['UPLOAD_CHUNK_SIZE']
+    data['upload_url'] = url_for('dashboard.upload_chunk', upload_id=session.id)
+    if session.job_id:
+        data['status_url'] = url_for('dashboard.job_status', job_id=session.job_id)
+    return data
+
+
+@dashboard_bp.route('/api/uploads', methods=['POST'])
+@login_required
+def create_upload():
+    """
+    Start a chunked upload from {"filename", "size"}.
+    
+    The client then PUTs the file in order, one chunk per request, to
+    upload_url?offset=<offset> with an X-Chunk-SHA256 header holding the
+    chunk's hex SHA-256. After a dropped connection it GETs the upload and
+    resumes from the returned offset.
+    """
+    data = request.get_json(silent=True) or {}
+    filename = str(data.get('filename') or '')
+    size = data.get('size')
+    
+    if not filename or not allowed_file(filename):
+        return jsonify({'error': 'Only PDF files are allowed.'}), 400
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        return jsonify({'error': 'File size must be a positive number of bytes.'}), 400
+    if size > current_app.config['UPLOAD_MAX_SIZE']:
+        return jsonify({'error': 'File is too large.'}), 413
+    
+    folder = current_app.config['UPLOAD_FOLDER']
+    expire_upload_sessions(folder, current_app.config['UPLOAD_SESSION_TTL'])
+    session = create_upload_session(current_user.id, secure_filename(filename), size)
+    db.session.commit()
+    
+    return jsonify(upload_session_json(session)), 201
+
+
+@dashboard_bp.route('/api/uploads/<upload_id>')
+@login_required
+def upload_status(upload_id):
+    """Report how far a chunked upload got, and its extraction job once complete."""
+    session = UploadSession.query.filter_by(id=upload_id, user_id=current_user.id).first()
+    
+    if not session:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    return jsonify(upload_session_json(session))
+
+
+@dashboard_bp.route('/api/uploads/<upload_id>', methods=['PUT'])
+@login_required
+def upload_chunk(upload_id):
+    """
+    Append one chunk of a chunked upload, streamed from the request body.
+    
+    Answers 409 with the acknowledged offset if the chunk does not start
+    there. The request that completes the file moves it into the blob store
+    and starts extraction (202 with status_url, or 200 with document_id
+    when the content was already extracted); repeating it is harmless.
+    """
+    session = UploadSession.query.filter_by(id=upload_id, user_id=current_user.id).first()
+    
+    if not session:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    folder = current_app.config['UPLOAD_FOLDER']
+    if session.status == UploadSession.STATUS_OPEN and session.received_size < session.total_size:
+        offset = request.args.get('offset', type=int)
+        checksum = request.headers.get('X-Chunk-SHA256', '')
+        if offset is None or request.content_length is None:
+            return jsonify({'error': 'Send the chunk offset and Content-Length.'}), 400
+        if not re.fullmatch(r'[0-9a-fA-F]{64}', checksum):
+            return jsonify({'error': 'Send the hex SHA-256 of the chunk in X-Chunk-SHA256.'}), 400
+        
+        try:
+            write_chunk(session, folder, request.stream, offset, request.content_length, checksum)
+        except OffsetMismatch as e:
+            return jsonify({'error': str(e), 'offset': e.offset}), 409
+        except ValueError as e:
+            return jsonify({'error': str(e), 'offset': session.received_size}), 400
+        
+        if session.received_size < session.total_size:
+            return jsonify(upload_session_json(session))
+    
+    if session.status == UploadSession.STATUS_OPEN:
+        try:
+            with locked_upload(session, folder) as partial:
+                # A repeated final request may have finished it while we waited
+                if partial is not None:
+                    content_sha256, file_path = assemble_upload(session, folder)
+                    # Completion, document and job are committed together, so
+                    # no request ever sees a complete upload without them
+                    document, job = ingest_upload(content_sha256, file_path, session.original_name, commit=False)
+                    session.document_id = document.id if document else None
+                    session.job_id = job.id if job else None
+                    db.session.commit()
+                    remove_upload_lock(session, folder)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Upload error: {str(e)}")
+            return jsonify({'error': 'An error occurred while processing the file.'}), 500
+    
+    document = db.session.get(Document, session.document_id) if session.document_id else None
+    data = upload_session_json(session)
+    data['success'] = True
+    data['message'] = upload_message(document, session.original_name)
+    return jsonify(data), 202 if session.job_id else 200
+
+
+@dashboard_bp.route('/api/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def cancel_upload(upload_id):
+    """Abandon a chunked upload and free its partial file."""
+    session = UploadSession.query.filter_by(id=upload_id, user_id=current_user.id).first()
+    
+    if not session:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    delete_upload_session(session, current_app.config['UPLOAD_FOLDER'])
+    db.session.commit()
+    return jsonify({'success': True})
+
+
+@dashboard_bp.route('/api/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """Report the state of a background extraction job."""
+    job = IngestJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job.to_dict())
+
+
+@dashboard_bp.route('/api/stats')
+@login_required
+def stats():
+    """Reading totals, streaks and the last seven days, served from the rollups."""
+    return jsonify(reading_summary(current_user.id))
+
+
+@dashboard_bp.route('/api/timeline')
+@login_required
+def activity_timeline():
+    """Reading activity newest first; pass next_cursor back as ?after= for the next page."""
+    limit = request.args.get('limit', current_app.config['TIMELINE_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, current_app.config['TIMELINE_PAGE_MAX']))
+    entries, next_cursor = timeline_page(current_user.id, limit, request.args.get('after'))
+    
+    for entry in entries:
+        entry['date'] = entry['date'].isoformat()
+    return jsonify({'entries': entries, 'next_cursor': next_cursor})
+
+
+@dashboard_bp.route('/api/stats/documents/<int:doc_id>')
+@login_required
+def document_stats(doc_id):
+    """Reading totals for one document."""
+    from app.models.document_stats import DocumentReadingStats
+    
+    if not db.session.query(Document.id).filter_by(id=doc_id, user_id=current_user.id).first():
+        return jsonify({'error': 'Document not found'}), 404
+    
+    stats = db.session.get(DocumentReadingStats, (current_user.id, doc_id))
+    if not stats:
+        stats = DocumentReadingStats(document_id=doc_id, words_read=0, minutes_read=0.0, days_read=0)
+    return jsonify(stats.to_dict())
+
+
 @dashboard_bp.route('/document/<int:doc_id>', methods=['DELETE'])
 @login_required
 def delete_document(doc_id):
@@ -183,13 +387,16 @@ def delete_document(doc_id):
         return jsonify({'error': 'Document not found'}), 404
     
     try:
-        # Delete file from disk
-        if os.path.exists(document.file_path):
-            os.remove(document.file_path)
+        shared_files = (document.file_path, document.word_store, document.words_hash)
         
         # Delete from database
         db.session.delete(document)
         db.session.commit()
+        document_cache.invalidate(doc_id)
+        
+        # Delete file and extracted words from disk unless another document shares them
+        release_document_files(current_app.config['WORD_STORE_FOLDER'], *shared_files)
+        db.session.commit()
         
         return jsonify({'success': True, 'message': 'Document deleted'})
     
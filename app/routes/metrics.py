@@ -0,0 +1,17 @@
+import hmac
+from flask import Blueprint, Response, current_app, request
+from app.utils.metrics import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics')
+def expose_metrics():
+    """Prometheus scrape endpoint; hidden unless METRICS_TOKEN is set, then requires it as a bearer token."""
+    token = current_app.config['METRICS_TOKEN']
+    if not token:
+        return Response('Not Found\n', status=404, mimetype='text/plain')
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    
+    return Response(metrics.expose(), mimetype='text/plain; version=0.0.4; charset=utf-8')
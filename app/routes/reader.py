@@ -1,9 +1,23 @@
-from flask import Blueprint, render_template, jsonify, request, current_app
+import json
+import os
+from concurrent.futures import TimeoutError as RenderTimeout
+from flask import Blueprint, render_template, jsonify, request, current_app, send_file
 from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
 from app import db
 from app.models.document import Document
 from app.models.progress import ReadingProgress
-from app.utils.pdf_processor import json_to_words, json_to_page_boundaries
+from app.utils.pdf_processor import (
+    json_to_words, word_window_span, json_fragment_to_words
+)
+from app.utils.word_store import (
+    WORDS_PAYLOAD_PREFIX, WordStore, encode_words_payload, iter_words_payload, word_payload_paths,
+    words_payload_suffix
+)
+from app.utils.doc_cache import document_cache
+from app.utils.page_previews import PageNotFound, preview_cache
+from app.utils.progress_buffer import progress_buffer
+from app.utils.progress_events import apply_progress_events, parse_progress_event
 
 reader_bp = Blueprint('reader', __name__)
 
@@ -34,6 +48,15 @@ def read(doc_id):
         db.session.add(progress)
         db.session.commit()
     
+    # Show saves that are still buffered (not committed; the session is discarded)
+    for field, value in progress_buffer.pending(current_user.id, doc_id).items():
+        setattr(progress, field, value)
+    
+    # Opened from a search hit: start at the matched word instead
+    word = request.args.get('word', type=int)
+    if word is not None:
+        progress.last_word_index = max(0, min(word, max(document.word_count - 1, 0)))
+    
     return render_template('reader.html', 
                            document=document, 
                            progress=progress,
@@ -41,24 +64,237 @@ def read(doc_id):
                            wpm_max=current_app.config['WPM_MAX'])
 
 
+def read_word_window(document, start, stop):
+    """
+    Read words [start, stop) of a document as the body of a JSON array.
+    
+    Word-store documents are sliced straight out of the memory-mapped store
+    without decoding. Legacy rows that still hold extracted_text use the sparse
+    offset index to cut just the needed span out in SQL. Read-only: the index
+    of older rows is built by 'flask wordflow db-upgrade'.
+    """
+    if stop <= start:
+        return b''
+    
+    if document.word_store:
+        with WordStore(current_app.config['WORD_STORE_FOLDER'], document.word_store) as store:
+            return store.json_body(start, stop)
+    
+    if not document.word_offsets:
+        # Not indexed yet (still extracting, or the migration has not run): decode it all
+        words = json_to_words(document.extracted_text)
+        return json.dumps(words[start:stop])[1:-1].encode('utf-8')
+    
+    text_length = db.session.query(db.func.length(Document.extracted_text))\
+        .filter_by(id=document.id).scalar()
+    char_start, char_end, skip = word_window_span(document.word_offsets, text_length, start, stop)
+    fragment = db.session.query(
+        db.func.substr(Document.extracted_text, char_start + 1, char_end - char_start)
+    ).filter_by(id=document.id).scalar()
+    
+    words = json_fragment_to_words(fragment, skip, stop - start)
+    return json.dumps(words)[1:-1].encode('utf-8')
+
+
+def words_response(words_body, **fields):
+    """Build a JSON response whose "words" array is the pre-encoded words_body."""
+    return current_app.response_class(encode_words_payload(words_body, **fields), mimetype='application/json')
+
+
+def whole_document_response(document, **fields):
+    """
+    Build the response for all of a document's words.
+    
+    Large word-store documents are streamed from the memory-mapped store in
+    WORDS_STREAM_CHUNK_BYTES slices, so a request holds one slice at a time
+    instead of the whole JSON text; the exact Content-Length is still sent.
+    """
+    if document.word_store:
+        store = WordStore(current_app.config['WORD_STORE_FOLDER'], document.word_store)
+        body_length = store.json_body_length(0, document.word_count)
+        if body_length >= current_app.config['WORDS_STREAM_MIN_BYTES']:
+            suffix = words_payload_suffix(**fields)
+            response = current_app.response_class(
+                iter_words_payload(store, 0, document.word_count, suffix,
+                                   current_app.config['WORDS_STREAM_CHUNK_BYTES']),
+                mimetype='application/json'
+            )
+            response.content_length = len(WORDS_PAYLOAD_PREFIX) + body_length + len(suffix)
+            # In case the body is never iterated (HEAD requests, errors)
+            response.call_on_close(store.close)
+            return response
+        store.close()
+    
+    return words_response(read_word_window(document, 0, document.word_count), **fields)
+
+
+def revalidated(response, etag):
+    """Attach a strong ETag and make the client revalidate before reusing a cached copy."""
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag):
+    return revalidated(current_app.response_class(status=304), etag)
+
+
+def full_words_response(document):
+    """
+    Serve a finished document's whole payload as written at ingest time.
+    
+    The best precompressed encoding the client accepts is sent from disk as is;
+    each encoding gets its own strong ETag derived from the payload's SHA-256.
+    """
+    coding, path = None, None
+    for candidate, candidate_path in word_payload_paths(
+            current_app.config['WORD_STORE_FOLDER'], document.words_hash).items():
+        if request.accept_encodings[candidate] and os.path.exists(candidate_path):
+            coding, path = candidate, candidate_path
+            break
+    
+    etag = f'{document.words_hash}-{coding}' if coding else document.words_hash
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
+    
+    if coding:
+        response = send_file(path, mimetype='application/json', conditional=False, etag=False)
+        response.headers['Content-Encoding'] = coding
+    else:
+        response = whole_document_response(
+            document,
+            total=document.word_count,
+            document_name=document.original_name,
+            pages=document_cache.get(document).page_boundaries_json,
+            complete=True
+        )
+    return revalidated(response, etag)
+
+
 @reader_bp.route('/api/words/<int:doc_id>')
 @login_required
 def get_words(doc_id):
-    """Get all words for a document with page boundaries."""
+    """
+    Get words for a document with page boundaries.
+    
+    Without query arguments the whole document is returned, streamed from the
+    word store when it is large. With ?start=&count= (or ?page= to seek to
+    the first word of a PDF page) only that window is returned; add
+    ?include_pages=1 to also receive the page boundaries.
+    
+    Page boundaries are decoded once per document version and served from the
+    process-local document cache; the deferred column is only loaded on a miss.
+    """
     document = Document.query.filter_by(id=doc_id, user_id=current_user.id).first()
     
     if not document:
         return jsonify({'error': 'Document not found'}), 404
     
-    words = json_to_words(document.extracted_text)
-    page_boundaries = json_to_page_boundaries(document.page_boundaries)
+    windowed = 'start' in request.args or 'page' in request.args
+    # Finished documents never change, so their payloads can be validated by hash
+    cacheable = document.is_complete and document.words_hash is not None
     
-    return jsonify({
-        'words': words,
-        'total': len(words),
+    if not windowed:
+        if cacheable:
+            return full_words_response(document)
+        return whole_document_response(
+            document,
+            total=document.word_count,
+            document_name=document.original_name,
+            pages=document_cache.get(document).page_boundaries_json,  # Actual PDF page boundaries
+            complete=document.is_complete  # False while later pages are still being extracted
+        )
+    
+    decoded = None
+    if 'page' in request.args or request.args.get('include_pages'):
+        decoded = document_cache.get(document)
+    page_boundaries = decoded.page_boundaries if decoded else None
+    
+    if 'page' in request.args:
+        page = request.args.get('page', 1, type=int)
+        if not page_boundaries or not 1 <= page <= len(page_boundaries):
+            return jsonify({'error': 'Page not found'}), 404
+        start = page_boundaries[page - 1]['start']
+    else:
+        start = request.args.get('start', 0, type=int)
+    
+    count = request.args.get('count', current_app.config['WORDS_WINDOW_DEFAULT'], type=int)
+    count = max(0, min(count, current_app.config['WORDS_WINDOW_MAX']))
+    start = max(0, min(start, document.word_count))
+    stop = min(start + count, document.word_count)
+    
+    etag = None
+    if cacheable:
+        etag = f'{document.words_hash}-{start}-{stop}-{int(bool(request.args.get("include_pages")))}'
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+    
+    fields = {
+        'start': start,
+        'total': document.word_count,
         'document_name': document.original_name,
-        'pages': page_boundaries  # Actual PDF page boundaries
-    })
+        'complete': document.is_complete
+    }
+    if request.args.get('include_pages'):
+        fields['pages'] = decoded.page_boundaries_json
+    
+    response = words_response(read_word_window(document, start, stop), **fields)
+    return revalidated(response, etag) if etag else response
+
+
+@reader_bp.route('/api/preview/<int:doc_id>/<int:page>')
+@login_required
+def page_preview(doc_id, page):
+    """
+    Rendered JPEG of a PDF page (1-based), downscaled to PREVIEW_WIDTH.
+    
+    Rendered on first request into the on-disk preview cache; the pages
+    around it are rendered in the background so turning pages hits the
+    cache. The ETag is derived from the upload's content hash.
+    """
+    document = Document.query.filter_by(id=doc_id, user_id=current_user.id).first()
+    
+    if not document:
+        return jsonify({'error': 'Document not found'}), 404
+    
+    # Extraction knows the page count once it is done; before that pdfium checks it
+    if page < 1 or (document.is_complete and page > len(document_cache.get(document).page_boundaries)):
+        return jsonify({'error': 'Page not found'}), 404
+    
+    etag = preview_cache.etag(document, page)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        try:
+            data = preview_cache.get(document, page)
+        except PageNotFound:
+            return jsonify({'error': 'Page not found'}), 404
+        except RenderTimeout:
+            return jsonify({'error': 'The page is still rendering, retry shortly'}), 503
+        except Exception as e:
+            current_app.logger.error(f"Preview error for document {doc_id} page {page}: {str(e)}")
+            return jsonify({'error': 'Could not render the page'}), 500
+        response = current_app.response_class(data, mimetype='image/jpeg')
+    
+    preview_cache.prewarm(document, [
+        number for number in range(page - current_app.config['PREVIEW_PREWARM_BEHIND'],
+                                   page + current_app.config['PREVIEW_PREWARM_AHEAD'] + 1)
+        if number >= 1 and number != page
+    ])
+    
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config['PREVIEW_MAX_AGE']
+    return response
+
+
+@reader_bp.route('/api/cache/stats')
+@login_required
+def cache_stats():
+    """Report decoded document cache counters for this process."""
+    return jsonify(document_cache.stats())
 
 
 @reader_bp.route('/api/progress/<int:doc_id>', methods=['GET'])
@@ -70,83 +306,96 @@ def get_progress(doc_id):
         document_id=doc_id
     ).first()
     
-    if not progress:
-        return jsonify({
-            'last_word_index': 0,
-            'wpm': current_app.config['WPM_DEFAULT'],
-            'font_size': current_app.config['FONT_SIZE_DEFAULT']
-        })
+    fields = {
+        'last_word_index': progress.last_word_index if progress else 0,
+        'wpm': progress.wpm if progress else current_app.config['WPM_DEFAULT'],
+        'font_size': progress.font_size if progress else current_app.config['FONT_SIZE_DEFAULT']
+    }
+    # Saves still in the write-behind buffer are newer than the stored row
+    fields.update(progress_buffer.pending(current_user.id, doc_id))
     
-    return jsonify({
-        'last_word_index': progress.last_word_index,
-        'wpm': progress.wpm,
-        'font_size': progress.font_size
-    })
+    return jsonify(fields)
 
 
 @reader_bp.route('/api/progress/<int:doc_id>', methods=['POST'])
 @login_required
 def save_progress(doc_id):
-    """Save reading progress for a document."""
-    document = Document.query.filter_by(id=doc_id, user_id=current_user.id).first()
+    """
+    Save reading progress for a document.
     
-    if not document:
+    The save is coalesced in the write-behind progress buffer, which writes the
+    latest position and the words read per day in periodic batches. The reader
+    sends /api/progress/events batches instead; this serves older clients.
+    """
+    owned = db.session.query(Document.id).filter_by(id=doc_id, user_id=current_user.id).first()
+    
+    if not owned:
         return jsonify({'error': 'Document not found'}), 404
     
     data = request.get_json()
     
-    progress = ReadingProgress.query.filter_by(
-        user_id=current_user.id,
-        document_id=doc_id
-    ).first()
+    wpm = None
+    if 'wpm' in data:
+        wpm = max(current_app.config['WPM_MIN'], 
+                  min(current_app.config['WPM_MAX'], int(data['wpm'])))
     
-    if not progress:
-        progress = ReadingProgress(
-            user_id=current_user.id,
-            document_id=doc_id
-        )
-        db.session.add(progress)
+    progress_buffer.record(
+        current_user.id,
+        doc_id,
+        last_word_index=int(data['last_word_index']) if 'last_word_index' in data else None,
+        wpm=wpm,
+        font_size=int(data['font_size']) if 'font_size' in data else None
+    )
+    
+    return jsonify({'success': True})
+
+
+@reader_bp.route('/api/progress/events', methods=['POST'])
+@login_required
+def save_progress_events():
+    """
+    Apply a batch of timestamped progress events in one transaction.
     
-    # Log activity for history timeline
-    from datetime import date
-    from app.models.activity import ReadingActivity
+    Body: {"session": "<reader session id>", "events": [{"seq", "document_id",
+    "t", "last_word_index", "wpm", "font_size"}, ...]}. Sequence numbers
+    increase per session, which makes retried or late batches idempotent.
+    The body is parsed whatever its Content-Type so navigator.sendBeacon
+    payloads are accepted.
+    """
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('events'), list):
+        return jsonify({'error': 'Expected a JSON object with an events list'}), 400
     
-    today = date.today()
-    activity = ReadingActivity.query.filter_by(
-        user_id=current_user.id,
-        document_id=doc_id,
-        date=today
-    ).first()
+    session_id = data.get('session')
+    if not isinstance(session_id, str) or not 0 < len(session_id) <= 64:
+        return jsonify({'error': 'Missing or invalid session id'}), 400
     
-    # Calculate words read delta
-    previous_index = progress.last_word_index
-    new_index = int(data.get('last_word_index', previous_index))
-    words_delta = max(0, new_index - previous_index)
+    if len(data['events']) > current_app.config['PROGRESS_EVENTS_MAX_BATCH']:
+        return jsonify({'error': 'Too many events in one batch'}), 413
     
-    # Update progress fields
-    if 'last_word_index' in data:
-        progress.last_word_index = int(data['last_word_index'])
-    if 'wpm' in data:
-        progress.wpm = max(current_app.config['WPM_MIN'], 
-                          min(current_app.config['WPM_MAX'], int(data['wpm'])))
-    if 'font_size' in data:
-        progress.font_size = int(data['font_size'])
-        
-    # Update or create activity record
-    if words_delta > 0:
-        if activity:
-            activity.words_read += words_delta
-            # Simple assumption: 1 word at avg speed ~ time. 
-            # Better to count words/wpm but for MVP words is key.
-        else:
-            activity = ReadingActivity(
-                user_id=current_user.id,
-                document_id=doc_id,
-                date=today,
-                words_read=words_delta
-            )
-            db.session.add(activity)
+    events = []
+    for raw in data['events']:
+        event = parse_progress_event(raw, current_app.config['WPM_MIN'], current_app.config['WPM_MAX']) \
+            if isinstance(raw, dict) else None
+        if event is not None:
+            events.append(event)
     
-    db.session.commit()
+    try:
+        applied, ignored = apply_progress_events(
+            current_user.id,
+            session_id,
+            events,
+            current_app.config['WPM_DEFAULT'],
+            current_app.config['FONT_SIZE_DEFAULT'],
+            current_app.config['PROGRESS_SESSION_TTL_DAYS']
+        )
+    except IntegrityError:
+        # A concurrent batch from the same session got there first; resending is safe
+        db.session.rollback()
+        return jsonify({'error': 'Concurrent batch for this session, retry'}), 409
     
-    return jsonify({'success': True})
+    return jsonify({
+        'success': True,
+        'applied': applied,
+        'ignored': ignored + len(data['events']) - len(events)
+    })
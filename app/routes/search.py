@@ -0,0 +1,30 @@
+from flask import Blueprint, current_app, jsonify, request, url_for
+from flask_login import current_user, login_required
+from app.utils.search_index import search_library
+
+search_bp = Blueprint('search', __name__)
+
+
+@search_bp.route('/api/search')
+@login_required
+def search():
+    """
+    Search the user's library for passages.
+    
+    Query: q (words, "a phrase", or a prefix*) and limit. Each hit carries the
+    word index to resume reading from and a reader URL that opens there.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing search query'}), 400
+    if len(query) > current_app.config['SEARCH_QUERY_MAX_LENGTH']:
+        return jsonify({'error': 'Search query is too long'}), 400
+    
+    limit = request.args.get('limit', current_app.config['SEARCH_RESULTS_DEFAULT'], type=int)
+    limit = max(1, min(limit, current_app.config['SEARCH_RESULTS_MAX']))
+    
+    hits = search_library(current_user.id, query, limit)
+    for hit in hits:
+        hit['read_url'] = url_for('reader.read', doc_id=hit['document_id'], word=hit['word_index'])
+    
+    return jsonify({'query': query, 'hits': hits})
@@ -11,13 +11,33 @@ class WordFlowReader {
         this.wpmMin = options.wpmMin || 60;
         this.wpmMax = options.wpmMax || 600;
         
-        this.words = [];
+        // Words are loaded in fixed-size windows fetched around the current position
+        this.windowSize = options.windowSize || 1000;
+        this.maxWindows = options.maxWindows || 8;
+        this.windows = new Map();  // window start index -> words
+        this.pendingWindows = new Map();  // window start index -> in-flight request
+        this.totalWords = 0;
+        this.pdfPages = [];
+        this.isComplete = true;
+        this.refreshTimer = null;
         this.currentIndex = this.initialWordIndex;
         this.isPlaying = false;
         this.timer = null;
         this.autoSaveInterval = null;
         this.lastSavedIndex = this.initialWordIndex;
         
+        // Progress is queued as numbered events and sent in batches
+        this.sessionId = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+        this.eventSeq = 0;
+        this.progressEvents = [];
+        this.maxQueuedEvents = 500;
+        this.lastQueued = null;
+        this.sendEveryTicks = 6;  // Send every 6th auto-save tick (30 seconds)
+        this.autoSaveTicks = 0;
+        this.sendingEvents = null;
+        
         this.init();
     }
     
@@ -49,6 +69,7 @@ class WordFlowReader {
             positionMarker: document.getElementById('positionMarker'),
             // Page preview elements
             pageSlidesContainer: document.getElementById('pageSlidesContainer'),
+            pagePreviewImage: document.getElementById('pagePreviewImage'),
             currentPageNum: document.getElementById('currentPageNum'),
             totalPages: document.getElementById('totalPages'),
             prevPageBtn: document.getElementById('prevPageBtn'),
@@ -84,9 +105,16 @@ class WordFlowReader {
             }
         });
         
-        // Save on page unload
-        window.addEventListener('beforeunload', () => {
-            this.saveProgress();
+        // Send queued progress when the page is hidden or unloaded; beacons survive tab close
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'hidden') {
+                this.queueProgressEvent();
+                this.beaconProgressEvents();
+            }
+        });
+        window.addEventListener('pagehide', () => {
+            this.queueProgressEvent();
+            this.beaconProgressEvents();
         });
     }
     
@@ -171,18 +199,9 @@ class WordFlowReader {
     
     async loadWords() {
         try {
-            const response = await fetch(`/api/words/${this.docId}`);
-            if (!response.ok) throw new Error('Failed to load words');
-            
-            const data = await response.json();
-            this.words = data.words;
-            
-            // Store actual PDF page boundaries
-            this.pdfPages = data.pages || [];
-            this.totalPageCount = this.pdfPages.length;
-            
-            // Update total words display
-            this.elements.totalWords.textContent = this.words.length;
+            // First window around the resume position, plus document metadata
+            await this.loadWindow(this.windowStart(this.currentIndex), true);
+            this.scheduleRefresh();
             
             // Display first word or resume position
             this.displayWord();
@@ -192,22 +211,156 @@ class WordFlowReader {
         }
     }
     
+    windowStart(index) {
+        return Math.floor(index / this.windowSize) * this.windowSize;
+    }
+    
+    isWindowLoaded(start) {
+        const words = this.windows.get(start);
+        // A short window is only final once it reaches the end of the document
+        return words !== undefined &&
+            (words.length === this.windowSize || start + words.length >= this.totalWords);
+    }
+    
+    getWord(index) {
+        const start = this.windowStart(index);
+        const words = this.windows.get(start);
+        return words ? words[index - start] : undefined;
+    }
+    
+    getWords(first, last) {
+        const words = [];
+        for (let index = first; index <= last; index++) {
+            const word = this.getWord(index);
+            if (word === undefined) return null;
+            words.push(word);
+        }
+        return words;
+    }
+    
+    loadWindow(start, includePages = false) {
+        if (!includePages && this.pendingWindows.has(start)) {
+            return this.pendingWindows.get(start);
+        }
+        
+        const params = new URLSearchParams({ start: start, count: this.windowSize });
+        if (includePages) params.set('include_pages', '1');
+        
+        const request = fetch(`/api/words/${this.docId}?${params}`)
+            .then(response => {
+                if (!response.ok) throw new Error('Failed to load words');
+                return response.json();
+            })
+            .then(data => {
+                this.applyMetadata(data);
+                if (data.start === start) {
+                    this.windows.set(start, data.words);
+                    this.evictWindows();
+                    this.renderPageText(start, start + data.words.length - 1);
+                }
+            })
+            .finally(() => this.pendingWindows.delete(start));
+        
+        this.pendingWindows.set(start, request);
+        return request;
+    }
+    
+    applyMetadata(data) {
+        this.totalWords = data.total;
+        this.isComplete = data.complete !== false;
+        
+        // Store actual PDF page boundaries
+        if (data.pages) {
+            this.pdfPages = data.pages;
+            this.totalPageCount = this.pdfPages.length;
+            this.hasPdfPages = true;
+        }
+        
+        // Update total words display
+        this.elements.totalWords.textContent = this.totalWords;
+    }
+    
+    prefetch() {
+        // Keep the current window and the one after it ready
+        const start = this.windowStart(this.currentIndex);
+        [start, start + this.windowSize].forEach(windowStart => {
+            if (windowStart < this.totalWords && !this.isWindowLoaded(windowStart)) {
+                this.loadWindow(windowStart).catch(error => console.error('Error prefetching words:', error));
+            }
+        });
+    }
+    
+    evictWindows() {
+        // Drop the windows farthest from the reading position
+        const current = this.windowStart(this.currentIndex);
+        while (this.windows.size > this.maxWindows) {
+            let farthest = null;
+            this.windows.forEach((words, start) => {
+                if (farthest === null || Math.abs(start - current) > Math.abs(farthest - current)) {
+                    farthest = start;
+                }
+            });
+            this.windows.delete(farthest);
+        }
+    }
+    
+    scheduleRefresh() {
+        // Document is still being extracted: pick up new pages shortly
+        if (!this.isComplete) {
+            this.refreshTimer = setTimeout(() => this.refreshWords(), 3000);
+        }
+    }
+    
+    async refreshWords() {
+        try {
+            await this.loadWindow(this.windowStart(this.currentIndex), true);
+            this.generatePageSlides();
+            this.displayWord();
+        } catch (error) {
+            console.error('Error refreshing words:', error);
+        }
+        this.scheduleRefresh();
+    }
+    
     displayWord() {
-        if (this.words.length === 0) return;
+        if (this.totalWords === 0) return;
+        
+        // Resume position lies in pages that are not extracted yet
+        if (!this.isComplete && this.currentIndex >= this.totalWords) {
+            this.elements.wordDisplay.textContent = 'Loading...';
+            return;
+        }
         
         // Ensure index is within bounds
-        this.currentIndex = Math.max(0, Math.min(this.currentIndex, this.words.length - 1));
+        this.currentIndex = Math.max(0, Math.min(this.currentIndex, this.totalWords - 1));
+        
+        const word = this.getWord(this.currentIndex);
+        if (word === undefined) {
+            // Window not loaded yet (e.g. after a jump): show the word once it arrives
+            const index = this.currentIndex;
+            this.elements.wordDisplay.textContent = 'Loading...';
+            this.loadWindow(this.windowStart(index))
+                .then(() => {
+                    if (this.currentIndex === index && this.getWord(index) !== undefined) this.displayWord();
+                })
+                .catch(error => console.error('Error loading words:', error));
+            this.updateProgress();
+            return;
+        }
         
         // Display current word
-        this.elements.wordDisplay.textContent = this.words[this.currentIndex];
+        this.elements.wordDisplay.textContent = word;
         
         // Update progress indicators
         this.updateProgress();
+        
+        // Fetch upcoming words before the reader gets there
+        this.prefetch();
     }
     
     updateProgress() {
         const current = this.currentIndex + 1;
-        const total = this.words.length;
+        const total = this.totalWords;
         const percent = total > 0 ? Math.round((current / total) * 100) : 0;
         const wordsLeft = total - current;
         
@@ -271,7 +424,7 @@ class WordFlowReader {
         // Use actual PDF pages if available, otherwise fall back to artificial pages
         if (!this.pdfPages || this.pdfPages.length === 0) {
             // Fallback: create artificial pages
-            const total = this.words.length;
+            const total = this.totalWords;
             this.totalPageCount = Math.ceil(total / this.wordsPerPage);
             this.pdfPages = [];
             for (let i = 0; i < this.totalPageCount; i++) {
@@ -307,12 +460,42 @@ class WordFlowReader {
             header.textContent = `Page ${pageData.page}`;
             pageDiv.appendChild(header);
             
-            // Page content container - show actual text from this PDF page
+            // Page content container - filled once the page's words are loaded
             const contentDiv = document.createElement('div');
             contentDiv.className = 'page-content';
+            pageDiv.appendChild(contentDiv);
+            
+            // Click to jump to this PDF page
+            pageDiv.addEventListener('click', () => {
+                this.jumpToPage(index);
+            });
+            
+            this.elements.pageSlidesContainer.appendChild(pageDiv);
+        });
+        
+        // Show text for pages whose words are already loaded
+        this.windows.forEach((words, start) => {
+            this.renderPageText(start, start + words.length - 1);
+        });
+        
+        // Set initial page based on current position
+        this.currentPage = this.findCurrentPage();
+        this.updatePagePreview();
+    }
+    
+    renderPageText(first, last) {
+        if (!this.elements.pageSlidesContainer) return;
+        
+        const pageSlides = this.elements.pageSlidesContainer.querySelectorAll('.page-slide');
+        this.pdfPages.forEach((pageData, index) => {
+            const pageDiv = pageSlides[index];
+            if (!pageDiv || pageDiv.dataset.rendered || pageData.end < first || pageData.start > last) return;
             
-            // Get words for this actual PDF page
-            const pageWords = this.words.slice(pageData.start, pageData.end + 1);
+            // Get words for this actual PDF page (may span two windows)
+            const pageWords = this.getWords(pageData.start, pageData.end);
+            if (!pageWords) return;
+            
+            const contentDiv = pageDiv.querySelector('.page-content');
             
             // Create lines for display - show ALL lines (page content scrolls)
             const wordsPerLine = 10;
@@ -321,7 +504,7 @@ class WordFlowReader {
             for (let line = 0; line < totalLines; line++) {
                 const lineStart = pageData.start + (line * wordsPerLine);
                 const lineEnd = Math.min(lineStart + wordsPerLine - 1, pageData.end);
-                const lineWords = this.words.slice(lineStart, lineEnd + 1);
+                const lineWords = pageWords.slice(line * wordsPerLine, line * wordsPerLine + wordsPerLine);
                 
                 const lineDiv = document.createElement('div');
                 lineDiv.className = 'page-text-line';
@@ -332,19 +515,8 @@ class WordFlowReader {
                 contentDiv.appendChild(lineDiv);
             }
             
-            pageDiv.appendChild(contentDiv);
-            
-            // Click to jump to this PDF page
-            pageDiv.addEventListener('click', () => {
-                this.jumpToPage(index);
-            });
-            
-            this.elements.pageSlidesContainer.appendChild(pageDiv);
+            pageDiv.dataset.rendered = 'true';
         });
-        
-        // Set initial page based on current position
-        this.currentPage = this.findCurrentPage();
-        this.updatePagePreview();
     }
     
     findCurrentPage() {
@@ -377,6 +549,15 @@ class WordFlowReader {
             this.elements.nextPageBtn.disabled = newPage >= this.totalPageCount - 1;
         }
         
+        // Rendered image of the PDF page being read (real PDF pages only)
+        const previewImage = this.elements.pagePreviewImage;
+        if (previewImage && this.hasPdfPages && this.previewPage !== this.pdfPages[newPage].page) {
+            this.previewPage = this.pdfPages[newPage].page;
+            previewImage.onload = () => { previewImage.hidden = false; };
+            previewImage.onerror = () => { previewImage.hidden = true; };
+            previewImage.src = `/api/preview/${this.docId}/${this.previewPage}`;
+        }
+        
         // Update page slides
         const pageSlides = this.elements.pageSlidesContainer.querySelectorAll('.page-slide');
         pageSlides.forEach((slide, index) => {
@@ -469,7 +650,7 @@ class WordFlowReader {
     }
     
     play() {
-        if (this.currentIndex >= this.words.length - 1) {
+        if (this.currentIndex >= this.totalWords - 1) {
             // Reset to beginning if at end
             this.currentIndex = 0;
             this.displayWord();
@@ -497,12 +678,18 @@ class WordFlowReader {
         const interval = (60 / this.wpm) * 1000; // Convert WPM to milliseconds
         
         this.timer = setInterval(() => {
-            if (this.currentIndex < this.words.length - 1) {
+            if (this.currentIndex < this.totalWords - 1) {
+                // Next window still on its way: hold the current word
+                if (this.getWord(this.currentIndex + 1) === undefined) {
+                    this.prefetch();
+                    return;
+                }
                 this.currentIndex++;
                 this.displayWord();
-            } else {
+            } else if (this.isComplete) {
                 this.pause();
             }
+            // Otherwise wait at the end of the extracted text for more pages
         }, interval);
     }
     
@@ -526,7 +713,7 @@ class WordFlowReader {
     }
     
     next() {
-        if (this.currentIndex < this.words.length - 1) {
+        if (this.currentIndex < this.totalWords - 1) {
             this.currentIndex++;
             this.displayWord();
             
@@ -551,7 +738,7 @@ class WordFlowReader {
         }
         
         // Recalculate time remaining
-        const wordsLeft = this.words.length - this.currentIndex - 1;
+        const wordsLeft = this.totalWords - this.currentIndex - 1;
         this.updateTimeRemaining(wordsLeft);
         
         // Restart timer if playing
@@ -570,36 +757,95 @@ class WordFlowReader {
     }
     
     startAutoSave() {
-        // Save progress every 5 seconds
+        // Record progress every 5 seconds and send the queue every 30
         this.autoSaveInterval = setInterval(() => {
-            if (this.currentIndex !== this.lastSavedIndex) {
-                this.saveProgress();
+            this.queueProgressEvent();
+            this.autoSaveTicks += 1;
+            if (this.autoSaveTicks >= this.sendEveryTicks) {
+                this.autoSaveTicks = 0;
+                this.sendProgressEvents();
             }
         }, 5000);
     }
     
-    async saveProgress() {
-        try {
-            await fetch(`/api/progress/${this.docId}`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    last_word_index: this.currentIndex,
-                    wpm: this.wpm,
-                    font_size: this.fontSize
-                })
+    queueProgressEvent() {
+        // Only record an event when something changed since the last one
+        const last = this.lastQueued;
+        if (last && last.last_word_index === this.currentIndex &&
+            last.wpm === this.wpm && last.font_size === this.fontSize) {
+            return;
+        }
+        
+        this.lastQueued = {
+            seq: ++this.eventSeq,
+            document_id: this.docId,
+            t: Date.now(),
+            last_word_index: this.currentIndex,
+            wpm: this.wpm,
+            font_size: this.fontSize
+        };
+        this.progressEvents.push(this.lastQueued);
+        
+        // Older events can be dropped: positions telescope into the newer ones
+        if (this.progressEvents.length > this.maxQueuedEvents) {
+            this.progressEvents.splice(0, this.progressEvents.length - this.maxQueuedEvents);
+        }
+    }
+    
+    progressPayload() {
+        return JSON.stringify({session: this.sessionId, events: this.progressEvents});
+    }
+    
+    async sendProgressEvents() {
+        if (this.sendingEvents || this.progressEvents.length === 0) {
+            return this.sendingEvents;
+        }
+        
+        const sentSeq = this.progressEvents[this.progressEvents.length - 1].seq;
+        this.sendingEvents = fetch('/api/progress/events', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: this.progressPayload(),
+            keepalive: true
+        })
+            .then(response => {
+                if (!response.ok) throw new Error('Failed to save progress');
+                // Keep anything queued while the request was in flight
+                this.progressEvents = this.progressEvents.filter(event => event.seq > sentSeq);
+                this.lastSavedIndex = this.lastQueued.last_word_index;
+            })
+            .catch(error => {
+                // Events stay queued; resending them later is idempotent
+                console.error('Error saving progress:', error);
+            })
+            .finally(() => {
+                this.sendingEvents = null;
             });
-            
-            this.lastSavedIndex = this.currentIndex;
-        } catch (error) {
-            console.error('Error saving progress:', error);
+        return this.sendingEvents;
+    }
+    
+    beaconProgressEvents() {
+        if (this.progressEvents.length === 0) return;
+        
+        const payload = new Blob([this.progressPayload()], {type: 'application/json'});
+        if (!(navigator.sendBeacon && navigator.sendBeacon('/api/progress/events', payload))) {
+            this.sendProgressEvents();
         }
+        // Events stay queued: if the page comes back they are resent and deduplicated
+    }
+    
+    saveProgress() {
+        this.queueProgressEvent();
+        return this.sendProgressEvents();
     }
     
     destroy() {
         this.stopTimer();
+        if (this.refreshTimer) {
+            clearTimeout(this.refreshTimer);
+        }
         if (this.autoSaveInterval) {
             clearInterval(this.autoSaveInterval);
         }
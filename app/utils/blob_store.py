@@ -0,0 +1,114 @@
+import hashlib
+import os
+import uuid
+from app.models.document import Document
+from app.models.job import IngestJob
+from app.utils.search_index import delete_search_index
+from app.utils.word_store import delete_word_payloads, delete_word_store
+
+CHUNK_SIZE = 1024 * 1024  # Bytes read from the upload stream at a time
+
+
+def blob_path(folder, content_sha256):
+    """Return where uploaded content with this SHA-256 is stored."""
+    return os.path.join(folder, 'blobs', content_sha256[:2], content_sha256 + '.pdf')
+
+
+def save_upload_blob(stream, folder):
+    """
+    Stream an upload to disk, hashing it on the way, and file it by content.
+
+    Returns (sha256 hex digest, path). Identical uploads end up at the same
+    path, so the bytes are stored once however many documents refer to them.
+    """
+    tmp_dir = os.path.join(folder, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                f.write(chunk)
+
+        content_sha256 = digest.hexdigest()
+        path = store_blob(tmp_path, content_sha256, folder)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return content_sha256, path
+
+
+def hash_file(path):
+    """SHA-256 hex digest of a file, read in CHUNK_SIZE pieces."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_blob(tmp_path, content_sha256, folder):
+    """
+    Move a finished file under the upload folder into the blob store.
+
+    The file is renamed, not copied, so it must be on the same filesystem
+    (save_upload_blob and chunked uploads write under folder/tmp). Returns
+    the blob path.
+    """
+    path = blob_path(folder, content_sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Replacing an existing blob is harmless: the content is identical
+    os.replace(tmp_path, path)
+    return path
+
+
+def find_extracted_document(content_sha256):
+    """Return a finished document with this content whose words can be shared."""
+    return Document.query.filter(
+        Document.content_sha256 == content_sha256,
+        Document.is_complete.is_(True),
+        Document.word_store.isnot(None)
+    ).first()
+
+
+def release_file(file_path):
+    """Delete an uploaded file once no document or unfinished job refers to it."""
+    references = Document.query.filter_by(file_path=file_path).count() + \
+        IngestJob.query.filter(
+            IngestJob.file_path == file_path,
+            IngestJob.status.in_([IngestJob.STATUS_QUEUED, IngestJob.STATUS_RUNNING])
+        ).count()
+    if references == 0 and os.path.exists(file_path):
+        os.remove(file_path)
+
+
+def release_word_store(folder, key):
+    """Delete a word store and its search passages once no document refers to it."""
+    if Document.query.filter_by(word_store=key).count() == 0:
+        delete_search_index(key)
+        delete_word_store(folder, key)
+
+
+def release_word_payloads(folder, words_hash):
+    """Delete precompressed payloads once no document refers to them."""
+    if Document.query.filter_by(words_hash=words_hash).count() == 0:
+        delete_word_payloads(folder, words_hash)
+
+
+def release_document_files(folder, file_path, word_store=None, words_hash=None):
+    """
+    Drop a deleted document's references to its upload and extracted words.
+
+    Call after the row is deleted and flushed, so it no longer counts as an
+    owner; bytes are only removed when the last owner is gone. The caller
+    commits the session, which drops released words from the search index.
+    """
+    release_file(file_path)
+    if word_store:
+        release_word_store(folder, word_store)
+    if words_hash:
+        release_word_payloads(folder, words_hash)
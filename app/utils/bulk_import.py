@@ -0,0 +1,283 @@
+import json
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from types import SimpleNamespace
+from werkzeug.utils import secure_filename
+from app import db
+from app.models.document import Document
+from app.utils.blob_store import find_extracted_document, release_file, save_upload_blob
+from app.utils.search_index import index_word_store
+from app.utils.word_store import delete_word_store, write_word_payloads
+
+# Words shared by every document with the same content
+ExtractedWords = namedtuple('ExtractedWords', ['word_store', 'word_count', 'page_boundaries', 'words_hash',
+                                               'original_name'])
+
+# One finished file, as reported to the caller and written to the checkpoint
+ImportResult = namedtuple('ImportResult', ['path', 'status', 'document_id', 'words', 'pages', 'seconds',
+                                           'size', 'error'])
+
+# Statuses that are not retried when a run resumes
+DONE_STATUSES = {'imported', 'shared', 'exists'}
+
+
+def extract_import_file(pdf_path, word_store_folder, original_name):
+    """
+    Extract one PDF into a new word store and precompress its payload.
+
+    Runs in a worker process so only the small result crosses back to the
+    importer. Returns (ExtractedWords, page count, seconds).
+    """
+    from app.utils.pdf_processor import extract_text_from_pdf, page_boundaries_to_json
+    from app.utils.word_store import new_word_store_key, write_word_store
+
+    started = time.perf_counter()
+    words, word_count, page_boundaries = extract_text_from_pdf(pdf_path)
+    if word_count == 0:
+        raise ValueError('PDF appears to be empty or contains no readable text.')
+
+    key = new_word_store_key()
+    write_word_store(word_store_folder, key, words)
+    # write_word_payloads only reads these attributes and sets words_hash
+    document = SimpleNamespace(word_store=key, word_count=word_count, original_name=original_name,
+                               page_boundaries=page_boundaries_to_json(page_boundaries), words_hash=None)
+    write_word_payloads(document, word_store_folder)
+    extracted = ExtractedWords(key, word_count, document.page_boundaries, document.words_hash, original_name)
+    return extracted, len(page_boundaries), time.perf_counter() - started
+
+
+def find_pdfs(directory, recursive=True):
+    """PDF files under directory as sorted paths relative to it."""
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.')) if recursive else []
+        for name in files:
+            if name.lower().endswith('.pdf'):
+                found.append(os.path.relpath(os.path.join(root, name), directory))
+    return sorted(found)
+
+
+def load_checkpoint(path, retry_failed=False):
+    """Relative paths already handled by earlier runs of this import."""
+    handled = set()
+    if not os.path.exists(path):
+        return handled
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Torn last line of an interrupted run
+            if entry['status'] in DONE_STATUSES or (entry['status'] == 'failed' and not retry_failed):
+                handled.add(entry['path'])
+    return handled
+
+
+class BulkImporter:
+    """
+    Import a directory of PDFs for one user outside the request path.
+
+    Files are hashed into the upload blob store by the importer, extracted by
+    a process pool (one file per worker, all cores by default), and their
+    Document rows are inserted in batches of batch_size per transaction. The
+    checkpoint is a JSON-lines file appended after every committed batch, so
+    an interrupted run resumes with the files it had not committed. Content
+    already extracted, in the database or earlier in the run, shares its
+    words instead of being extracted again, and a file the user already has
+    under the same name, in the database or earlier in the run, is skipped.
+    """
+
+    def __init__(self, app, user_id, directory, checkpoint_path, workers=None, batch_size=20,
+                 recursive=True, retry_failed=False, report=None):
+        self.app = app
+        self.user_id = user_id
+        self.directory = directory
+        self.checkpoint_path = checkpoint_path
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.recursive = recursive
+        self.retry_failed = retry_failed
+        self.report = report or (lambda result: None)
+        self.totals = dict.fromkeys(('found', 'resumed', 'imported', 'shared', 'exists', 'failed',
+                                     'pages', 'words', 'bytes', 'extract_seconds', 'seconds'), 0)
+        self._batch = []  # (Document or None, ImportResult) awaiting commit
+        self._extracted = {}  # content_sha256 -> ExtractedWords extracted in this run
+        self._waiting = {}  # content_sha256 -> files waiting on its extraction
+        self._documents = {}  # (content_sha256, original_name) -> Document created in this run
+
+    def run(self):
+        """Import every pending file; returns the aggregate totals."""
+        handled = load_checkpoint(self.checkpoint_path, self.retry_failed)
+        pending = [path for path in find_pdfs(self.directory, self.recursive) if path not in handled]
+        self.totals['found'] = len(pending) + len(handled)
+        self.totals['resumed'] = len(handled)
+
+        started = time.perf_counter()
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        inflight = {}  # Future -> (relative path, blob path, content_sha256, size)
+        try:
+            files = iter(pending)
+            exhausted = False
+            while not exhausted or inflight:
+                # Keep every worker busy with one file queued behind it
+                while not exhausted and len(inflight) < self.workers * 2:
+                    path = next(files, None)
+                    if path is None:
+                        exhausted = True
+                        break
+                    self._start_file(path, executor, inflight)
+
+                if inflight:
+                    done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._finish_extraction(future, *inflight.pop(future))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._commit_batch()
+
+        self.totals['seconds'] = time.perf_counter() - started
+        return self.totals
+
+    def _start_file(self, path, executor, inflight):
+        full_path = os.path.join(self.directory, path)
+        original_name = secure_filename(os.path.basename(path)) or 'document.pdf'
+        try:
+            size = os.path.getsize(full_path)
+            with open(full_path, 'rb') as f:
+                content_sha256, blob = save_upload_blob(f, self.app.config['UPLOAD_FOLDER'])
+        except OSError as e:
+            self._record(None, ImportResult(path, 'failed', None, 0, 0, 0.0, 0, str(e)))
+            return
+
+        existing_id = self._existing_document_id(content_sha256, original_name)
+        if existing_id:
+            self._record(None, ImportResult(path, 'exists', existing_id, 0, 0, 0.0, size, None))
+            return
+
+        if content_sha256 in self._waiting:
+            # The same content is being extracted right now
+            self._waiting[content_sha256].append((path, blob, size))
+            return
+
+        source = self._extracted.get(content_sha256)
+        if source is None:
+            document = find_extracted_document(content_sha256)
+            if document is not None:
+                source = ExtractedWords(document.word_store, document.word_count, document.page_boundaries,
+                                        document.words_hash, document.original_name)
+        if source is not None:
+            self._share(path, blob, content_sha256, size, source)
+            return
+
+        self._waiting[content_sha256] = []
+        future = executor.submit(extract_import_file, blob, self.app.config['WORD_STORE_FOLDER'], original_name)
+        inflight[future] = (path, blob, content_sha256, size)
+
+    def _existing_document_id(self, content_sha256, original_name):
+        """Id of the user's document with this content and name, including ones created earlier in this run."""
+        document = self._documents.get((content_sha256, original_name))
+        if document is not None:
+            if document.id is None:
+                # Still in the pending batch
+                self._commit_batch()
+            return document.id
+        existing = db.session.query(Document.id).filter_by(
+            user_id=self.user_id, content_sha256=content_sha256, original_name=original_name
+        ).first()
+        return existing.id if existing else None
+
+    def _finish_extraction(self, future, path, blob, content_sha256, size):
+        waiting = self._waiting.pop(content_sha256, [])
+        try:
+            extracted, pages, seconds = future.result()
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            for failed_path, _, failed_size in [(path, blob, size)] + waiting:
+                self._record(None, ImportResult(failed_path, 'failed', None, 0, 0, 0.0, failed_size, error))
+            # Commit first so the blob's reference count is up to date
+            self._commit_batch()
+            release_file(blob)
+            return
+
+        self._extracted[content_sha256] = extracted
+        # Passages are committed with the batch that inserts the document
+        index_word_store(self.app.config['WORD_STORE_FOLDER'], extracted.word_store, extracted.word_count,
+                         extracted.page_boundaries)
+        document = self._new_document(blob, content_sha256, extracted, extracted.original_name)
+        self._record(document, ImportResult(path, 'imported', None, extracted.word_count, pages, seconds, size, None))
+        self.totals['pages'] += pages
+        self.totals['words'] += extracted.word_count
+        self.totals['extract_seconds'] += seconds
+        for waiting_path, waiting_blob, waiting_size in waiting:
+            self._share(waiting_path, waiting_blob, content_sha256, waiting_size, extracted)
+
+    def _share(self, path, blob, content_sha256, size, source):
+        original_name = secure_filename(os.path.basename(path)) or 'document.pdf'
+        # A file waiting on an extraction may have the extracted file's name too
+        existing_id = self._existing_document_id(content_sha256, original_name)
+        if existing_id:
+            self._record(None, ImportResult(path, 'exists', existing_id, 0, 0, 0.0, size, None))
+            return
+        document = self._new_document(blob, content_sha256, source, original_name)
+        if source.original_name != original_name or not source.words_hash:
+            # The payload carries the document name, so it cannot be shared
+            write_word_payloads(document, self.app.config['WORD_STORE_FOLDER'])
+        pages = len(json.loads(source.page_boundaries)) if source.page_boundaries else 0
+        self._record(document, ImportResult(path, 'shared', None, source.word_count, pages, 0.0, size, None))
+
+    def _new_document(self, blob, content_sha256, source, original_name):
+        document = self._documents[(content_sha256, original_name)] = Document(
+            user_id=self.user_id,
+            file_path=blob,
+            original_name=original_name,
+            content_sha256=content_sha256,
+            word_count=source.word_count,
+            word_store=source.word_store,
+            page_boundaries=source.page_boundaries,
+            words_hash=source.words_hash,
+            is_complete=True
+        )
+        return document
+
+    def _record(self, document, result):
+        self._batch.append((document, result))
+        if len(self._batch) >= self.batch_size:
+            self._commit_batch()
+
+    def _commit_batch(self):
+        """Insert the batch's documents in one transaction, then checkpoint and report them."""
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+
+        documents = [document for document, _ in batch if document is not None]
+        try:
+            db.session.add_all(documents)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            # Word stores extracted for this batch are not referenced by any row
+            for document, result in batch:
+                if result.status == 'imported':
+                    delete_word_store(self.app.config['WORD_STORE_FOLDER'], document.word_store)
+            raise
+
+        with open(self.checkpoint_path, 'a') as f:
+            for document, result in batch:
+                if document is not None:
+                    result = result._replace(document_id=document.id)
+                f.write(json.dumps({
+                    'path': result.path,
+                    'status': result.status,
+                    'document_id': result.document_id,
+                    'error': result.error
+                }) + '\n')
+                self.totals[result.status] += 1
+                self.totals['bytes'] += result.size
+                self.report(result)
+            f.flush()
+            os.fsync(f.fileno())
+        db.session.expunge_all()
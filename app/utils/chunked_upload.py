@@ -0,0 +1,159 @@
+import fcntl
+import hashlib
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from app import db
+from app.models.upload_session import UploadSession
+from app.utils.blob_store import CHUNK_SIZE, hash_file, store_blob
+
+# Expired sessions removed per expire_upload_sessions call
+EXPIRE_BATCH = 20
+
+
+class OffsetMismatch(ValueError):
+    """A chunk did not start at the acknowledged offset; resume from .offset."""
+
+    def __init__(self, offset):
+        super().__init__(f'Upload is at offset {offset}.')
+        self.offset = offset
+
+
+class ChecksumMismatch(ValueError):
+    """A chunk's bytes did not match the SHA-256 sent with it."""
+
+
+def partial_path(folder, upload_id):
+    """Where the bytes of an unfinished upload accumulate, next to save_upload_blob's temp files."""
+    return os.path.join(folder, 'tmp', f'{upload_id}.part')
+
+
+def lock_path(folder, upload_id):
+    """The file an upload's requests lock; unlike the partial file it is never renamed."""
+    return os.path.join(folder, 'tmp', f'{upload_id}.lock')
+
+
+def create_upload_session(user_id, original_name, total_size):
+    """Start a chunked upload; the caller commits."""
+    session = UploadSession(user_id=user_id, original_name=original_name, total_size=total_size, received_size=0)
+    db.session.add(session)
+    db.session.flush()
+    return session
+
+
+@contextmanager
+def locked_upload(session, folder):
+    """
+    Hold an upload's lock with the session freshly loaded, yielding its
+    partial file while the upload is open and None once it is assembled.
+    Requests for one upload write or assemble it one at a time, across
+    processes. Uses flock, so the upload folder must be on a local POSIX
+    filesystem.
+    """
+    path = partial_path(folder, session.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(lock_path(folder, session.id), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        db.session.refresh(session)
+        # Assembly moved the partial file away; don't start an empty one
+        if session.status != UploadSession.STATUS_OPEN:
+            # Complete is final, so a lock file made by a late request can go
+            remove_upload_lock(session, folder)
+            yield None
+            return
+        # Only the first chunk creates the file; acknowledged bytes are never replaced by an empty one
+        fd = os.open(path, os.O_RDWR | (os.O_CREAT if session.received_size == 0 else 0), 0o644)
+        with os.fdopen(fd, 'r+b') as f:
+            yield f
+
+
+def write_chunk(session, folder, stream, offset, length, expected_sha256):
+    """
+    Write length bytes from stream at offset of an upload's partial file.
+
+    The bytes go straight to disk in CHUNK_SIZE pieces while being hashed.
+    Only a chunk that starts at the acknowledged offset, arrives whole and
+    matches expected_sha256 moves the offset on; anything else is cut off
+    the partial file again. The file is synced and the new offset committed
+    under the upload's lock, so an acknowledged byte is never lost or
+    overwritten. Returns the new offset.
+    """
+    if length <= 0 or offset + length > session.total_size:
+        raise ValueError('Chunk does not fit in the upload.')
+
+    with locked_upload(session, folder) as f:
+        # Another request may have written this chunk, or finished the upload, while we waited
+        if f is None or offset != session.received_size:
+            raise OffsetMismatch(session.received_size)
+
+        digest = hashlib.sha256()
+        received = 0
+        f.seek(offset)
+        try:
+            while received < length:
+                chunk = stream.read(min(CHUNK_SIZE, length - received))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+                received += len(chunk)
+            if received != length:
+                raise ValueError(f'Chunk ended after {received} of {length} bytes.')
+            if digest.hexdigest() != expected_sha256.lower():
+                raise ChecksumMismatch('Chunk checksum does not match.')
+            f.flush()
+            os.fsync(f.fileno())
+        except Exception:
+            f.truncate(offset)
+            raise
+
+        session.received_size = offset + length
+        session.updated_at = datetime.utcnow()
+        db.session.commit()
+    return session.received_size
+
+
+def assemble_upload(session, folder):
+    """
+    Move a fully received upload into the blob store and mark it complete.
+
+    Call under locked_upload while it yields the partial file. The file is
+    hashed once more and renamed into place, never copied. Returns (content sha256, blob path);
+    the caller commits.
+    """
+    path = partial_path(folder, session.id)
+    content_sha256 = hash_file(path)
+    file_path = store_blob(path, content_sha256, folder)
+    session.content_sha256 = content_sha256
+    session.status = UploadSession.STATUS_COMPLETE
+    session.updated_at = datetime.utcnow()
+    return content_sha256, file_path
+
+
+def remove_upload_lock(session, folder):
+    """
+    Drop a completed upload's lock file; call after committing, still under
+    locked_upload. Requests waiting on it then find the upload complete, and
+    later ones lock a new file and find the same.
+    """
+    path = lock_path(folder, session.id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def delete_upload_session(session, folder):
+    """Drop an upload with its partial and lock files; the caller commits."""
+    for path in (partial_path(folder, session.id), lock_path(folder, session.id)):
+        if os.path.exists(path):
+            os.remove(path)
+    db.session.delete(session)
+
+
+def expire_upload_sessions(folder, ttl_seconds, limit=EXPIRE_BATCH):
+    """Remove up to limit sessions idle for longer than ttl_seconds; the caller commits."""
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+    expired = UploadSession.query.filter(UploadSession.updated_at < cutoff)\
+        .order_by(UploadSession.updated_at).limit(limit).all()
+    for session in expired:
+        delete_upload_session(session, folder)
+    return len(expired)
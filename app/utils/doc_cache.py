@@ -0,0 +1,105 @@
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+# Decoded per-document state that is expensive to rebuild on every request
+DecodedDocument = namedtuple('DecodedDocument', ['page_boundaries', 'page_boundaries_json', 'size'])
+
+
+def estimate_size(obj):
+    """Rough deep size in bytes of decoded JSON data (lists, dicts, scalars)."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(key) + estimate_size(value) for key, value in obj.items())
+    elif isinstance(obj, list):
+        size += sum(estimate_size(item) for item in obj)
+    return size
+
+
+def decode_document(document):
+    """Decode the parts of a Document row that the reader API needs."""
+    from app.utils.pdf_processor import json_to_page_boundaries, page_boundaries_to_json
+
+    page_boundaries = json_to_page_boundaries(document.page_boundaries)
+    # Encoded once so whole-document responses do not re-serialize every page
+    page_boundaries_json = page_boundaries_to_json(page_boundaries).encode('utf-8')
+    return DecodedDocument(
+        page_boundaries=page_boundaries,
+        page_boundaries_json=page_boundaries_json,
+        size=estimate_size(page_boundaries) + sys.getsizeof(page_boundaries_json)
+    )
+
+
+class DocumentCache:
+    """
+    Process-local LRU cache of decoded documents, bounded by total bytes.
+
+    Entries are keyed by (document id, content version) so a document that
+    grows during ingestion is simply decoded again under its new version.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_bytes = app.config['DOCUMENT_CACHE_MAX_BYTES']
+        app.extensions['document_cache'] = self
+
+    def get(self, document):
+        """Return the decoded form of a document, decoding it on a miss."""
+        key = (document.id, document.content_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Decode outside the lock; a concurrent miss just decodes twice
+        entry = decode_document(document)
+        self._put(key, entry)
+        return entry
+
+    def _put(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            # Older versions of the same document will never be asked for again
+            for stale_key in [k for k in self._entries if k[0] == key[0]]:
+                self.current_bytes -= self._entries.pop(stale_key).size
+            self._entries[key] = entry
+            self.current_bytes += entry.size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.size
+                self.evictions += 1
+
+    def invalidate(self, document_id):
+        """Drop every cached version of a document."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == document_id]:
+                self.current_bytes -= self._entries.pop(key).size
+
+    def stats(self):
+        """Counters for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+document_cache = DocumentCache()
@@ -0,0 +1,424 @@
+import atexit
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from app import db
+from app.models.document import Document
+from app.models.job import IngestJob
+from app.utils.pdf_processor import append_to_json_list, make_page_boundary
+from app.utils.blob_store import release_document_files, release_file
+from app.utils.doc_cache import document_cache
+from app.utils.metrics import metrics
+from app.utils.search_index import index_pages, index_word_store
+from app.utils.word_store import append_words, migrate_legacy_words, new_word_store_key, write_word_payloads
+
+# Set inside pool workers by _init_worker; extracted page batches are sent here
+_worker_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    """Pool initializer: remember where to send extracted page batches."""
+    global _worker_progress_queue
+    _worker_progress_queue = progress_queue
+
+
+def run_extraction_job(job_id, file_path, start_page=0, workers=1, chunk_pages=25, batch_pages=5):
+    """
+    Extract a queued upload inside a pool worker process.
+    
+    Pages are streamed back to the dispatcher in batches so the document is
+    readable before extraction finishes. The first page with text is sent on
+    its own to keep time-to-first-word short; returns the total page count.
+    Stage timings for the pages in a batch travel with it to the dispatcher.
+    """
+    from app.utils.pdf_processor import iter_pdf_pages
+
+    stage_timings = []
+    batch = []
+    batch_start = start_page
+    has_words = False
+    sent_any = False
+    pages_total = start_page
+
+    try:
+        for page_num, pages_total, page_words in iter_pdf_pages(file_path, workers, chunk_pages, start_page,
+                                                                stage_timings):
+            batch.append(page_words)
+            has_words = has_words or bool(page_words)
+
+            # Hold leading text-less pages back until there is something to read
+            if has_words and (not sent_any or len(batch) >= batch_pages):
+                _worker_progress_queue.put((job_id, batch_start, pages_total, batch, list(stage_timings)))
+                stage_timings.clear()
+                batch_start = page_num + 1
+                batch = []
+                sent_any = True
+    except Exception as e:
+        raise ValueError(f"Error extracting text from PDF: {str(e)}")
+
+    if batch:
+        _worker_progress_queue.put((job_id, batch_start, pages_total, batch, stage_timings))
+    return pages_total
+
+
+class IngestQueue:
+    """
+    Durable background queue for PDF extraction.
+
+    Jobs are rows in ``ingest_jobs`` so they survive crashes and restarts.
+    A dispatcher thread claims queued rows and runs them on a bounded
+    process pool (pdfplumber is CPU-bound), records page progress reported
+    by the workers and appends extracted page batches to the Document as
+    they arrive, so it can be read while the rest of the book is processed.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._progress_queue = None
+        self._inflight = {}  # Future -> job id
+        self._unsettled = {}  # Job id -> when its worker finished with page batches still missing
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._last_heartbeat = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Attach to an app; with INGEST_IN_WEB, dispatching starts with the first request it serves."""
+        self.app = app
+        app.extensions['ingest_queue'] = self
+        if app.config['INGEST_QUEUE_ENABLED'] and app.config['INGEST_IN_WEB']:
+            app.before_request(self._start_serving)
+
+    def _start_serving(self):
+        # Only processes that serve requests dispatch: CLI commands and
+        # spawned workers that import the app never start the pool
+        if self._thread is None:
+            self.start()
+
+    def serve(self):
+        """Dispatch in the foreground until interrupted, for the ingest-worker command."""
+        self.start()
+        try:
+            self._stopping.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def start(self):
+        """Start the worker pool and dispatcher thread."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._progress_queue = multiprocessing.get_context('spawn').Queue()
+            self._executor = self._new_executor()
+            self._thread = threading.Thread(target=self._run, name='wordflow-ingest', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def shutdown(self):
+        """Stop dispatching and hand unfinished jobs back to the queue."""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._stopping.set()
+            self._wakeup.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            job_ids = list(self._inflight.values())
+            self._inflight.clear()
+            self._unsettled.clear()
+
+        if job_ids:
+            with self.app.app_context():
+                IngestJob.query.filter(
+                    IngestJob.id.in_(job_ids),
+                    IngestJob.status == IngestJob.STATUS_RUNNING
+                ).update({
+                    'status': IngestJob.STATUS_QUEUED,
+                    'attempts': IngestJob.attempts - 1
+                }, synchronize_session=False)
+                db.session.commit()
+
+    def submit(self, user_id, file_path, original_name, content_sha256=None, commit=True):
+        """Persist a new extraction job and wake the dispatcher; without commit, the caller commits."""
+        job = IngestJob(
+            user_id=user_id,
+            file_path=file_path,
+            original_name=original_name,
+            content_sha256=content_sha256
+        )
+        db.session.add(job)
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+        self._wakeup.set()
+        return job
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.app.config['INGEST_WORKERS'],
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self._progress_queue,)
+        )
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    self._drain_progress()
+                    self._reap_finished()
+                    self._heartbeat()
+                    self._claim_jobs()
+            except Exception as e:
+                self.app.logger.error(f"Ingest dispatcher error: {str(e)}")
+
+            poll_interval = self.app.config['INGEST_POLL_INTERVAL']
+            if self._inflight:
+                wait(list(self._inflight), timeout=poll_interval, return_when=FIRST_COMPLETED)
+            else:
+                self._wakeup.wait(poll_interval)
+            self._wakeup.clear()
+
+    def _drain_progress(self):
+        """Persist every page batch the workers have sent so far, in order."""
+        while True:
+            try:
+                job_id, first_page, pages_total, pages, stage_timings = self._progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            metrics.observe_stages(stage_timings)
+            self._append_pages(job_id, first_page, pages_total, pages)
+
+    def _append_pages(self, job_id, first_page, pages_total, pages):
+        """Append one batch of extracted pages to the job's document."""
+        job = db.session.get(IngestJob, job_id)
+        # Skip batches for finished jobs and duplicates from an earlier attempt
+        if job is None or job.status != IngestJob.STATUS_RUNNING or first_page != job.pages_processed:
+            return
+
+        document = None
+        if job.document_id:
+            document = db.session.get(Document, job.document_id)
+            if document is None:
+                self._fail(job, 'The document was deleted during extraction.')
+                return
+
+        new_words = []
+        new_boundaries = []
+        current_index = job.words_processed
+        for offset, page_words in enumerate(pages):
+            page_start = current_index
+            new_words.extend(page_words)
+            current_index += len(page_words)
+            new_boundaries.append(make_page_boundary(first_page + offset, page_start, current_index))
+
+        if document is None and new_words:
+            # First readable batch: the document goes live, flagged as still growing
+            document = Document(
+                user_id=job.user_id,
+                file_path=job.file_path,
+                original_name=job.original_name,
+                content_sha256=job.content_sha256,
+                word_count=0,
+                word_store=new_word_store_key(),
+                is_complete=False
+            )
+            db.session.add(document)
+            db.session.flush()
+            job.document_id = document.id
+
+        serialize_started = time.perf_counter()
+        if document is not None:
+            if document.word_store is None:
+                # Started before the word store existed: move the earlier pages over first
+                migrate_legacy_words(document, self.app.config['WORD_STORE_FOLDER'])
+                index_word_store(self.app.config['WORD_STORE_FOLDER'], document.word_store, document.word_count,
+                                 document.page_boundaries)
+            # Words go to the store first; they only count once word_count is committed
+            append_words(self.app.config['WORD_STORE_FOLDER'], document.word_store, new_words, job.words_processed)
+            # Searchable as soon as they are readable, in the same transaction
+            index_pages(document.word_store, first_page, job.words_processed, pages)
+            document.page_boundaries = append_to_json_list(document.page_boundaries, new_boundaries)
+            document.word_count = current_index
+            document.content_version = (document.content_version or 1) + 1
+
+        job.pages_processed = first_page + len(pages)
+        job.pages_total = pages_total
+        job.words_processed = current_index
+        job.heartbeat_at = datetime.utcnow()
+        commit_started = time.perf_counter()
+        db.session.commit()
+        metrics.observe_stages([('serialize', commit_started - serialize_started),
+                                ('commit', time.perf_counter() - commit_started)])
+
+    def _reap_finished(self):
+        """Record results of completed futures; rebuild the pool if a worker died."""
+        pool_broken = False
+
+        for future in [f for f in self._inflight if f.done()]:
+            job_id = self._inflight.pop(future)
+            job = db.session.get(IngestJob, job_id)
+            if job is None or job.status != IngestJob.STATUS_RUNNING:
+                self._unsettled.pop(job_id, None)
+                continue
+
+            try:
+                pages_total = future.result()
+            except BrokenProcessPool:
+                pool_broken = True
+                self._retry_or_fail(job, 'The extraction worker crashed.')
+                continue
+            except ValueError as e:
+                self._fail(job, str(e))
+                continue
+            except Exception as e:
+                self.app.logger.error(f"Ingest job {job_id} error: {str(e)}")
+                self._fail(job, 'An error occurred while processing the file.')
+                continue
+
+            if job.pages_processed < pages_total:
+                finished_at = self._unsettled.setdefault(job_id, time.monotonic())
+                if time.monotonic() - finished_at < self.app.config['INGEST_RESULT_GRACE']:
+                    # The last batches are still in transit; check again next pass
+                    self._inflight[future] = job_id
+                    continue
+                # A batch was lost on the way; run again from the last saved page
+                self._unsettled.pop(job_id)
+                self._retry_or_fail(job, 'Extracted pages were lost before they were saved.')
+                continue
+
+            self._unsettled.pop(job_id, None)
+            self._complete(job)
+
+        if pool_broken:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+
+    def _heartbeat(self):
+        """Renew leases on running jobs and requeue ones abandoned elsewhere."""
+        lease = self.app.config['INGEST_JOB_LEASE']
+        if time.monotonic() - self._last_heartbeat < lease / 4:
+            return
+        self._last_heartbeat = time.monotonic()
+
+        now = datetime.utcnow()
+        if self._inflight:
+            IngestJob.query.filter(
+                IngestJob.id.in_(list(self._inflight.values())),
+                IngestJob.status == IngestJob.STATUS_RUNNING
+            ).update({'heartbeat_at': now}, synchronize_session=False)
+
+        # Running jobs whose owner stopped renewing them (crash, kill -9, restart)
+        stale = IngestJob.query.filter(
+            IngestJob.status == IngestJob.STATUS_RUNNING,
+            IngestJob.heartbeat_at < now - timedelta(seconds=lease)
+        ).all()
+        for job in stale:
+            if job.id not in self._inflight.values():
+                self._retry_or_fail(job, 'The extraction worker stopped responding.', commit=False)
+
+        db.session.commit()
+
+    def _claim_jobs(self):
+        """Claim queued jobs, oldest first, up to the number of free workers."""
+        free_slots = self.app.config['INGEST_WORKERS'] - len(self._inflight)
+        if free_slots <= 0:
+            return
+
+        candidates = IngestJob.query.filter_by(status=IngestJob.STATUS_QUEUED)\
+            .order_by(IngestJob.created_at)\
+            .limit(free_slots)\
+            .all()
+
+        for job in candidates:
+            now = datetime.utcnow()
+            # Conditional update so concurrent processes never claim the same job
+            claimed = IngestJob.query.filter_by(id=job.id, status=IngestJob.STATUS_QUEUED).update({
+                'status': IngestJob.STATUS_RUNNING,
+                'attempts': IngestJob.attempts + 1,
+                'started_at': db.func.coalesce(IngestJob.started_at, now),
+                'heartbeat_at': now
+            }, synchronize_session=False)
+            db.session.commit()
+            if not claimed:
+                continue
+
+            # Retries resume after the last page batch that was persisted
+            args = (
+                run_extraction_job, job.id, job.file_path, job.pages_processed,
+                self.app.config['PDF_EXTRACT_WORKERS'], self.app.config['PDF_EXTRACT_CHUNK_PAGES'],
+                self.app.config['INGEST_BATCH_PAGES']
+            )
+            try:
+                future = self._executor.submit(*args)
+            except BrokenProcessPool:
+                self._executor = self._new_executor()
+                future = self._executor.submit(*args)
+            self._inflight[future] = job.id
+
+    def _complete(self, job):
+        document = db.session.get(Document, job.document_id) if job.document_id else None
+        if document is None or job.words_processed == 0:
+            self._fail(job, 'PDF appears to be empty or contains no readable text.')
+            return
+
+        document.is_complete = True
+        compress_started = time.perf_counter()
+        try:
+            # Compress once here so /api/words never encodes or compresses per request
+            write_word_payloads(document, self.app.config['WORD_STORE_FOLDER'])
+        except OSError as e:
+            self.app.logger.error(f"Could not write word payloads for document {document.id}: {str(e)}")
+        metrics.observe_stages([('compress', time.perf_counter() - compress_started)])
+        job.status = IngestJob.STATUS_DONE
+        job.error = None
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+    def _fail(self, job, message, commit=True):
+        job.status = IngestJob.STATUS_FAILED
+        job.error = message
+        job.finished_at = datetime.utcnow()
+        # Drop the partially extracted document along with the upload
+        document = None
+        if job.document_id:
+            document = db.session.get(Document, job.document_id)
+            if document is not None:
+                db.session.delete(document)
+                document_cache.invalidate(document.id)
+            job.document_id = None
+        db.session.flush()
+        # The upload may be shared with other documents; only the last owner removes it
+        if document is not None:
+            release_document_files(
+                self.app.config['WORD_STORE_FOLDER'], document.file_path, document.word_store, document.words_hash
+            )
+        else:
+            release_file(job.file_path)
+        if commit:
+            db.session.commit()
+
+    def _retry_or_fail(self, job, message, commit=True):
+        if job.attempts >= self.app.config['INGEST_MAX_ATTEMPTS']:
+            self._fail(job, message, commit=commit)
+            return
+        job.status = IngestJob.STATUS_QUEUED
+        job.error = message
+        if commit:
+            db.session.commit()
+
+
+ingest_queue = IngestQueue()
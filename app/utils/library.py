@@ -0,0 +1,84 @@
+from datetime import datetime
+from app import db
+from app.models.document import Document
+from app.models.progress import ReadingProgress
+
+# Only what the library page shows; the blob columns are never loaded
+LISTING_COLUMNS = (
+    Document.id,
+    Document.original_name,
+    Document.word_count,
+    Document.is_complete,
+    Document.created_at
+)
+
+
+def progress_percentage(last_word_index, word_count):
+    """Percentage of a document read, rounded to one decimal."""
+    return round((last_word_index / word_count * 100) if last_word_index and word_count > 0 else 0, 1)
+
+
+def encode_cursor(document):
+    """Keyset cursor pointing just past a document in newest-first order."""
+    return f'{document.created_at.isoformat()}_{document.id}'
+
+
+def decode_cursor(cursor):
+    """Parse a cursor from encode_cursor; returns None if it is malformed."""
+    try:
+        created_at, doc_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(doc_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def library_page(user_id, per_page, cursor=None):
+    """
+    Fetch one page of a user's library, newest first, with reading progress.
+
+    Documents and their progress come back from a single joined query that
+    seeks past the cursor on (created_at, id) instead of using OFFSET.
+    Returns (items, next cursor or None).
+    """
+    query = db.session.query(Document, ReadingProgress.last_word_index)\
+        .outerjoin(ReadingProgress, db.and_(
+            ReadingProgress.document_id == Document.id,
+            ReadingProgress.user_id == user_id
+        ))\
+        .filter(Document.user_id == user_id)\
+        .options(db.load_only(*LISTING_COLUMNS))
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        query = query.filter(db.tuple_(Document.created_at, Document.id) < position)
+
+    # One extra row tells whether there is a next page
+    rows = query.order_by(Document.created_at.desc(), Document.id.desc()).limit(per_page + 1).all()
+
+    items = [{
+        'document': document,
+        'progress': last_word_index or 0,
+        'percentage': progress_percentage(last_word_index, document.word_count)
+    } for document, last_word_index in rows[:per_page]]
+
+    next_cursor = encode_cursor(rows[per_page - 1][0]) if len(rows) > per_page else None
+    return items, next_cursor
+
+
+def library_stats(user_id):
+    """Totals for the library stats bar, computed in one aggregate query."""
+    percentage = db.func.round(ReadingProgress.last_word_index * 100.0 / Document.word_count, 1)
+    total_books, total_words, completed = db.session.query(
+        db.func.count(Document.id),
+        db.func.coalesce(db.func.sum(Document.word_count), 0),
+        db.func.coalesce(db.func.sum(db.case((percentage == 100, 1), else_=0)), 0)
+    ).outerjoin(ReadingProgress, db.and_(
+        ReadingProgress.document_id == Document.id,
+        ReadingProgress.user_id == user_id
+    )).filter(Document.user_id == user_id).one()
+
+    return {
+        'total_books': total_books,
+        'total_words': total_words,
+        'completed': completed
+    }
@@ -0,0 +1,238 @@
+import bisect
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Histogram bucket upper bounds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = tuple(1024 * 4 ** power for power in range(9))  # 1 KiB to 64 MiB
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+
+class Gauge:
+    """Value read from a callback at scrape time, returning {label tuple: value}."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self):
+        for labels, value in sorted(self.callback().items()):
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, as Prometheus expects."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [per-bucket counts (last is +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            series = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", _number(bound))])} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}'
+
+
+class Metrics:
+    """
+    Process-wide request, SQL and extraction metrics in Prometheus text format.
+
+    Requests are timed by before/after request hooks and every SQL statement
+    by engine events, summed per request in flask.g so N+1 query patterns
+    show up per endpoint. Statements outside a request (ingest dispatcher,
+    progress flushes) count under context="background". Recording is a
+    perf_counter call and a short locked update, cheap enough to leave on.
+    """
+
+    def __init__(self, app=None):
+        self._metrics = []
+        self._sql_engines = set()
+        self.request_duration = self.register(Histogram(
+            'wordflow_request_duration_seconds', 'Request latency by Flask endpoint.', ('endpoint', 'method')))
+        self.requests = self.register(Counter(
+            'wordflow_requests_total', 'Requests by Flask endpoint and status.', ('endpoint', 'method', 'status')))
+        self.request_sql_queries = self.register(Histogram(
+            'wordflow_request_sql_queries', 'SQL statements executed per request.', ('endpoint',),
+            QUERY_COUNT_BUCKETS))
+        self.request_sql_seconds = self.register(Histogram(
+            'wordflow_request_sql_seconds', 'Total SQL time per request.', ('endpoint',), STAGE_BUCKETS))
+        self.sql_queries = self.register(Counter(
+            'wordflow_sql_queries_total', 'SQL statements executed.', ('context',)))
+        self.sql_seconds = self.register(Counter(
+            'wordflow_sql_seconds_total', 'Time spent executing SQL statements.', ('context',)))
+        self.words_response_bytes = self.register(Histogram(
+            'wordflow_words_response_bytes', 'Size of /api/words response bodies as sent.', ('kind', 'encoding'),
+            SIZE_BUCKETS))
+        self.extraction_stage = self.register(Histogram(
+            'wordflow_extraction_stage_seconds',
+            'PDF ingestion time per stage: open, extract_page, tokenize, serialize, commit, compress.',
+            ('stage',), STAGE_BUCKETS))
+        self.register(Gauge(
+            'wordflow_document_cache', 'Decoded document cache counters.', ('stat',), self._document_cache_stats))
+        self.register(Gauge(
+            'wordflow_preview_cache', 'Page preview cache counters.', ('stat',), self._preview_cache_stats))
+        self.register(Gauge(
+            'wordflow_user_cache', 'Flask-Login user cache counters.', ('stat',), self._user_cache_stats))
+
+        if app is not None:
+            self.init_app(app)
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def init_app(self, app):
+        app.extensions['metrics'] = self
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+        from app import db
+        with app.app_context():
+            engine = db.engine
+        if engine not in self._sql_engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._sql_engines.add(engine)
+
+    def observe_stages(self, stage_timings):
+        """Record (stage, seconds) pairs from the extraction pipeline."""
+        for stage, seconds in stage_timings:
+            self.extraction_stage.observe(seconds, stage)
+
+    def expose(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql = [0, 0.0]  # Statements, seconds
+
+    def _finish_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+
+        endpoint = request.endpoint or '(unmatched)'
+        self.request_duration.observe(time.perf_counter() - started, endpoint, request.method)
+        self.requests.inc(endpoint, request.method, str(response.status_code))
+
+        statements, seconds = g.pop('metrics_sql', (0, 0.0))
+        self.request_sql_queries.observe(statements, endpoint)
+        self.request_sql_seconds.observe(seconds, endpoint)
+
+        if endpoint == 'reader.get_words' and response.status_code == 200 and response.content_length is not None:
+            kind = 'window' if 'start' in request.args or 'page' in request.args else 'full'
+            encoding = response.headers.get('Content-Encoding', 'identity')
+            self.words_response_bytes.observe(response.content_length, kind, encoding)
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('metrics_query_started')
+        if not started:
+            return
+        seconds = time.perf_counter() - started.pop()
+
+        in_request = has_request_context() and 'metrics_sql' in g
+        if in_request:
+            g.metrics_sql[0] += 1
+            g.metrics_sql[1] += seconds
+        context_label = 'request' if in_request else 'background'
+        self.sql_queries.inc(context_label)
+        self.sql_seconds.inc(context_label, amount=seconds)
+
+    def _document_cache_stats(self):
+        from app.utils.doc_cache import document_cache
+        stats = document_cache.stats()
+        return {(name,): stats[name] for name in ('bytes', 'entries', 'hits', 'misses', 'evictions')}
+
+    def _preview_cache_stats(self):
+        from app.utils.page_previews import preview_cache
+        stats = preview_cache.stats()
+        return {(name,): stats[name] for name in ('bytes', 'hits', 'misses', 'renders', 'prewarmed', 'evictions')}
+
+    def _user_cache_stats(self):
+        from app.utils.user_cache import user_cache
+        stats = user_cache.stats()
+        return {(name,): stats[name] for name in ('entries', 'hits', 'misses', 'evictions', 'invalidations')}
+
+
+metrics = Metrics()
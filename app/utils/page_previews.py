@@ -0,0 +1,239 @@
+import atexit
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+PREVIEW_SUFFIX = '.jpg'
+
+
+class PageNotFound(Exception):
+    """The PDF has no page with the requested number."""
+
+
+def render_preview(pdf_path, page_number, width, quality, target_path):
+    """
+    Render 1-based page_number of a PDF as a JPEG width pixels wide.
+
+    Runs in a worker process (pdfium is not thread-safe). The image is
+    written next to target_path and moved into place, so readers never see
+    a partial file. Returns the file size.
+    """
+    import pypdfium2
+
+    pdf = pypdfium2.PdfDocument(pdf_path)
+    try:
+        if not 1 <= page_number <= len(pdf):
+            raise PageNotFound(f'Page {page_number} is out of range.')
+        page = pdf[page_number - 1]
+        try:
+            image = page.render(scale=width / page.get_width()).to_pil()
+        finally:
+            page.close()
+    finally:
+        pdf.close()
+
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    tmp_path = f'{target_path}.{os.getpid()}.tmp'
+    try:
+        image.convert('RGB').save(tmp_path, 'JPEG', quality=quality, optimize=True)
+        os.replace(tmp_path, target_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return os.path.getsize(target_path)
+
+
+class PreviewCache:
+    """
+    Lazily rendered page images in a size-bounded on-disk cache.
+
+    Files are named by the upload's content hash, page and width, so
+    documents sharing an upload share previews and a name never changes
+    meaning. A hit touches the file's mtime, which makes the mtime order the
+    LRU order across processes and restarts; once this process has added
+    more than max_bytes the folder is rescanned and the least recently used
+    files are removed. Rendering runs on a small process pool shared by
+    request misses and prewarming, with identical renders coalesced.
+    """
+
+    def __init__(self, app=None):
+        self.folder = None
+        self.max_bytes = 256 * 1024 * 1024
+        self.width = 360
+        self.quality = 70
+        self.workers = 1
+        self.render_timeout = 30
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        self.prewarmed = 0
+        self.evictions = 0
+        self._bytes = None  # Estimated folder size; None until scanned
+        self._inflight = {}  # Path -> Future
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.folder = app.config['PREVIEW_FOLDER']
+        self.max_bytes = app.config['PREVIEW_CACHE_MAX_BYTES']
+        self.width = app.config['PREVIEW_WIDTH']
+        self.quality = app.config['PREVIEW_QUALITY']
+        self.workers = app.config['PREVIEW_WORKERS']
+        self.render_timeout = app.config['PREVIEW_RENDER_TIMEOUT']
+        app.extensions['preview_cache'] = self
+        atexit.register(self.shutdown)
+
+    def content_key(self, document):
+        """Name previews by upload content; legacy rows without a hash use their file path."""
+        return document.content_sha256 or hashlib.sha256(document.file_path.encode('utf-8')).hexdigest()
+
+    def etag(self, document, page_number):
+        return f'{self.content_key(document)}-{page_number}-{self.width}'
+
+    def preview_path(self, document, page_number):
+        key = self.content_key(document)
+        return os.path.join(self.folder, key[:2], f'{key}-{page_number}-{self.width}{PREVIEW_SUFFIX}')
+
+    def get(self, document, page_number):
+        """
+        Return the JPEG bytes of a page preview, rendering it on a miss.
+
+        Raises PageNotFound for pages the PDF does not have.
+        """
+        path = self.preview_path(document, page_number)
+        data = self._read(path)
+        if data is not None:
+            with self._lock:
+                self.hits += 1
+            return data
+
+        with self._lock:
+            self.misses += 1
+        self._render(document.file_path, page_number, path).result(timeout=self.render_timeout)
+        data = self._read(path)
+        if data is None:
+            # Evicted by another process in between; render once more
+            self._render(document.file_path, page_number, path).result(timeout=self.render_timeout)
+            data = self._read(path) or b''
+        return data
+
+    def prewarm(self, document, page_numbers):
+        """Render missing previews of these pages in the background, as the pool has room."""
+        for page_number in page_numbers:
+            path = self.preview_path(document, page_number)
+            if os.path.exists(path):
+                continue
+            with self._lock:
+                if path in self._inflight or len(self._inflight) >= self.workers * 2:
+                    continue
+            self._render(document.file_path, page_number, path)
+            with self._lock:
+                self.prewarmed += 1
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # Most recently used
+        except FileNotFoundError:
+            pass
+        return data
+
+    def _render(self, pdf_path, page_number, path):
+        with self._lock:
+            future = self._inflight.get(path)
+            if future is not None:
+                return future
+
+            if self._executor is None:
+                self._executor = self._new_executor()
+            args = (render_preview, pdf_path, page_number, self.width, self.quality, path)
+            try:
+                future = self._executor.submit(*args)
+            except BrokenProcessPool:
+                self._executor = self._new_executor()
+                future = self._executor.submit(*args)
+            self._inflight[path] = future
+        future.add_done_callback(lambda done: self._rendered(path, done))
+        return future
+
+    def _rendered(self, path, future):
+        with self._lock:
+            self._inflight.pop(path, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+
+        with self._lock:
+            self.renders += 1
+            if self._bytes is not None:
+                self._bytes += future.result()
+            over = self._bytes is None or self._bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _evict(self):
+        """Rescan the folder and delete least recently used previews down to 90% of max_bytes."""
+        entries = []
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                if not name.endswith(PREVIEW_SUFFIX):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+
+        with self._lock:
+            self._bytes = total
+            self.evictions += evicted
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def shutdown(self):
+        """Stop the render pool; queued prewarm renders are dropped."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """Counters for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'bytes': self._bytes or 0,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'renders': self.renders,
+                'prewarmed': self.prewarmed,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+preview_cache = PreviewCache()
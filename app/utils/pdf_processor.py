@@ -1,6 +1,10 @@
-import pdfplumber
 import re
 import json
+import multiprocessing
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from app.utils.tokenizer import tokenize
 
 
 def is_cjk(char):
@@ -17,42 +21,109 @@ def is_cjk(char):
 def tokenize_text(text):
     """
     Tokenize text into words, handling CJK characters as individual tokens.
+    
+    Delegates to the regex engine in app.utils.tokenizer, which produces the
+    same token stream as splitting on whitespace and CJK characters by hand.
     """
-    if not text:
-        return []
-        
-    words = []
-    current_token = ""
+    return tokenize(text)
+
+
+def _extract_page(page, stage_timings=None):
+    """Extract and tokenize one pdfplumber page, timing both stages if asked."""
+    if stage_timings is None:
+        return tokenize_text(page.extract_text())
     
-    for char in text:
-        if is_cjk(char):
-            # If we have a pending token, add it first
-            if current_token:
-                words.append(current_token)
-                current_token = ""
-            # Add the CJK character as a separate token
-            words.append(char)
-        elif char.isspace():
-            # End of token
-            if current_token:
-                words.append(current_token)
-                current_token = ""
-        else:
-            # Append to current token
-            current_token += char
-            
-    if current_token:
-        words.append(current_token)
-        
+    started = time.perf_counter()
+    text = page.extract_text()
+    extracted = time.perf_counter()
+    words = tokenize_text(text)
+    stage_timings.append(('extract_page', extracted - started))
+    stage_timings.append(('tokenize', time.perf_counter() - extracted))
     return words
 
-def extract_text_from_pdf(file_path):
+
+def _extract_page_range(file_path, start, stop, timed=False):
+    """
+    Tokenize pages [start, stop) of a PDF. Runs in a worker process.
+    
+    Returns (page words, stage timings); timings are empty unless timed.
+    """
+    import pdfplumber
+    
+    stage_timings = [] if timed else None
+    started = time.perf_counter()
+    with pdfplumber.open(file_path) as pdf:
+        if timed:
+            stage_timings.append(('open', time.perf_counter() - started))
+        pages = [_extract_page(pdf.pages[i], stage_timings) for i in range(start, stop)]
+    return pages, stage_timings or []
+
+
+def make_page_boundary(page_num, page_start, next_index):
+    """Build the boundary dict for 0-based page_num whose words end before next_index."""
+    return {
+        'page': page_num + 1,
+        'start': page_start,
+        'end': next_index - 1 if next_index > page_start else page_start
+    }
+
+
+def iter_pdf_pages(file_path, workers=1, chunk_pages=25, start_page=0, stage_timings=None):
+    """
+    Yield (page index, page count, page words) for every page, in page order.
+    
+    With workers > 1 the page list is split into ranges of chunk_pages pages
+    that are extracted in separate processes and yielded back in order.
+    Pages before start_page are skipped (used to resume an interrupted job).
+    If stage_timings is a list, (stage, seconds) pairs for the 'open',
+    'extract_page' and 'tokenize' stages are appended to it as pages go by.
+    """
+    # Imported on first extraction so web workers that never extract skip its cost
+    import pdfplumber
+    
+    started = time.perf_counter()
+    with pdfplumber.open(file_path) as pdf:
+        pages_total = len(pdf.pages)
+        if stage_timings is not None:
+            stage_timings.append(('open', time.perf_counter() - started))
+        
+        if workers <= 1 or pages_total - start_page <= chunk_pages:
+            for page_num in range(start_page, pages_total):
+                yield page_num, pages_total, _extract_page(pdf.pages[page_num], stage_timings)
+            return
+    
+    ranges = [(start, min(start + chunk_pages, pages_total))
+              for start in range(start_page, pages_total, chunk_pages)]
+    executor = ProcessPoolExecutor(
+        max_workers=min(workers, len(ranges)),
+        mp_context=multiprocessing.get_context('spawn')
+    )
+    try:
+        futures = [executor.submit(_extract_page_range, file_path, start, stop, stage_timings is not None)
+                   for start, stop in ranges]
+        for (start, _), future in zip(ranges, futures):
+            pages, range_timings = future.result()
+            if stage_timings is not None:
+                stage_timings.extend(range_timings)
+            for offset, page_words in enumerate(pages):
+                yield start + offset, pages_total, page_words
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def extract_text_from_pdf(file_path, progress_callback=None, workers=1, chunk_pages=25, stage_timings=None):
     """
     Extract text from a PDF file and split into words.
     Also tracks page boundaries for preview.
     
     Args:
         file_path: Path to the PDF file
+        progress_callback: Optional callable invoked after every page as
+            progress_callback(pages_processed, pages_total, words_processed)
+        workers: Number of processes to extract page ranges in parallel
+        chunk_pages: Number of pages per range in parallel mode
+        stage_timings: Optional list that receives (stage, seconds) pairs,
+            as in iter_pdf_pages
         
     Returns:
         tuple: (list of words, word count, list of page boundaries)
@@ -63,22 +134,16 @@ def extract_text_from_pdf(file_path):
     current_index = 0
     
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for page_num, page in enumerate(pdf.pages):
-                text = page.extract_text()
-                page_start = current_index
-                
-                if text:
-                    # Tokenize text with CJK support
-                    page_words = tokenize_text(text)
-                    words.extend(page_words)
-                    current_index += len(page_words)
-                
-                page_boundaries.append({
-                    'page': page_num + 1,
-                    'start': page_start,
-                    'end': current_index - 1 if current_index > page_start else page_start
-                })
+        for page_num, pages_total, page_words in iter_pdf_pages(file_path, workers, chunk_pages,
+                                                                stage_timings=stage_timings):
+            page_start = current_index
+            words.extend(page_words)
+            current_index += len(page_words)
+            
+            page_boundaries.append(make_page_boundary(page_num, page_start, current_index))
+            
+            if progress_callback:
+                progress_callback(page_num + 1, pages_total, current_index)
     except Exception as e:
         raise ValueError(f"Error extracting text from PDF: {str(e)}")
     
@@ -90,6 +155,63 @@ def words_to_json(words):
     return json.dumps(words)
 
 
+def append_to_json_list(json_str, items):
+    """
+    Append items to a JSON array produced by json.dumps without decoding it.
+    
+    The result is identical to json.dumps of the concatenated lists.
+    """
+    if not items:
+        return json_str or '[]'
+    if not json_str or json_str == '[]':
+        return json.dumps(items)
+    return json_str[:-1] + ', ' + json.dumps(items)[1:]
+
+
+# Words between entries of a document's sparse word offset index
+WORD_INDEX_STRIDE = 256
+
+
+def extend_word_offsets(offsets_blob, json_str, new_words, first_index):
+    """
+    Extend a sparse word offset index for words appended to json_str.
+    
+    Entry k is the character offset in the stored JSON array of word
+    k * WORD_INDEX_STRIDE, so a range of words can be cut out of the stored
+    text without decoding the whole document.
+    """
+    offsets = array('I', offsets_blob or b'')
+    position = len(json_str) + 1 if json_str and json_str != '[]' else 1
+    for index, word in enumerate(new_words, first_index):
+        if index % WORD_INDEX_STRIDE == 0:
+            offsets.append(position)
+        position += len(json.dumps(word)) + 2
+    return offsets.tobytes()
+
+
+def word_window_span(offsets_blob, text_length, start, stop):
+    """
+    Locate words [start, stop) in the stored JSON array.
+    
+    Returns:
+        tuple: (first char, end char, words to skip) where the stored text
+        between the two chars is a comma-separated run of JSON strings that
+        begins skip words before start
+    """
+    offsets = array('I', offsets_blob)
+    first_entry = start // WORD_INDEX_STRIDE
+    last_entry = -(-stop // WORD_INDEX_STRIDE)
+    char_start = offsets[first_entry]
+    # Stop before the ", " that precedes the next indexed word, or before "]"
+    char_end = offsets[last_entry] - 2 if last_entry < len(offsets) else text_length - 1
+    return char_start, char_end, start - first_entry * WORD_INDEX_STRIDE
+
+
+def json_fragment_to_words(fragment, skip, count):
+    """Decode a fragment located by word_window_span into count words."""
+    return json.loads('[' + fragment + ']')[skip:skip + count]
+
+
 def json_to_words(json_str):
     """Convert JSON string back to word list."""
     if not json_str:
@@ -0,0 +1,251 @@
+import atexit
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from app import db
+from app.models.document import Document
+from app.models.progress import ReadingProgress
+from app.utils.reading_stats import record_reading
+from app.utils.upsert import upsert
+
+
+class PendingProgress:
+    """Progress updates for one (user, document) that have not been written yet."""
+
+    def __init__(self):
+        self.first_index = None
+        self.first_day = None
+        self.last_index = None
+        self.saved_at = None  # When last_index was saved; the latest save wins across processes
+        self.wpm = None
+        self.font_size = None
+        self.spans = []  # (day, from index, to index) read between buffered updates
+
+    def _read(self, day, start, stop):
+        if stop <= start:
+            return
+        # Continuous reading on one day stays a single span
+        if self.spans and self.spans[-1][0] == day and self.spans[-1][2] == start:
+            self.spans[-1] = (day, self.spans[-1][1], stop)
+        else:
+            self.spans.append((day, start, stop))
+
+    def update(self, day, last_word_index=None, wpm=None, font_size=None, saved_at=None):
+        if last_word_index is not None:
+            if self.last_index is None:
+                self.first_index, self.first_day = last_word_index, day
+            else:
+                self._read(day, self.last_index, last_word_index)
+            self.last_index = last_word_index
+            self.saved_at = saved_at
+        if wpm is not None:
+            self.wpm = wpm
+        if font_size is not None:
+            self.font_size = font_size
+
+    def merge(self, later):
+        """Fold in updates that were recorded after this entry's."""
+        if later.last_index is not None:
+            if self.last_index is None:
+                self.first_index, self.first_day = later.first_index, later.first_day
+            else:
+                self._read(later.first_day, self.last_index, later.first_index)
+            self.last_index = later.last_index
+            self.saved_at = later.saved_at
+        for span in later.spans:
+            self._read(*span)
+        self.wpm = later.wpm if later.wpm is not None else self.wpm
+        self.font_size = later.font_size if later.font_size is not None else self.font_size
+
+    def words_read(self, stored_index):
+        """
+        Words read per day since the stored position, as save_progress counted
+        them. Words up to the stored position are left out: another process
+        may have buffered and counted the same span already.
+        """
+        stored_index = stored_index or 0
+        spans = list(self.spans)
+        if self.first_index is not None:
+            spans.insert(0, (self.first_day, stored_index, self.first_index))
+        words_by_day = defaultdict(int)
+        for day, start, stop in spans:
+            words_by_day[day] += max(0, stop - max(start, stored_index))
+        return {day: words for day, words in words_by_day.items() if words > 0}
+
+
+class ProgressBuffer:
+    """
+    Write-behind buffer for reading progress saves.
+
+    Saves are coalesced in memory per (user, document): the latest position,
+    speed and font size win, and words read are summed per day. A flusher
+    thread writes everything in batched upserts every
+    PROGRESS_FLUSH_INTERVAL seconds, or sooner once PROGRESS_FLUSH_MAX_PENDING
+    documents are waiting, which bounds how much progress a crash can lose.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pending = {}  # (user_id, document_id) -> PendingProgress
+        self._flushing = {}  # Batch being written; still visible to pending() until committed
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Attach to an app; if buffering is enabled, the flusher starts with the first save."""
+        self.app = app
+        app.extensions['progress_buffer'] = self
+
+    def start(self):
+        """Start the background flusher thread."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='wordflow-progress', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def shutdown(self):
+        """Stop the flusher and write out everything still buffered."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            thread.join(timeout=5)
+        with self.app.app_context():
+            self.flush()
+
+    def record(self, user_id, document_id, last_word_index=None, wpm=None, font_size=None):
+        """Buffer one progress save; written synchronously when buffering is off."""
+        with self._lock:
+            entry = self._pending.setdefault((user_id, document_id), PendingProgress())
+            entry.update(date.today(), last_word_index, wpm, font_size, datetime.utcnow())
+            pending_count = len(self._pending)
+
+        # Only processes that take progress saves run a flusher
+        if self._thread is None and self.app.config['PROGRESS_BUFFER_ENABLED']:
+            self.start()
+        if self._thread is None:
+            self.flush()
+        elif pending_count >= self.app.config['PROGRESS_FLUSH_MAX_PENDING']:
+            self._wakeup.set()
+
+    def pending(self, user_id, document_id):
+        """Buffered fields for a document not yet written, so reads see them."""
+        fields = {}
+        with self._lock:
+            for buffered in (self._flushing, self._pending):
+                entry = buffered.get((user_id, document_id))
+                if entry is None:
+                    continue
+                for field, value in (('last_word_index', entry.last_index), ('wpm', entry.wpm),
+                                     ('font_size', entry.font_size)):
+                    if value is not None:
+                        fields[field] = value
+        return fields
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.app.config['PROGRESS_FLUSH_INTERVAL'])
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                self.app.logger.error(f"Progress flush error: {str(e)}")
+
+    def flush(self, keys=None):
+        """Write buffered saves (all, or those for the given keys) in one transaction; returns how many."""
+        with self._flush_lock:
+            with self._lock:
+                if keys is None:
+                    batch, self._pending = self._pending, {}
+                else:
+                    batch = {key: self._pending.pop(key) for key in keys if key in self._pending}
+                self._flushing = batch
+            if not batch:
+                return 0
+
+            try:
+                self._write(batch)
+            except Exception:
+                db.session.rollback()
+                # Put the batch back in front of anything recorded meanwhile
+                with self._lock:
+                    self._flushing = {}
+                    for key, later in self._pending.items():
+                        if key in batch:
+                            batch[key].merge(later)
+                        else:
+                            batch[key] = later
+                    self._pending = batch
+                raise
+            with self._lock:
+                self._flushing = {}
+            return len(batch)
+
+    def _write(self, batch):
+        # Saves for documents deleted since they were buffered are dropped
+        document_ids = {
+            row.id for row in db.session.query(Document.id).filter(Document.id.in_({key[1] for key in batch}))
+        }
+        batch = {key: entry for key, entry in batch.items() if key[1] in document_ids}
+        if not batch:
+            return
+        user_ids = {user_id for user_id, _ in batch}
+        # Take the write lock before reading stored positions, so a flush from
+        # another process cannot write between that read and this upsert
+        db.session.execute(db.text('UPDATE reading_progress SET last_word_index = last_word_index WHERE 1 = 0'))
+        stored = {
+            (row.user_id, row.document_id): row
+            for row in db.session.query(
+                ReadingProgress.user_id, ReadingProgress.document_id, ReadingProgress.last_word_index,
+                ReadingProgress.wpm, ReadingProgress.font_size, ReadingProgress.updated_at
+            ).filter(ReadingProgress.user_id.in_(user_ids), ReadingProgress.document_id.in_(document_ids))
+        }
+
+        now = datetime.utcnow()
+        progress_rows = []
+        reading = []
+        for (user_id, document_id), entry in batch.items():
+            current = stored.get((user_id, document_id))
+            stored_index = current.last_word_index if current else 0
+            wpm = entry.wpm or (current.wpm if current else self.app.config['WPM_DEFAULT'])
+            progress_rows.append({
+                'user_id': user_id,
+                'document_id': document_id,
+                'last_word_index': entry.last_index if entry.last_index is not None else stored_index,
+                'wpm': wpm,
+                'font_size': entry.font_size or (current.font_size if current else self.app.config['FONT_SIZE_DEFAULT']),
+                'updated_at': entry.saved_at or now
+            })
+            for day, words in entry.words_read(stored_index).items():
+                reading.append((user_id, document_id, day, words, wpm))
+
+        # A position saved before the stored one (a save another process
+        # flushed first) must not move the reader back
+        table = ReadingProgress.__table__
+
+        def newer(excluded):
+            return db.or_(table.c.updated_at.is_(None), excluded.updated_at >= table.c.updated_at)
+
+        upsert(ReadingProgress, progress_rows, ['user_id', 'document_id'], {
+            'last_word_index': lambda excluded: db.case(
+                (newer(excluded), excluded.last_word_index), else_=table.c.last_word_index
+            ),
+            'wpm': lambda excluded: excluded.wpm,
+            'font_size': lambda excluded: excluded.font_size,
+            'updated_at': lambda excluded: db.case((newer(excluded), excluded.updated_at), else_=table.c.updated_at)
+        })
+        record_reading(reading)
+        db.session.commit()
+
+
+progress_buffer = ProgressBuffer()
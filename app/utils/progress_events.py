@@ -0,0 +1,136 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+from app import db
+from app.models.document import Document
+from app.models.progress import ReadingProgress
+from app.models.progress_session import ProgressSession
+from app.utils.progress_buffer import progress_buffer
+from app.utils.reading_stats import record_reading
+
+ProgressEvent = namedtuple('ProgressEvent', ['seq', 'document_id', 'day', 'last_word_index', 'wpm', 'font_size'])
+
+
+def parse_progress_event(raw, wpm_min, wpm_max):
+    """
+    Validate one event from a client batch; returns a ProgressEvent or None.
+
+    ``t`` is the client's timestamp in milliseconds; it decides which day the
+    words are counted on and is capped at the current time.
+    """
+    try:
+        seq = int(raw['seq'])
+        document_id = int(raw['document_id'])
+        last_word_index = int(raw['last_word_index']) if raw.get('last_word_index') is not None else None
+        wpm = int(raw['wpm']) if raw.get('wpm') is not None else None
+        font_size = int(raw['font_size']) if raw.get('font_size') is not None else None
+        timestamp = float(raw['t']) / 1000 if raw.get('t') is not None else None
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    if seq <= 0 or (last_word_index is not None and last_word_index < 0):
+        return None
+    now = datetime.now()
+    try:
+        moment = min(datetime.fromtimestamp(timestamp), now) if timestamp is not None else now
+    except (OverflowError, OSError, ValueError):
+        moment = now
+    if wpm is not None:
+        wpm = max(wpm_min, min(wpm_max, wpm))
+    return ProgressEvent(seq, document_id, moment.date(), last_word_index, wpm, font_size)
+
+
+def apply_progress_events(user_id, session_id, events, wpm_default, font_size_default, session_ttl_days):
+    """
+    Apply a batch of progress events from one reader session in one transaction.
+
+    Each (session, document) keeps the highest sequence number applied and the
+    position it left off at. Events at or below that mark are retries or
+    arrived after newer ones and are skipped, so resending a batch is
+    harmless. Words read are the forward steps between applied positions,
+    which add up the same when a late event is skipped. Marks of sessions
+    idle for session_ttl_days are dropped when a new session starts.
+    Single saves for the same documents still in this process's progress
+    buffer are written first, so they never land on top of the events.
+    Returns (applied, ignored) event counts.
+    """
+    progress_buffer.flush({(user_id, event.document_id) for event in events})
+
+    requested = {event.document_id for event in events}
+    owned = {
+        row.id for row in db.session.query(Document.id)
+        .filter(Document.user_id == user_id, Document.id.in_(requested))
+    } if requested else set()
+
+    sessions = {
+        session.document_id: session
+        for session in ProgressSession.query.filter(
+            ProgressSession.session_id == session_id,
+            ProgressSession.user_id == user_id,
+            ProgressSession.document_id.in_(owned)
+        )
+    } if owned else {}
+    progress_rows = {
+        progress.document_id: progress
+        for progress in ReadingProgress.query.filter(
+            ReadingProgress.user_id == user_id,
+            ReadingProgress.document_id.in_(owned)
+        )
+    } if owned else {}
+
+    applied = 0
+    new_session = False
+    reading = []  # (user, document, day, words, wpm at the time)
+    for event in sorted(events, key=lambda e: e.seq):
+        if event.document_id not in owned:
+            continue
+
+        progress = progress_rows.get(event.document_id)
+        if progress is None:
+            progress = ReadingProgress(
+                user_id=user_id,
+                document_id=event.document_id,
+                last_word_index=0,
+                wpm=wpm_default,
+                font_size=font_size_default
+            )
+            db.session.add(progress)
+            progress_rows[event.document_id] = progress
+
+        session = sessions.get(event.document_id)
+        if session is None:
+            session = ProgressSession(
+                session_id=session_id,
+                document_id=event.document_id,
+                user_id=user_id,
+                last_seq=0,
+                last_word_index=progress.last_word_index or 0
+            )
+            db.session.add(session)
+            sessions[event.document_id] = session
+            new_session = True
+
+        if event.seq <= session.last_seq:
+            continue
+
+        if event.wpm is not None:
+            progress.wpm = event.wpm
+        if event.last_word_index is not None:
+            words = max(0, event.last_word_index - session.last_word_index)
+            reading.append((user_id, event.document_id, event.day, words, progress.wpm))
+            session.last_word_index = event.last_word_index
+            progress.last_word_index = event.last_word_index
+        if event.font_size is not None:
+            progress.font_size = event.font_size
+        session.last_seq = event.seq
+        applied += 1
+
+    record_reading(reading)
+
+    if new_session:
+        ProgressSession.query.filter(
+            ProgressSession.user_id == user_id,
+            ProgressSession.updated_at < datetime.utcnow() - timedelta(days=session_ttl_days)
+        ).delete(synchronize_session=False)
+
+    db.session.commit()
+    return applied, len(events) - applied
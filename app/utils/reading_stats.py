@@ -0,0 +1,224 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from app import db
+from app.models.activity import ReadingActivity
+from app.models.daily_stats import DailyReadingStats
+from app.models.document_stats import DocumentReadingStats
+from app.models.user_stats import UserReadingStats
+from app.utils.upsert import upsert
+
+
+def added(column):
+    """Upsert update that adds the incoming value to the stored one."""
+    return lambda excluded: column + getattr(excluded, column.name)
+
+
+def later_date(column):
+    """Upsert update that keeps the later of the stored and incoming dates."""
+    return lambda excluded: db.case((getattr(excluded, column.name) > column, getattr(excluded, column.name)), else_=column)
+
+
+def earlier_date(column):
+    """Upsert update that keeps the earlier of the stored and incoming dates."""
+    return lambda excluded: db.case((getattr(excluded, column.name) < column, getattr(excluded, column.name)), else_=column)
+
+
+def record_reading(entries, replay=False):
+    """
+    Record words read and keep every reading rollup up to date.
+
+    entries is an iterable of (user_id, document_id, day, words, wpm). Minutes
+    are words / wpm. The raw activity rows, the per-day and per-document
+    rollups and each user's totals and streaks are all updated in the
+    caller's transaction, so stats never need to scan history. With replay,
+    entries are existing activity rows being rolled up again and
+    reading_activity itself is left alone. The caller commits the session.
+    """
+    activity = defaultdict(lambda: [0, 0.0])  # (user, document, day) -> [words, minutes]
+    for user_id, document_id, day, words, wpm in entries:
+        if words > 0:
+            totals = activity[(user_id, document_id, day)]
+            totals[0] += words
+            totals[1] += words / max(wpm or 1, 1)
+    if not activity:
+        return
+
+    user_ids = {key[0] for key in activity}
+    days = {key[2] for key in activity}
+    # Which (user, document, day) and (user, day) pairs are being read for the first time
+    seen_activity = set() if replay else {tuple(row) for row in db.session.query(
+        ReadingActivity.user_id, ReadingActivity.document_id, ReadingActivity.date
+    ).filter(ReadingActivity.user_id.in_(user_ids), ReadingActivity.date.in_(days))}
+    seen_days = {tuple(row) for row in db.session.query(DailyReadingStats.user_id, DailyReadingStats.date)
+                 .filter(DailyReadingStats.user_id.in_(user_ids), DailyReadingStats.date.in_(days))}
+
+    now = datetime.utcnow()
+    daily = defaultdict(lambda: [0, 0.0])
+    per_document = {}
+    for (user_id, document_id, day), (words, minutes) in activity.items():
+        daily[(user_id, day)][0] += words
+        daily[(user_id, day)][1] += minutes
+        row = per_document.setdefault((user_id, document_id), {
+            'user_id': user_id, 'document_id': document_id, 'words_read': 0, 'minutes_read': 0.0,
+            'days_read': 0, 'first_read_date': day, 'last_read_date': day
+        })
+        row['words_read'] += words
+        row['minutes_read'] += minutes
+        row['days_read'] += (user_id, document_id, day) not in seen_activity
+        row['first_read_date'] = min(row['first_read_date'], day)
+        row['last_read_date'] = max(row['last_read_date'], day)
+
+    if not replay:
+        activity_table = ReadingActivity.__table__.c
+        upsert(ReadingActivity, [{
+            'user_id': user_id, 'document_id': document_id, 'date': day,
+            'words_read': words, 'minutes_read': minutes, 'created_at': now
+        } for (user_id, document_id, day), (words, minutes) in activity.items()],
+            ['user_id', 'document_id', 'date'],
+            {'words_read': added(activity_table.words_read), 'minutes_read': added(activity_table.minutes_read)})
+
+    daily_table = DailyReadingStats.__table__.c
+    upsert(DailyReadingStats, [{
+        'user_id': user_id, 'date': day, 'words_read': words, 'minutes_read': minutes
+    } for (user_id, day), (words, minutes) in daily.items()],
+        ['user_id', 'date'],
+        {'words_read': added(daily_table.words_read), 'minutes_read': added(daily_table.minutes_read)})
+
+    document_table = DocumentReadingStats.__table__.c
+    upsert(DocumentReadingStats, list(per_document.values()), ['user_id', 'document_id'], {
+        'words_read': added(document_table.words_read),
+        'minutes_read': added(document_table.minutes_read),
+        'days_read': added(document_table.days_read),
+        'first_read_date': earlier_date(document_table.first_read_date),
+        'last_read_date': later_date(document_table.last_read_date)
+    })
+
+    user_stats = {stats.user_id: stats for stats in UserReadingStats.query.filter(UserReadingStats.user_id.in_(user_ids))}
+    for (user_id, day), (words, minutes) in sorted(daily.items(), key=lambda item: item[0][1]):
+        stats = user_stats.get(user_id)
+        if stats is None:
+            stats = UserReadingStats(user_id=user_id, total_words=0, total_minutes=0.0, days_read=0,
+                                     current_streak=0, longest_streak=0)
+            db.session.add(stats)
+            user_stats[user_id] = stats
+        stats.total_words += words
+        stats.total_minutes += minutes
+        if (user_id, day) not in seen_days:
+            stats.days_read += 1
+            extend_streak(stats, day)
+
+
+def extend_streak(stats, day):
+    """Update a user's streak for a day on which they read for the first time."""
+    last = stats.last_read_date
+    if last is None or day > last + timedelta(days=1):
+        stats.current_streak = 1
+        stats.last_read_date = day
+    elif day == last + timedelta(days=1):
+        stats.current_streak += 1
+        stats.last_read_date = day
+    elif day < last:
+        # A late event filled in an earlier day, which may join two runs
+        db.session.flush()
+        stats.current_streak = streak_ending(stats.user_id, last)
+        # The joined run need not reach last_read_date, so count it around day
+        run = streak_ending(stats.user_id, day) + streak_starting(stats.user_id, day + timedelta(days=1))
+        stats.longest_streak = max(stats.longest_streak, run)
+    stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+
+
+def streak_ending(user_id, last_day):
+    """Count consecutive reading days ending at last_day from the daily rollup."""
+    streak = 0
+    expected = last_day
+    for (day,) in db.session.query(DailyReadingStats.date)\
+            .filter(DailyReadingStats.user_id == user_id, DailyReadingStats.date <= last_day)\
+            .order_by(DailyReadingStats.date.desc())\
+            .yield_per(64):
+        if day != expected:
+            break
+        streak += 1
+        expected = day - timedelta(days=1)
+    return streak
+
+
+def streak_starting(user_id, first_day):
+    """Count consecutive reading days starting at first_day from the daily rollup."""
+    streak = 0
+    expected = first_day
+    for (day,) in db.session.query(DailyReadingStats.date)\
+            .filter(DailyReadingStats.user_id == user_id, DailyReadingStats.date >= first_day)\
+            .order_by(DailyReadingStats.date)\
+            .yield_per(64):
+        if day != expected:
+            break
+        streak += 1
+        expected = day + timedelta(days=1)
+    return streak
+
+
+def reading_summary(user_id, today=None):
+    """Totals, streaks and the last seven days for a user, from the rollups only."""
+    today = today or date.today()
+    stats = db.session.get(UserReadingStats, user_id)
+    week_start = today - timedelta(days=6)
+    week = {
+        day: (words, minutes) for day, words, minutes in db.session.query(
+            DailyReadingStats.date, DailyReadingStats.words_read, DailyReadingStats.minutes_read
+        ).filter(DailyReadingStats.user_id == user_id, DailyReadingStats.date >= week_start,
+                 DailyReadingStats.date <= today)
+    }
+    days = [week_start + timedelta(days=offset) for offset in range(7)]
+
+    return {
+        'total_words': stats.total_words if stats else 0,
+        'total_minutes': round(stats.total_minutes, 1) if stats else 0.0,
+        'days_read': stats.days_read if stats else 0,
+        'current_streak': stats.active_streak(today) if stats else 0,
+        'longest_streak': stats.longest_streak if stats else 0,
+        'last_read_date': stats.last_read_date.isoformat() if stats and stats.last_read_date else None,
+        'today': {
+            'words_read': week.get(today, (0, 0.0))[0],
+            'minutes_read': round(week.get(today, (0, 0.0))[1], 1)
+        },
+        'this_week': {
+            'words_read': sum(words for words, _ in week.values()),
+            'minutes_read': round(sum(minutes for _, minutes in week.values()), 1),
+            'days': [{
+                'date': day.isoformat(),
+                'words_read': week.get(day, (0, 0.0))[0],
+                'minutes_read': round(week.get(day, (0, 0.0))[1], 1)
+            } for day in days]
+        }
+    }
+
+
+def rebuild_reading_stats():
+    """
+    Recompute every rollup from reading_activity, for data recorded before the
+    rollups existed. Minutes use each document's current WPM. The caller
+    commits the session.
+    """
+    from app.models.progress import ReadingProgress
+
+    DailyReadingStats.query.delete()
+    DocumentReadingStats.query.delete()
+    UserReadingStats.query.delete()
+    wpm_by_document = {
+        (user_id, document_id): wpm for user_id, document_id, wpm in
+        db.session.query(ReadingProgress.user_id, ReadingProgress.document_id, ReadingProgress.wpm)
+    }
+
+    by_day = defaultdict(list)
+    activities = ReadingActivity.query.order_by(ReadingActivity.date).all()
+    for activity in activities:
+        wpm = wpm_by_document.get((activity.user_id, activity.document_id))
+        activity.minutes_read = (activity.words_read or 0) / max(wpm or 1, 1)
+        by_day[activity.date].append((activity.user_id, activity.document_id, activity.date,
+                                      activity.words_read or 0, wpm))
+
+    # Oldest first so streaks build up as they originally did
+    for day in sorted(by_day):
+        record_reading(by_day[day], replay=True)
+        db.session.flush()
+    return len(activities)
@@ -0,0 +1,262 @@
+import re
+from app import db
+from app.models.document import Document
+from app.models.search_source import SearchSource
+from app.utils.pdf_processor import json_to_page_boundaries, tokenize_text
+from app.utils.word_store import WordStore
+
+# Words are indexed in passages of at most this many words, never spanning pages
+PASSAGE_WORDS = 64
+
+# Passage rowids are source id * stride + passage number
+PASSAGE_ROWID_STRIDE = 1 << 24
+
+# Words read from a word store per index_pages call when catching up
+CATCH_UP_WORDS = 50000
+
+# Marks highlight() puts around matched tokens; stripped from indexed words
+MATCH_START = '\x01'
+MATCH_END = '\x02'
+_STRIP_MARKS = str.maketrans('', '', MATCH_START + MATCH_END)
+
+# Words of context shown before and after a hit
+SNIPPET_BEFORE = 8
+SNIPPET_AFTER = 24
+
+# One passage per row; unicode61 folds case and diacritics. Each word is one or
+# more tokens, and CJK characters are already separate words.
+CREATE_SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_passages USING fts5("
+    "body, start UNINDEXED, page UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+# A quoted phrase or a bare term, optionally ending in * for a prefix search
+_QUERY_PART_RE = re.compile(r'"([^"]*)"?|(\S+)')
+_HAS_TOKEN_RE = re.compile(r'[^\W_]')
+
+
+def create_search_table():
+    """Create the FTS5 passage table if it does not exist."""
+    db.session.execute(db.text(CREATE_SEARCH_TABLE))
+
+
+def _source(word_store):
+    source = SearchSource.query.filter_by(word_store=word_store).first()
+    if source is None:
+        source = SearchSource(word_store=word_store, words_indexed=0, passages=0)
+        db.session.add(source)
+        db.session.flush()
+    return source
+
+
+def index_pages(word_store, first_page, first_index, pages):
+    """
+    Add pages of words to a word store's search index; the caller commits.
+
+    pages is a list of word lists for 0-based pages first_page onwards, whose
+    first word is word first_index of the store. Returns False without
+    indexing if the index does not end at first_index (a duplicate batch, or
+    earlier words that index_word_store has to catch up on first).
+    """
+    source = _source(word_store)
+    if source.words_indexed != first_index:
+        return False
+
+    rows = []
+    start = first_index
+    for offset, words in enumerate(pages):
+        for passage_start in range(0, len(words), PASSAGE_WORDS):
+            passage = words[passage_start:passage_start + PASSAGE_WORDS]
+            rows.append({
+                'rowid': source.id * PASSAGE_ROWID_STRIDE + source.passages + len(rows),
+                'body': ' '.join(word.translate(_STRIP_MARKS) for word in passage),
+                'start': start + passage_start,
+                'page': first_page + offset + 1
+            })
+        start += len(words)
+
+    if rows:
+        db.session.execute(db.text(
+            'INSERT INTO search_passages (rowid, body, start, page) VALUES (:rowid, :body, :start, :page)'
+        ), rows)
+    source.words_indexed = start
+    source.passages += len(rows)
+    return True
+
+
+def index_word_store(folder, word_store, word_count, page_boundaries):
+    """
+    Index words of a word store that are not searchable yet; the caller commits.
+
+    Pages come from the document's page boundaries JSON (page i holds words
+    from its start up to the next page's start). Documents without page
+    boundaries are indexed as a single page.
+    """
+    source = _source(word_store)
+    if source.words_indexed >= word_count:
+        return
+
+    boundaries = json_to_page_boundaries(page_boundaries) or [{'page': 1, 'start': 0}]
+    page_starts = [boundary['start'] for boundary in boundaries] + [word_count]
+    with WordStore(folder, word_store) as store:
+        first_page = None
+        ranges = []
+        for page_num in range(len(boundaries)):
+            start = max(page_starts[page_num], source.words_indexed)
+            stop = min(page_starts[page_num + 1], word_count)
+            if stop <= source.words_indexed:
+                continue
+            if first_page is None:
+                first_page = page_num
+            ranges.append((start, stop))
+            if ranges[-1][1] - ranges[0][0] >= CATCH_UP_WORDS or page_num == len(boundaries) - 1:
+                words = store.words(ranges[0][0], ranges[-1][1])
+                base = ranges[0][0]
+                pages = [words[start - base:stop - base] for start, stop in ranges]
+                index_pages(word_store, first_page, ranges[0][0], pages)
+                first_page = None
+                ranges = []
+
+
+def delete_search_index(word_store):
+    """Remove a word store's passages from the search index; the caller commits."""
+    source = SearchSource.query.filter_by(word_store=word_store).first()
+    if source is None:
+        return
+    db.session.execute(db.text(
+        'DELETE FROM search_passages WHERE rowid >= :low AND rowid < :high'
+    ), {'low': source.id * PASSAGE_ROWID_STRIDE, 'high': (source.id + 1) * PASSAGE_ROWID_STRIDE})
+    db.session.delete(source)
+
+
+def clear_search_index():
+    """Drop every indexed passage so the index can be rebuilt; the caller commits."""
+    db.session.execute(db.text('DELETE FROM search_passages'))
+    SearchSource.query.delete()
+
+
+def build_match_query(query):
+    """
+    Translate a user query into an FTS5 MATCH expression, or None if it has
+    no searchable words.
+
+    Bare words must all occur in a passage; "quoted text" must occur as a
+    phrase, as must a run of CJK characters. A trailing * makes the last
+    token a prefix.
+    """
+    parts = []
+    for match in _QUERY_PART_RE.finditer(query):
+        text = match.group(1) if match.group(1) is not None else match.group(2)
+        prefix = match.group(2) is not None and text.endswith('*')
+        tokens = [token for token in tokenize_text(text.rstrip('*') if prefix else text)
+                  if _HAS_TOKEN_RE.search(token)]
+        if not tokens:
+            continue
+        phrase = '"' + ' '.join(tokens).replace('"', '""') + '"'
+        parts.append(phrase + ' *' if prefix else phrase)
+    return ' AND '.join(parts) if parts else None
+
+
+def _hit_position(marked):
+    """Split a highlighted passage into words; returns (words, first matched word, matched words)."""
+    words = marked.split(' ')
+    matched = []
+    inside = False
+    for position, word in enumerate(words):
+        if MATCH_START in word:
+            inside = True
+        if inside:
+            matched.append(position)
+        if MATCH_END in word:
+            inside = False
+    return [word.translate(_STRIP_MARKS) for word in words], matched[0] if matched else 0, matched
+
+
+def user_rowid_ranges(user_id):
+    """
+    Passage rowid ranges [low, high) of the word stores a user's documents
+    use, with consecutive sources merged into one range. Returns the ranges
+    and each source's documents of the user as [(id, name)].
+    """
+    documents = {}
+    for source_id, document_id, document_name in db.session.query(
+        SearchSource.id, Document.id, Document.original_name
+    ).join(Document, Document.word_store == SearchSource.word_store)\
+            .filter(Document.user_id == user_id).order_by(SearchSource.id, Document.id):
+        documents.setdefault(source_id, []).append((document_id, document_name))
+
+    ranges = []
+    for source_id in documents:
+        if ranges and ranges[-1][1] == source_id:
+            ranges[-1][1] = source_id + 1
+        else:
+            ranges.append([source_id, source_id + 1])
+    return [(low * PASSAGE_ROWID_STRIDE, high * PASSAGE_ROWID_STRIDE) for low, high in ranges], documents
+
+
+def search_library(user_id, query, limit=20):
+    """
+    Rank a user's passages against query with BM25.
+
+    Returns a list of hits, best first, each with the document, the exact
+    word index of the first matched word, its 1-based page and a snippet of
+    the passage around it. Phrases that cross a passage boundary are not
+    found.
+    """
+    match_query = build_match_query(query)
+    if match_query is None:
+        return []
+
+    # MATCH only within the rowid ranges of the user's word stores, so other
+    # users' passages are never scanned; bm25 uses table-wide statistics, so
+    # scores from different ranges compare directly
+    ranges, documents = user_rowid_ranges(user_id)
+    ranked = []
+    for low, high in ranges:
+        for rowid, score in db.session.execute(db.text(
+            'SELECT rowid, bm25(search_passages) AS score FROM search_passages '
+            'WHERE search_passages MATCH :query AND rowid >= :low AND rowid < :high '
+            'ORDER BY score LIMIT :limit'
+        ), {'query': match_query, 'low': low, 'high': high, 'limit': limit}):
+            for document_id, document_name in documents[rowid // PASSAGE_ROWID_STRIDE]:
+                ranked.append((rowid, document_id, document_name, score))
+    ranked = sorted(ranked, key=lambda row: (row[3], row[0], row[1]))[:limit]
+    if not ranked:
+        return []
+
+    # Highlight only the passages that made the cut
+    rowids = sorted({row[0] for row in ranked})
+    passages = {
+        rowid: (start, page, marked)
+        for rowid, start, page, marked in db.session.execute(db.text(
+            f'SELECT rowid, start, page, highlight(search_passages, 0, :open, :close) FROM search_passages '
+            f'WHERE search_passages MATCH :query AND rowid IN ({", ".join(str(rowid) for rowid in rowids)})'
+        ), {'open': MATCH_START, 'close': MATCH_END, 'query': match_query})
+    }
+
+    hits = []
+    for rowid, document_id, document_name, score in ranked:
+        start, page, marked = passages[rowid]
+        words, position, matched = _hit_position(marked)
+        snippet_start = max(0, position - SNIPPET_BEFORE)
+        snippet_stop = position + SNIPPET_AFTER
+        hits.append({
+            'document_id': document_id,
+            'document_name': document_name,
+            'word_index': start + position,
+            'page': page,
+            'snippet': ' '.join(words[snippet_start:snippet_stop]),
+            'snippet_start': start + snippet_start,
+            'matches': [start + index for index in matched if snippet_start <= index < snippet_stop],
+            'score': -score
+        })
+    return hits
+
+
+def unindexed_documents(after_id, limit):
+    """Documents with words that are not searchable yet, by id after after_id."""
+    return Document.query.outerjoin(SearchSource, SearchSource.word_store == Document.word_store).filter(
+        Document.id > after_id,
+        Document.word_store.isnot(None),
+        db.or_(SearchSource.id.is_(None), SearchSource.words_indexed < Document.word_count)
+    ).order_by(Document.id).limit(limit).all()
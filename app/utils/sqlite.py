@@ -0,0 +1,14 @@
+from sqlalchemy import event
+
+
+def configure_sqlite(engine, pragmas):
+    """Apply PRAGMA settings to every new connection of a SQLite engine."""
+    if engine.dialect.name != 'sqlite':
+        return
+    
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
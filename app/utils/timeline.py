@@ -0,0 +1,66 @@
+from datetime import date, datetime
+from app import db
+from app.models.activity import ReadingActivity
+from app.models.document import Document
+
+# Served by the covering timeline index; only the document name comes from elsewhere
+TIMELINE_COLUMNS = (
+    ReadingActivity.id,
+    ReadingActivity.document_id,
+    ReadingActivity.date,
+    ReadingActivity.created_at,
+    ReadingActivity.words_read,
+    ReadingActivity.minutes_read,
+    Document.original_name
+)
+
+
+def encode_cursor(row):
+    """Keyset cursor pointing just past an activity row in newest-first order."""
+    return f'{row.date.isoformat()}_{row.created_at.isoformat()}_{row.id}'
+
+
+def decode_cursor(cursor):
+    """Parse a cursor from encode_cursor; returns None if it is malformed."""
+    try:
+        day, created_at, activity_id = cursor.split('_')
+        return date.fromisoformat(day), datetime.fromisoformat(created_at), int(activity_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def timeline_page(user_id, per_page, cursor=None):
+    """
+    Fetch one page of a user's reading activity, newest first.
+
+    Activity rows and their document names come back from a single joined
+    query that seeks past the cursor on (date, created_at, id) along the
+    covering timeline index, so a deep page costs the same as the first and
+    no count is needed. Returns (entries, next cursor or None).
+    """
+    query = db.session.query(*TIMELINE_COLUMNS)\
+        .join(Document, Document.id == ReadingActivity.document_id)\
+        .filter(ReadingActivity.user_id == user_id)
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        query = query.filter(
+            db.tuple_(ReadingActivity.date, ReadingActivity.created_at, ReadingActivity.id) < position
+        )
+
+    # One extra row tells whether there is a next page
+    rows = query.order_by(
+        ReadingActivity.date.desc(), ReadingActivity.created_at.desc(), ReadingActivity.id.desc()
+    ).limit(per_page + 1).all()
+
+    entries = [{
+        'id': row.id,
+        'document_id': row.document_id,
+        'document_name': row.original_name,
+        'date': row.date,
+        'words_read': row.words_read,
+        'minutes_read': row.minutes_read
+    } for row in rows[:per_page]]
+
+    next_cursor = encode_cursor(rows[per_page - 1]) if len(rows) > per_page else None
+    return entries, next_cursor
@@ -0,0 +1,37 @@
+import re
+
+# Code point ranges whose characters are emitted as single-character tokens
+CJK_RANGES = (
+    (0x4E00, 0x9FFF),  # CJK Unified Ideographs
+    (0x3400, 0x4DBF),  # CJK Unified Ideographs Extension A
+    (0x3040, 0x309F),  # Hiragana
+    (0x30A0, 0x30FF),  # Katakana
+    (0xAC00, 0xD7AF),  # Hangul Syllables
+)
+
+_CJK_CLASS = ''.join(f'\\u{low:04x}-\\u{high:04x}' for low, high in CJK_RANGES)
+
+# A token is either one CJK character or a run of anything that is neither
+# whitespace nor CJK. For str patterns ``\s`` matches exactly str.isspace().
+TOKEN_RE = re.compile(f'[{_CJK_CLASS}]|[^\\s{_CJK_CLASS}]+')
+CJK_RE = re.compile(f'[{_CJK_CLASS}]')
+
+
+def tokenize(text):
+    """Split text into word tokens, emitting each CJK character as its own token."""
+    if not text:
+        return []
+    # Text without CJK is a plain whitespace split (str.split uses str.isspace)
+    if CJK_RE.search(text) is None:
+        return text.split()
+    return TOKEN_RE.findall(text)
+
+
+def iter_tokens(texts):
+    """
+    Stream tokens from an iterable of texts (e.g. one string per PDF page).
+
+    Token boundaries never span texts, matching tokenize() applied per text.
+    """
+    for text in texts:
+        yield from tokenize(text)
@@ -0,0 +1,17 @@
+from app import db
+
+
+def upsert(model, rows, index_elements, update_columns):
+    """Insert rows or update them in place when they collide on a unique index."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    statement = insert(model.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: update_columns[column](statement.excluded) for column in update_columns}
+    )
+    db.session.execute(statement, rows)
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached, object_session
+
+# Never cached, so a password check always reads the stored hash
+UNCACHED_COLUMNS = {'password_hash'}
+
+
+class UserCache:
+    """
+    Process-local cache of the users Flask-Login loads on every request.
+
+    Entries are column snapshots, never ORM instances (those belong to one
+    session), bounded by a TTL and a maximum count with least recently used
+    eviction. A hit is attached to the request's session without a query.
+    Writes to a user row in this process drop its entry when they are
+    flushed and again when they commit; other processes see the change once
+    the TTL expires.
+    """
+
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # user id -> (expires at, column values)
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        self.enabled = app.config['USER_CACHE_ENABLED']
+        self.ttl = app.config['USER_CACHE_TTL']
+        self.max_entries = app.config['USER_CACHE_MAX_ENTRIES']
+        app.extensions['user_cache'] = self
+
+        if not self._listening:
+            from app import db
+            from app.models.user import User
+            event.listen(User, 'after_update', self._user_changed)
+            event.listen(User, 'after_delete', self._user_changed)
+            event.listen(db.session, 'after_commit', self._after_commit)
+            self._listening = True
+
+    def load(self, user_id):
+        """Return the user with this id attached to the current session, or None."""
+        from app import db
+        from app.models.user import User
+
+        if not self.enabled:
+            return db.session.get(User, user_id)
+
+        values = self._get(user_id)
+        if values is None:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                self._put(user_id, {
+                    column.key: getattr(user, column.key)
+                    for column in User.__table__.columns if column.key not in UNCACHED_COLUMNS
+                })
+            return user
+
+        user = User(**values)
+        # Loaded state as if read by a query; uncached columns load on first access
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def _get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def _put(self, user_id, values):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        """Drop a user's cached entry."""
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _user_changed(self, mapper, connection, user):
+        self.invalidate(user.id)
+        # A request that read the old row before this commit may cache it again
+        object_session(user).info.setdefault('user_cache_changed', set()).add(user.id)
+
+    def _after_commit(self, session):
+        for user_id in session.info.pop('user_cache_changed', ()):
+            self.invalidate(user_id)
+
+    def stats(self):
+        """Counters for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+user_cache = UserCache()
@@ -0,0 +1,259 @@
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import struct
+import uuid
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip payloads are written without it
+    brotli = None
+
+DATA_SUFFIX = '.dat'
+INDEX_SUFFIX = '.idx'
+OFFSET = struct.Struct('<Q')
+
+# Every /api/words payload starts with the words array
+WORDS_PAYLOAD_PREFIX = b'{"words": ['
+
+# Precompressed full-document /api/words payloads, by Content-Encoding
+PAYLOAD_SUFFIXES = {'br': '.json.br', 'gzip': '.json.gz'}
+
+
+def new_word_store_key():
+    """Generate a key for a new word store."""
+    return uuid.uuid4().hex
+
+
+def word_store_paths(folder, key):
+    """Return (data path, index path) for a word store key."""
+    directory = os.path.join(folder, key[:2])
+    return os.path.join(directory, key + DATA_SUFFIX), os.path.join(directory, key + INDEX_SUFFIX)
+
+
+def word_payload_paths(folder, words_hash):
+    """Return {content coding: path} for the precompressed payloads with this hash."""
+    directory = os.path.join(folder, words_hash[:2])
+    return {coding: os.path.join(directory, words_hash + suffix) for coding, suffix in PAYLOAD_SUFFIXES.items()}
+
+
+def encode_word(word):
+    """Encode one word as a UTF-8 JSON string followed by a comma."""
+    return json.dumps(word, ensure_ascii=False).encode('utf-8', 'replace') + b','
+
+
+def append_words(folder, key, words, word_count):
+    """
+    Append words to a word store whose committed length is word_count.
+
+    The data file holds every word as a JSON string followed by a comma, so any
+    run of words is already the body of a JSON array. The index file holds
+    word_count + 1 little-endian uint64 offsets: word i spans
+    [offset[i], offset[i + 1]) in the data file. Anything written past
+    word_count (by a writer that crashed before committing) is discarded first.
+    """
+    data_path, index_path = word_store_paths(folder, key)
+    if not os.path.exists(index_path):
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        with open(data_path, 'wb'), open(index_path, 'wb') as index_file:
+            index_file.write(OFFSET.pack(0))
+
+    with open(index_path, 'r+b') as index_file, open(data_path, 'r+b') as data_file:
+        index_file.seek(word_count * OFFSET.size)
+        data_end = OFFSET.unpack(index_file.read(OFFSET.size))[0]
+        index_file.truncate((word_count + 1) * OFFSET.size)
+        data_file.truncate(data_end)
+
+        chunks = []
+        offsets = []
+        position = data_end
+        for word in words:
+            encoded = encode_word(word)
+            chunks.append(encoded)
+            position += len(encoded)
+            offsets.append(position)
+
+        data_file.seek(data_end)
+        data_file.write(b''.join(chunks))
+        index_file.seek((word_count + 1) * OFFSET.size)
+        index_file.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+
+
+def write_word_store(folder, key, words):
+    """Write a complete word store in one go."""
+    data_path, index_path = word_store_paths(folder, key)
+    for path in (data_path, index_path):
+        if os.path.exists(path):
+            os.remove(path)
+    append_words(folder, key, words, 0)
+
+
+def delete_word_store(folder, key):
+    """Remove a word store's files if they exist."""
+    for path in word_store_paths(folder, key):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def delete_word_payloads(folder, words_hash):
+    """Remove the precompressed payloads with this hash if they exist."""
+    for path in word_payload_paths(folder, words_hash).values():
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def words_payload_suffix(**fields):
+    """
+    JSON bytes that close the words array and carry the other response fields.
+    
+    bytes values are taken as already-encoded JSON and copied in as is; the
+    result is the same as encoding their decoded form.
+    """
+    return b'], ' + b', '.join(
+        json.dumps(name).encode('utf-8') + b': ' +
+        (value if isinstance(value, bytes) else json.dumps(value).encode('utf-8'))
+        for name, value in fields.items()
+    ) + b'}'
+
+
+def encode_words_payload(words_body, **fields):
+    """Build the JSON bytes of an /api/words response around a pre-encoded words body."""
+    return WORDS_PAYLOAD_PREFIX + words_body + words_payload_suffix(**fields)
+
+
+def iter_words_payload(store, start, stop, suffix, chunk_bytes):
+    """
+    Yield the bytes of encode_words_payload for words [start, stop) of an open
+    WordStore, copying at most chunk_bytes of words at a time. The store is
+    closed once the payload has been sent or the client goes away.
+    """
+    try:
+        yield WORDS_PAYLOAD_PREFIX
+        yield from store.iter_json_body(start, stop, chunk_bytes)
+        yield suffix
+    finally:
+        store.close()
+
+
+def write_word_payloads(document, folder):
+    """
+    Precompress a finished document's full /api/words payload and record its
+    SHA-256 as the strong validator. Payload files are named by that hash, so
+    documents with identical payloads share them. The caller commits the session.
+    """
+    with WordStore(folder, document.word_store) as store:
+        payload = encode_words_payload(
+            store.json_body(0, document.word_count),
+            total=document.word_count,
+            document_name=document.original_name,
+            pages=json.loads(document.page_boundaries) if document.page_boundaries else [],
+            complete=True
+        )
+
+    words_hash = hashlib.sha256(payload).hexdigest()
+    paths = word_payload_paths(folder, words_hash)
+    os.makedirs(os.path.dirname(paths['gzip']), exist_ok=True)
+    encoded = {'gzip': gzip.compress(payload, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded['br'] = brotli.compress(payload, quality=11)
+    for coding, data in encoded.items():
+        # Write then rename so readers never see a partial file
+        tmp_path = paths[coding] + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, paths[coding])
+
+    document.words_hash = words_hash
+    return words_hash
+
+
+class WordStore:
+    """
+    Read-only, memory-mapped view of a document's words.
+
+    Slices come straight from the page cache, which is shared by every worker
+    process that maps the same file, and are returned as pre-encoded JSON so
+    they can be sent without decoding or re-encoding.
+    """
+
+    def __init__(self, folder, key):
+        data_path, index_path = word_store_paths(folder, key)
+        self._data = self._map(data_path)
+        self._index = self._map(index_path)
+        self.word_count = len(self._index) // OFFSET.size - 1
+        self.size = len(self._data) + len(self._index)
+
+    @staticmethod
+    def _map(path):
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b''
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _offset(self, index):
+        return OFFSET.unpack_from(self._index, index * OFFSET.size)[0]
+
+    def json_body(self, start=0, stop=None):
+        """
+        Words [start, stop) as the comma-separated body of a JSON array.
+
+        Returns a memoryview of the mapped file rather than a copy; the
+        mapping stays valid while the view is referenced, even after close().
+        """
+        stop = self.word_count if stop is None else min(stop, self.word_count)
+        if stop <= start:
+            return memoryview(b'')
+        # Drop the trailing comma of the last word
+        return memoryview(self._data)[self._offset(start):self._offset(stop) - 1]
+
+    def json_body_length(self, start=0, stop=None):
+        """Length in bytes of json_body(start, stop), without reading the words."""
+        stop = self.word_count if stop is None else min(stop, self.word_count)
+        if stop <= start:
+            return 0
+        return self._offset(stop) - 1 - self._offset(start)
+
+    def iter_json_body(self, start=0, stop=None, chunk_bytes=64 * 1024):
+        """Yield json_body(start, stop) as bytes slices of at most chunk_bytes, for WSGI bodies."""
+        stop = self.word_count if stop is None else min(stop, self.word_count)
+        if stop <= start:
+            return
+        position, end = self._offset(start), self._offset(stop) - 1
+        while position < end:
+            yield self._data[position:min(position + chunk_bytes, end)]
+            position += chunk_bytes
+
+    def words(self, start=0, stop=None):
+        """Decode words [start, stop) into a list of strings."""
+        return json.loads(b'[' + self.json_body(start, stop) + b']')
+
+    def close(self):
+        for mapped in (self._data, self._index):
+            if isinstance(mapped, mmap.mmap):
+                try:
+                    mapped.close()
+                except BufferError:
+                    # A json_body view is still in use; the file is unmapped once it is released
+                    pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def migrate_legacy_words(document, folder):
+    """
+    Move a document's words from the legacy extracted_text column into a new
+    word store. The caller commits the session.
+    """
+    words = json.loads(document.extracted_text) if document.extracted_text else []
+    key = new_word_store_key()
+    write_word_store(folder, key, words)
+    document.word_store = key
+    document.word_count = len(words)
+    document.extracted_text = None
+    document.word_offsets = None
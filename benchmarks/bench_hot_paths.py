@@ -0,0 +1,224 @@
+"""
+Micro-benchmarks for the extraction and serialization hot paths.
+
+Generates Latin, CJK and mixed synthetic PDFs and measures
+extract_text_from_pdf, tokenize_text, words_to_json / json_to_words and the
+page boundary JSON round trip. Each case reports best-of-repeat seconds,
+throughput and the tracemalloc peak of one extra run. Results are written as
+JSON and, given a baseline, any case slower or hungrier than the threshold
+allows fails the run.
+
+Usage:
+    python -m benchmarks.bench_hot_paths                        # 1, 10 and 100 pages
+    python -m benchmarks.bench_hot_paths --full                 # adds 1000 pages
+    python -m benchmarks.bench_hot_paths --save-baseline
+    python -m benchmarks.bench_hot_paths --baseline benchmarks/results/baseline.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import pdfplumber
+
+from app.utils.pdf_processor import (
+    extract_text_from_pdf, json_to_page_boundaries, json_to_words, page_boundaries_to_json,
+    tokenize_text, words_to_json
+)
+from benchmarks.synthetic_pdf import SCRIPTS, write_synthetic_pdf
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(RESULTS_DIR, 'latest.json')
+
+# Cases faster than this are timer noise and never count as regressions
+MIN_COMPARABLE_SECONDS = 0.001
+
+
+def measure(func, repeat, min_time=0.2, trace_memory=True):
+    """
+    Time func() and return (best seconds per call, peak traced bytes).
+    
+    Fast calls are looped until a round takes min_time so the per-call time
+    is above timer resolution. The memory peak comes from one separate run
+    because tracing slows allocation-heavy code down several times.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+    
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - start) / loops)
+    
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+def record(results, name, seconds, peak, amount, unit):
+    """Store one case with its throughput in unit per second."""
+    results[name] = {
+        'seconds': seconds,
+        'throughput': amount / seconds if seconds else None,
+        'unit': f'{unit}/s',
+        'peak_bytes': peak
+    }
+    peak_text = f'{peak / (1024 * 1024):9.2f} MiB' if peak is not None else '          -'
+    print(f'{name:32s} {seconds * 1000:11.3f} ms {amount / seconds:14,.0f} {unit}/s {peak_text}', flush=True)
+
+
+def bench_document(results, tmp, script, page_count, args):
+    """Run every hot path case for one synthetic document."""
+    file_path = os.path.join(tmp, f'{script}_{page_count}.pdf')
+    pages = write_synthetic_pdf(file_path, script, page_count)
+    text = '\n'.join('\n'.join(lines) for lines in pages)
+    text_mb = len(text.encode('utf-8')) / (1024 * 1024)
+    prefix = f'{script}/{page_count}'
+    
+    extracted = {}
+    
+    def extract():
+        extracted['result'] = extract_text_from_pdf(file_path)
+    
+    seconds, peak = measure(extract, args.extract_repeat, min_time=0, trace_memory=args.memory)
+    record(results, f'extract/{prefix}', seconds, peak, page_count, 'pages')
+    words, word_count, page_boundaries = extracted['result']
+    
+    # The generator knows the text it drew, so extraction must give back exactly its tokens
+    expected = tokenize_text(text)
+    if words != expected:
+        raise SystemExit(f'{prefix}: extracted {word_count} words, expected {len(expected)}')
+    
+    seconds, peak = measure(lambda: tokenize_text(text), args.repeat, trace_memory=args.memory)
+    record(results, f'tokenize/{prefix}', seconds, peak, text_mb, 'MB')
+    
+    stored = words_to_json(words)
+    seconds, peak = measure(lambda: words_to_json(words), args.repeat, trace_memory=args.memory)
+    record(results, f'words_to_json/{prefix}', seconds, peak, word_count, 'words')
+    seconds, peak = measure(lambda: json_to_words(stored), args.repeat, trace_memory=args.memory)
+    record(results, f'json_to_words/{prefix}', seconds, peak, word_count, 'words')
+    if json_to_words(stored) != words:
+        raise SystemExit(f'{prefix}: words JSON round trip changed the words')
+    
+    def boundaries_round_trip():
+        return json_to_page_boundaries(page_boundaries_to_json(page_boundaries))
+    
+    seconds, peak = measure(boundaries_round_trip, args.repeat, trace_memory=args.memory)
+    record(results, f'page_boundaries/{prefix}', seconds, peak, page_count, 'pages')
+    if boundaries_round_trip() != page_boundaries:
+        raise SystemExit(f'{prefix}: page boundary JSON round trip changed the boundaries')
+
+
+def compare(results, baseline, threshold):
+    """Return regression messages for cases present in both runs."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if previous['seconds'] >= MIN_COMPARABLE_SECONDS and \
+                current['seconds'] > previous['seconds'] * (1 + threshold):
+            regressions.append(f'{name}: {previous["seconds"] * 1000:.3f} ms -> {current["seconds"] * 1000:.3f} ms '
+                               f'(+{current["seconds"] / previous["seconds"] - 1:.0%})')
+        if previous.get('peak_bytes') and current.get('peak_bytes') and \
+                current['peak_bytes'] > previous['peak_bytes'] * (1 + threshold):
+            regressions.append(f'{name}: peak {previous["peak_bytes"]:,} -> {current["peak_bytes"]:,} bytes '
+                               f'(+{current["peak_bytes"] / previous["peak_bytes"] - 1:.0%})')
+    return regressions
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scripts', default=','.join(SCRIPTS), help='Comma-separated: latin, cjk, mixed')
+    parser.add_argument('--pages', default='1,10,100', help='Comma-separated page counts')
+    parser.add_argument('--full', action='store_true', help='Also run 1000-page documents')
+    parser.add_argument('--repeat', type=int, default=5, help='Rounds for the in-memory cases')
+    parser.add_argument('--extract-repeat', type=int, default=1, help='Rounds for PDF extraction')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='Skip the tracemalloc runs')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Where to write this run as JSON')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=float(os.environ.get('BENCH_THRESHOLD', 0.2)),
+                        help='Allowed slowdown or memory growth as a fraction (default 0.2)')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    args = parser.parse_args()
+    
+    scripts = [script.strip() for script in args.scripts.split(',') if script.strip()]
+    unknown = set(scripts) - set(SCRIPTS)
+    if unknown:
+        parser.error(f'unknown scripts: {", ".join(sorted(unknown))}')
+    page_counts = [int(count) for count in args.pages.split(',') if count.strip()]
+    if args.full and 1000 not in page_counts:
+        page_counts.append(1000)
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for script in scripts:
+            for page_count in page_counts:
+                bench_document(results, tmp, script, page_count, args)
+    
+    run = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pdfplumber': pdfplumber.__version__,
+            'repeat': args.repeat,
+            'extract_repeat': args.extract_repeat
+        },
+        'results': results
+    }
+    write_json(args.output, run)
+    print(f'results written to {args.output}')
+    
+    if args.save_baseline:
+        write_json(args.baseline, run)
+        print(f'baseline saved to {args.baseline}')
+        return 0
+    
+    if not os.path.exists(args.baseline):
+        # A check without a baseline would pass whatever was measured
+        print(f'no baseline at {args.baseline}; run with --save-baseline to store one')
+        return 1
+    
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline['results'], args.threshold)
+    if regressions:
+        print(f'{len(regressions)} regressions beyond {args.threshold:.0%} of {args.baseline}:')
+        for message in regressions:
+            print(f'  {message}')
+        return 1
+    print(f'no regressions beyond {args.threshold:.0%} of {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Compare serial and page-range parallel extraction on a large synthetic PDF.
+
+Usage:
+    python -m benchmarks.bench_parallel_extract --pages 400 --workers 4
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from app.utils.pdf_processor import extract_text_from_pdf
+from benchmarks.synthetic_pdf import write_latin_pdf
+
+
+def timed_extract(file_path, workers, chunk_pages):
+    """Run extraction once and return (seconds, result)."""
+    start = time.perf_counter()
+    result = extract_text_from_pdf(file_path, workers=workers, chunk_pages=chunk_pages)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=400)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-pages', type=int, default=25)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, f'synthetic_{args.pages}.pdf')
+        write_latin_pdf(file_path, args.pages)
+        
+        serial_times, parallel_times = [], []
+        for _ in range(args.repeat):
+            seconds, serial = timed_extract(file_path, 1, args.chunk_pages)
+            serial_times.append(seconds)
+            seconds, parallel = timed_extract(file_path, args.workers, args.chunk_pages)
+            parallel_times.append(seconds)
+            
+            # Both paths must produce byte-identical stored output
+            if json.dumps(serial) != json.dumps(parallel):
+                raise SystemExit('Parallel extraction output differs from serial output')
+    
+    serial_best, parallel_best = min(serial_times), min(parallel_times)
+    words = serial[1]
+    print(f'pages={args.pages} words={words} workers={args.workers} chunk_pages={args.chunk_pages}')
+    print(f'serial:   {serial_best:8.2f}s  {args.pages / serial_best:8.1f} pages/s')
+    print(f'parallel: {parallel_best:8.2f}s  {args.pages / parallel_best:8.1f} pages/s')
+    print(f'speedup:  {serial_best / parallel_best:8.2f}x  (output identical)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Cold start report: import time and time to first request.
+
+Starts fresh interpreters against a migrated scratch database and times
+importing the app package, create_app() and the first request (the login
+page), plus the whole run from process spawn to that first response. Each
+stage reports the median of the runs. The run also fails if a worker that
+has not extracted anything loaded an ingest-only module such as pdfplumber.
+Results are written as JSON and compared with a baseline like
+bench_hot_paths.
+
+Usage:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --save-baseline
+    python -m benchmarks.bench_startup --baseline benchmarks/results/startup_baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.bench_hot_paths import compare, write_json
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, 'startup_baseline.json')
+DEFAULT_OUTPUT = os.path.join(RESULTS_DIR, 'startup_latest.json')
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only the extraction, import and preview code paths may load these
+LAZY_MODULES = ('pdfplumber', 'pdfminer', 'pypdfium2', 'PIL')
+
+# Runs in each fresh interpreter; prints the stage timings as JSON
+PROBE = '''
+import json, os, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get('/login')
+served = time.perf_counter()
+print(json.dumps({
+    'status': response.status_code,
+    'import': imported - started,
+    'create_app': created - imported,
+    'first_request': served - created,
+    'loaded': sorted(name for name in sys.modules if name.split('.')[0] in %r)
+}))
+sys.stdout.flush()
+os._exit(0)  # Skip atexit pool shutdowns; they are not part of startup
+''' % (LAZY_MODULES,)
+
+
+def probe_env(database_path):
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': f'sqlite:///{database_path}',
+        'AUTO_MIGRATE': '0',
+        'PYTHONPATH': PROJECT_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    })
+    return env
+
+
+def prepare_database(env):
+    """Create and migrate the scratch database the probes start against."""
+    subprocess.run([sys.executable, '-c', 'from app import create_app; create_app()'],
+                   env=dict(env, AUTO_MIGRATE='1', INGEST_QUEUE_ENABLED='0'), cwd=PROJECT_ROOT, check=True)
+
+
+def run_probe(env):
+    """Start one interpreter; returns its stage timings with the spawn-to-response total."""
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', PROBE], env=env, cwd=PROJECT_ROOT,
+                               capture_output=True, text=True)
+    total = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise SystemExit(f'startup probe failed:\n{completed.stderr}')
+    sample = json.loads(completed.stdout.strip().splitlines()[-1])
+    if sample['status'] != 200:
+        raise SystemExit(f'first request returned {sample["status"]}')
+    sample['total'] = total
+    return sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to start')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Where to write this run as JSON')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=float(os.environ.get('BENCH_THRESHOLD', 0.2)),
+                        help='Allowed slowdown as a fraction (default 0.2)')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        env = probe_env(os.path.join(tmp, 'startup.db'))
+        prepare_database(env)
+        # One unmeasured start fills the bytecode and OS file caches
+        run_probe(env)
+        samples = [run_probe(env) for _ in range(args.runs)]
+    
+    results = {}
+    for stage in ('import', 'create_app', 'first_request', 'total'):
+        seconds = statistics.median(sample[stage] for sample in samples)
+        results[f'startup/{stage}'] = {'seconds': seconds}
+        print(f'{stage:16s} {seconds * 1000:9.1f} ms  '
+              f'(min {min(sample[stage] for sample in samples) * 1000:.1f}, '
+              f'max {max(sample[stage] for sample in samples) * 1000:.1f})', flush=True)
+    loaded = sorted({name.split('.')[0] for sample in samples for name in sample['loaded']})
+    
+    run = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'runs': args.runs,
+            'lazy_modules_loaded': loaded
+        },
+        'results': results
+    }
+    write_json(args.output, run)
+    print(f'results written to {args.output}')
+    
+    if loaded:
+        print(f'ingest-only modules loaded at startup: {", ".join(loaded)}')
+        return 1
+    
+    if args.save_baseline:
+        write_json(args.baseline, run)
+        print(f'baseline saved to {args.baseline}')
+        return 0
+    
+    if not os.path.exists(args.baseline):
+        # A check without a baseline would pass whatever was measured
+        print(f'no baseline at {args.baseline}; run with --save-baseline to store one')
+        return 1
+    
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline['results'], args.threshold)
+    if regressions:
+        print(f'{len(regressions)} regressions beyond {args.threshold:.0%} of {args.baseline}:')
+        for message in regressions:
+            print(f'  {message}')
+        return 1
+    print(f'no regressions beyond {args.threshold:.0%} of {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
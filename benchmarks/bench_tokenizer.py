@@ -0,0 +1,160 @@
+"""
+Differential check and throughput benchmark for the regex tokenizer.
+
+Verifies that app.utils.tokenizer produces exactly the token stream of the
+original character-by-character tokenize_text loop, then reports MB/s for both.
+
+Usage:
+    python -m benchmarks.bench_tokenizer --size-mb 4
+"""
+import argparse
+import random
+import sys
+import time
+
+from app.utils.pdf_processor import is_cjk
+from app.utils.tokenizer import CJK_RANGES, iter_tokens, tokenize
+
+
+def legacy_tokenize_text(text):
+    """The original tokenize_text implementation, kept as the reference."""
+    if not text:
+        return []
+    
+    words = []
+    current_token = ""
+    
+    for char in text:
+        if is_cjk(char):
+            if current_token:
+                words.append(current_token)
+                current_token = ""
+            words.append(char)
+        elif char.isspace():
+            if current_token:
+                words.append(current_token)
+                current_token = ""
+        else:
+            current_token += char
+    
+    if current_token:
+        words.append(current_token)
+    
+    return words
+
+
+# Hand-picked edge cases: boundaries of every CJK range, unusual whitespace,
+# mixed scripts, punctuation glued to CJK, and degenerate inputs
+CORPUS = [
+    None,
+    '',
+    ' ',
+    '\t\n\r\x0b\x0c',
+    'word',
+    '  leading and trailing  ',
+    'hyphen-ated, punctuated; words.',
+    'tabs\tand\nnewlines\r\nand\x0bvertical\x0cfeeds',
+    'non breaking em thin　ideographic line para\u0085nel',
+    'zero​width﻿bom',
+    '日本語のテキストです。',
+    '中文，混合English与数字123！',
+    '한국어 텍스트와 English',
+    'カタカナ「引用」ひらがな',
+    'x日y本z',
+    '(括弧)and[角括弧]',
+    'emoji 😀 and 𠀀 extension B',
+    'Ünïcödé àccents çédille',
+    'RTL عربى עברית text',
+    ''.join(chr(c) for low, high in CJK_RANGES for c in (low - 1, low, high, high + 1)),
+    'a' * 10000,
+    ('ab' + '漢') * 1000,
+]
+
+
+def random_text(rng, length):
+    """Random text drawn from Latin, CJK, whitespace and edge code points."""
+    pools = [
+        'abcdefghijklmnopqrstuvwxyz0123456789.,;:!?-()',
+        ' \t\n 　 ',
+        ''.join(chr(c) for low, high in CJK_RANGES for c in range(low, min(high, low + 64) + 1)),
+        ''.join(chr(c) for low, high in CJK_RANGES for c in (low - 1, high, high + 1)),
+        'éüßøΩЖ😀',
+    ]
+    weights = [60, 20, 12, 4, 4]
+    return ''.join(rng.choice(rng.choices(pools, weights)[0]) for _ in range(length))
+
+
+def differential_check(random_cases=2000, seed=1234):
+    """Compare both tokenizers on the corpus, random texts and every code point."""
+    cases = list(CORPUS)
+    rng = random.Random(seed)
+    cases.extend(random_text(rng, rng.randint(1, 400)) for _ in range(random_cases))
+    
+    # Every code point, each surrounded by Latin letters so joins are exercised
+    for start in range(0, 0x110000, 4096):
+        cases.append(''.join('a' + chr(c) + 'b' for c in range(start, min(start + 4096, 0x110000))))
+    
+    for text in cases:
+        expected = legacy_tokenize_text(text)
+        if tokenize(text) != expected:
+            raise AssertionError(f'Token mismatch for input {text[:80]!r}')
+    
+    # Streaming interface must match tokenizing each text separately
+    pages = [case for case in cases[:500] if case]
+    expected = [token for page in pages for token in legacy_tokenize_text(page)]
+    if list(iter_tokens(pages)) != expected:
+        raise AssertionError('iter_tokens stream differs from per-page tokenization')
+    
+    return len(cases)
+
+
+def build_text(size_mb, cjk_ratio, seed=42):
+    """Build roughly size_mb of UTF-8 text with the given share of CJK tokens."""
+    rng = random.Random(seed)
+    latin = 'lorem ipsum dolor sit amet consectetur adipiscing elit internationalization'.split()
+    cjk = [chr(c) for c in range(0x4E00, 0x4E00 + 500)]
+    parts = []
+    size = 0
+    while size < size_mb * 1024 * 1024:
+        if rng.random() < cjk_ratio:
+            chunk = ''.join(rng.choice(cjk) for _ in range(rng.randint(2, 12)))
+        else:
+            chunk = rng.choice(latin)
+        parts.append(chunk)
+        size += len(chunk.encode('utf-8')) + 1
+    return ' '.join(parts)
+
+
+def throughput(func, text, repeat):
+    """Best-of-repeat throughput in MB/s of UTF-8 input."""
+    megabytes = len(text.encode('utf-8')) / (1024 * 1024)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return megabytes / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--check-only', action='store_true', help='Run the differential check and exit')
+    args = parser.parse_args()
+    
+    checked = differential_check()
+    print(f'differential check: {checked} inputs identical')
+    if args.check_only:
+        return 0
+    
+    for label, cjk_ratio in (('latin', 0.0), ('mixed', 0.3), ('cjk', 1.0)):
+        text = build_text(args.size_mb, cjk_ratio)
+        legacy = throughput(legacy_tokenize_text, text, args.repeat)
+        regex = throughput(tokenize, text, args.repeat)
+        print(f'{label:6s} legacy {legacy:8.2f} MB/s   regex {regex:8.2f} MB/s   speedup {regex / legacy:6.1f}x')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Response size and peak memory of whole-document /api/words responses.
+
+Builds word stores of growing size, serves each through the real route with
+streaming disabled (the whole JSON body built in memory) and enabled, and
+reports the tracemalloc peak while the response is consumed. Both bodies
+must be byte-identical; the run fails if a streamed response ever peaks
+above --max-peak-mb, which shows memory staying flat as documents grow.
+
+Usage:
+    python -m benchmarks.bench_words_stream --words 10000,100000,1000000,3000000
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks.synthetic_pdf import LOREM
+
+PASSWORD = 'bench-password'
+WORDS_PER_PAGE = 500
+
+
+def synthetic_words(count, seed=0):
+    """Deterministic Latin words with some accents and CJK, as stored by ingestion."""
+    rng = random.Random(seed)
+    vocabulary = LOREM + ['déjà', 'naïve', 'Ünïcödé', '日本', '中', '語']
+    return [rng.choice(vocabulary) for _ in range(count)]
+
+
+def page_boundaries(word_count):
+    return [{'page': page + 1, 'start': start, 'end': min(start + WORDS_PER_PAGE, word_count) - 1}
+            for page, start in enumerate(range(0, word_count, WORDS_PER_PAGE))]
+
+
+def consume(client, path):
+    """Fetch path and read the body chunk by chunk; returns (bytes, sha256, peak traced bytes)."""
+    digest = hashlib.sha256()
+    size = 0
+    tracemalloc.start()
+    try:
+        response = client.get(path, buffered=False)
+        for chunk in response.iter_encoded():
+            size += len(chunk)
+            digest.update(chunk)
+        response.close()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    if response.status_code != 200:
+        raise SystemExit(f'{path} returned {response.status_code}')
+    return size, digest.hexdigest(), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--words', default='10000,100000,1000000,3000000', help='Comma-separated document sizes')
+    parser.add_argument('--max-peak-mb', type=float, default=4.0,
+                        help='Fail if a streamed response peaks above this many MiB')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.words.split(',') if size.strip()]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        from app.config import Config
+        Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        Config.AUTO_MIGRATE = True  # The scratch database starts empty
+        Config.UPLOAD_FOLDER = os.path.join(tmp, 'uploads')
+        Config.WORD_STORE_FOLDER = os.path.join(tmp, 'word_store')
+        Config.INGEST_QUEUE_ENABLED = False
+        Config.PROGRESS_BUFFER_ENABLED = False
+        
+        from app import create_app, db
+        from app.models.document import Document
+        from app.models.user import User
+        from app.utils.word_store import new_word_store_key, write_word_store
+        
+        app = create_app()
+        document_ids = {}
+        with app.app_context():
+            user = User(email='bench@example.invalid', name='Bench')
+            user.set_password(PASSWORD)
+            db.session.add(user)
+            db.session.commit()
+            for size in sizes:
+                key = new_word_store_key()
+                write_word_store(app.config['WORD_STORE_FOLDER'], key, synthetic_words(size))
+                document = Document(user_id=user.id, file_path=os.path.join(tmp, f'{size}.pdf'),
+                                    original_name=f'{size}.pdf', word_count=size, word_store=key,
+                                    page_boundaries=json.dumps(page_boundaries(size)), is_complete=True)
+                db.session.add(document)
+                db.session.commit()
+                document_ids[size] = document.id
+        
+        client = app.test_client()
+        client.post('/login', data={'email': 'bench@example.invalid', 'password': PASSWORD})
+        
+        print(f'{"words":>10s} {"response":>12s} {"buffered peak":>14s} {"streamed peak":>14s}')
+        failures = []
+        for size in sizes:
+            path = f'/api/words/{document_ids[size]}'
+            client.get(path).close()  # Warm the decoded page boundary cache
+            
+            app.config['WORDS_STREAM_MIN_BYTES'] = float('inf')
+            buffered_size, buffered_hash, buffered_peak = consume(client, path)
+            app.config['WORDS_STREAM_MIN_BYTES'] = 0
+            streamed_size, streamed_hash, streamed_peak = consume(client, path)
+            
+            if (buffered_size, buffered_hash) != (streamed_size, streamed_hash):
+                failures.append(f'{size} words: streamed body differs from the buffered body')
+            if streamed_peak > args.max_peak_mb * 1024 * 1024:
+                failures.append(f'{size} words: streamed peak {streamed_peak / 1048576:.2f} MiB '
+                                f'exceeds {args.max_peak_mb} MiB')
+            print(f'{size:10,d} {streamed_size / 1048576:9.2f} MiB {buffered_peak / 1048576:10.2f} MiB '
+                  f'{streamed_peak / 1048576:10.2f} MiB')
+    
+    for failure in failures:
+        print(failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
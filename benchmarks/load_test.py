@@ -0,0 +1,412 @@
+"""
+Load test simulating concurrent readers against a local WordFlow instance.
+
+Starts create_app() on a threaded werkzeug server with a throwaway database,
+registers synthetic users who each upload the same synthetic PDF, then
+replays reader behaviour per user: open the reader page, fetch the current
+/api/words window and the saved progress, save progress every few seconds
+at the given WPM (prefetching the next window when needed), and now and
+then visit the dashboard and library before reopening the document.
+
+Each concurrency level runs for --duration seconds and reports latency
+percentiles, error rates and throughput per endpoint, so the level where
+the progress write path collapses shows up in the summary.
+
+Usage:
+    python -m benchmarks.load_test --users 1,10,50 --duration 30
+    python -m benchmarks.load_test --users 25 --no-buffer --save-interval 1
+    python -m benchmarks.load_test --users 50 --progress-api events --output load.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import urlencode
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from benchmarks.synthetic_pdf import write_latin_pdf
+
+PASSWORD = 'loadtest-password'
+PERCENTILES = (50, 90, 95, 99)
+
+
+class KeepAliveHandler(WSGIRequestHandler):
+    """Serve HTTP/1.1 so each simulated reader reuses one connection, like a browser."""
+    protocol_version = 'HTTP/1.1'
+    
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class EndpointStats:
+    """Thread-safe latency and error counters keyed by endpoint label."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+    
+    def record(self, endpoint, seconds, status):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status or 'connection error'] += 1
+            # 304 is a successful revalidation of a cached /api/words payload
+            if status is None or status >= 400:
+                self.errors[endpoint] += 1
+    
+    def report(self, elapsed):
+        """Per-endpoint summary plus an 'all' row."""
+        with self._lock:
+            rows = {endpoint: summarize(latencies, self.errors[endpoint], elapsed, self.statuses[endpoint])
+                    for endpoint, latencies in sorted(self.latencies.items())}
+            every = [seconds for latencies in self.latencies.values() for seconds in latencies]
+            rows['all'] = summarize(every, sum(self.errors.values()), elapsed, {})
+        return rows
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = max(1, -(-pct * len(ordered) // 100))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies, errors, elapsed, statuses):
+    ordered = sorted(latencies)
+    row = {
+        'requests': len(ordered),
+        'errors': errors,
+        'error_rate': errors / len(ordered) if ordered else 0.0,
+        'throughput': len(ordered) / elapsed if elapsed else 0.0,
+        'mean_ms': sum(ordered) / len(ordered) * 1000 if ordered else None,
+        'max_ms': ordered[-1] * 1000 if ordered else None,
+        'statuses': {str(status): count for status, count in statuses.items()}
+    }
+    for pct in PERCENTILES:
+        value = percentile(ordered, pct)
+        row[f'p{pct}_ms'] = value * 1000 if value is not None else None
+    return row
+
+
+class ReaderClient:
+    """One synthetic user: a keep-alive connection and the session cookies."""
+    
+    def __init__(self, host, port, stats=None, timeout=60):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.stats = stats
+        self.cookies = {}
+        self.connection = None
+    
+    def request(self, method, path, endpoint=None, body=None, headers=None):
+        """Send one request; returns (status, body bytes) and records it under endpoint."""
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        
+        start = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            # Reconnect on the next request
+            self.close()
+            status, data, response = None, b'', None
+        elapsed = time.perf_counter() - start
+        
+        if response is not None:
+            for cookie in response.headers.get_all('Set-Cookie') or []:
+                name, _, rest = cookie.partition('=')
+                self.cookies[name.strip()] = rest.split(';', 1)[0]
+            if response.will_close:
+                self.close()
+        if endpoint and self.stats is not None:
+            self.stats.record(endpoint, elapsed, status)
+        return status, data
+    
+    def post_form(self, path, fields):
+        return self.request('POST', path, body=urlencode(fields),
+                            headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    
+    def post_json(self, path, payload, endpoint):
+        return self.request('POST', path, endpoint, body=json.dumps(payload),
+                            headers={'Content-Type': 'application/json'})
+    
+    def get_json(self, path, endpoint=None):
+        status, data = self.request('GET', path, endpoint)
+        return status, json.loads(data) if status == 200 else None
+    
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def sign_up(client, index):
+    """Register and log in synthetic user number index."""
+    email = f'reader{index}@loadtest.invalid'
+    client.post_form('/register', {
+        'email': email, 'name': f'Reader {index}', 'password': PASSWORD, 'confirm_password': PASSWORD
+    })
+    status, _ = client.post_form('/login', {'email': email, 'password': PASSWORD})
+    if status != 302:
+        raise SystemExit(f'Login failed for {email} with status {status}')
+
+
+def upload_document(client, pdf_path, timeout=600):
+    """Upload the PDF and wait for extraction; returns (document_id, word_count)."""
+    boundary = uuid.uuid4().hex
+    with open(pdf_path, 'rb') as f:
+        content = f.read()
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="loadtest.pdf"\r\n'
+        f'Content-Type: application/pdf\r\n\r\n'
+    ).encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+    status, data = client.request('POST', '/upload', body=body, headers={
+        'Content-Type': f'multipart/form-data; boundary={boundary}',
+        'X-Requested-With': 'XMLHttpRequest'
+    })
+    if status not in (200, 202):
+        raise SystemExit(f'Upload failed with status {status}: {data[:200]!r}')
+    result = json.loads(data)
+    
+    document_id = result.get('document_id')
+    deadline = time.monotonic() + timeout
+    while document_id is None:
+        _, job = client.get_json(f'/api/jobs/{result["job_id"]}')
+        if job and job['status'] == 'done':
+            document_id = job['document_id']
+        elif job and job['status'] == 'failed':
+            raise SystemExit(f'Extraction failed: {job["error"]}')
+        elif time.monotonic() > deadline:
+            raise SystemExit('Timed out waiting for extraction')
+        else:
+            time.sleep(0.2)
+    
+    _, words = client.get_json(f'/api/words/{document_id}?start=0&count=0')
+    return document_id, words['total']
+
+
+class SimulatedReader:
+    """Replays one user's reading session until the deadline."""
+    
+    def __init__(self, client, document_id, word_count, args, rng):
+        self.client = client
+        self.document_id = document_id
+        self.word_count = word_count
+        self.args = args
+        self.rng = rng
+        self.session_id = uuid.uuid4().hex
+        self.seq = 0
+        self.position = 0
+        self.loaded_windows = set()
+    
+    def open_document(self):
+        self.client.request('GET', f'/read/{self.document_id}', 'GET /read')
+        _, progress = self.client.get_json(f'/api/progress/{self.document_id}', 'GET /api/progress')
+        if progress:
+            self.position = progress['last_word_index'] % max(self.word_count, 1)
+        self.loaded_windows.clear()
+        self.load_window(self.window_start(self.position), include_pages=True)
+    
+    def window_start(self, index):
+        return index - index % self.args.window
+    
+    def load_window(self, start, include_pages=False):
+        if self.args.full_words:
+            if not self.loaded_windows:
+                self.client.request('GET', f'/api/words/{self.document_id}', 'GET /api/words')
+            self.loaded_windows.add(start)
+            return
+        params = {'start': start, 'count': self.args.window}
+        if include_pages:
+            params['include_pages'] = 1
+        self.client.request('GET', f'/api/words/{self.document_id}?{urlencode(params)}', 'GET /api/words')
+        self.loaded_windows.add(start)
+    
+    def save_progress(self):
+        self.position = (self.position + self.args.wpm * self.args.save_interval / 60) % max(self.word_count, 1)
+        index = int(self.position)
+        if self.args.progress_api == 'events':
+            self.seq += 1
+            self.client.post_json('/api/progress/events', {
+                'session': self.session_id,
+                'events': [{
+                    'seq': self.seq, 'document_id': self.document_id, 't': int(time.time() * 1000),
+                    'last_word_index': index, 'wpm': self.args.wpm
+                }]
+            }, 'POST /api/progress/events')
+        else:
+            self.client.post_json(f'/api/progress/{self.document_id}', {
+                'last_word_index': index, 'wpm': self.args.wpm
+            }, 'POST /api/progress')
+        
+        # Keep the next window ready, as the reader's prefetch does
+        upcoming = self.window_start(index) + self.args.window
+        if upcoming < self.word_count and upcoming not in self.loaded_windows:
+            self.load_window(upcoming)
+    
+    def browse(self):
+        self.client.request('GET', '/dashboard', 'GET /dashboard')
+        self.client.request('GET', '/library', 'GET /library')
+    
+    def run(self, deadline):
+        # Spread users over the save interval so they do not save in lockstep
+        next_save = time.monotonic() + self.rng.uniform(0, self.args.save_interval)
+        self.open_document()
+        saves = 0
+        while True:
+            delay = next_save - time.monotonic()
+            if next_save >= deadline:
+                break
+            if delay > 0:
+                time.sleep(delay)
+            # Fixed schedule: a slow server does not lower the offered load
+            next_save += self.args.save_interval
+            self.save_progress()
+            saves += 1
+            if saves % self.args.saves_per_visit == 0:
+                self.browse()
+                self.open_document()
+
+
+def run_level(readers, deadline):
+    """Run every simulated reader in its own thread until the deadline."""
+    threads = [threading.Thread(target=reader.run, args=(deadline,), daemon=True) for reader in readers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def configure(tmp, args):
+    """Point the app at a throwaway database and folders before create_app() runs."""
+    from app.config import Config
+    Config.SQLALCHEMY_DATABASE_URI = args.database or f'sqlite:///{os.path.join(tmp, "loadtest.db")}'
+    Config.AUTO_MIGRATE = True  # The scratch database starts empty
+    Config.UPLOAD_FOLDER = os.path.join(tmp, 'uploads')
+    Config.WORD_STORE_FOLDER = os.path.join(tmp, 'word_store')
+    Config.PREVIEW_FOLDER = os.path.join(tmp, 'previews')
+    Config.INGEST_IN_WEB = True  # The one server process also extracts the document
+    Config.PROGRESS_BUFFER_ENABLED = not args.no_buffer
+    if args.flush_interval is not None:
+        Config.PROGRESS_FLUSH_INTERVAL = args.flush_interval
+
+
+def print_report(users, report):
+    print(f'\n== {users} concurrent readers')
+    print(f'{"endpoint":28s} {"reqs":>7s} {"req/s":>8s} {"err%":>6s} '
+          + ' '.join(f'{"p" + str(pct):>8s}' for pct in PERCENTILES) + f' {"max":>8s}')
+    for endpoint, row in report.items():
+        cells = ' '.join(f'{row[f"p{pct}_ms"]:8.1f}' if row[f'p{pct}_ms'] is not None else f'{"-":>8s}'
+                         for pct in PERCENTILES)
+        max_ms = f'{row["max_ms"]:8.1f}' if row['max_ms'] is not None else f'{"-":>8s}'
+        print(f'{endpoint:28s} {row["requests"]:7d} {row["throughput"]:8.1f} '
+              f'{row["error_rate"] * 100:6.2f} {cells} {max_ms}')
+
+
+def print_summary(levels, endpoint):
+    print(f'\n== {endpoint} by concurrency (latencies in ms)')
+    print(f'{"users":>6s} {"req/s":>8s} {"err%":>6s} {"p50":>8s} {"p95":>8s} {"p99":>8s}')
+    for level in levels:
+        row = level['endpoints'].get(endpoint)
+        if not row or not row['requests']:
+            continue
+        print(f'{level["users"]:6d} {row["throughput"]:8.1f} {row["error_rate"] * 100:6.2f} '
+              f'{row["p50_ms"]:8.1f} {row["p95_ms"]:8.1f} {row["p99_ms"]:8.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', default='1,5,10,25', help='Comma-separated concurrency levels to run in turn')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per concurrency level')
+    parser.add_argument('--wpm', type=int, default=300)
+    parser.add_argument('--save-interval', type=float, default=5, help='Seconds between progress saves')
+    parser.add_argument('--saves-per-visit', type=int, default=12,
+                        help='Progress saves before a user visits the dashboard and library and reopens')
+    parser.add_argument('--progress-api', choices=('single', 'events'), default='single',
+                        help='POST /api/progress/<id> per save, or /api/progress/events batches')
+    parser.add_argument('--window', type=int, default=1000, help='Words per /api/words window')
+    parser.add_argument('--full-words', action='store_true', help='Fetch whole documents from /api/words')
+    parser.add_argument('--pages', type=int, default=20, help='Pages in the synthetic document')
+    parser.add_argument('--no-buffer', action='store_true', help='Write every progress save synchronously')
+    parser.add_argument('--flush-interval', type=float, help='Seconds between progress buffer flushes')
+    parser.add_argument('--database', help='SQLAlchemy URI instead of a temporary SQLite file')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write every level report as JSON')
+    args = parser.parse_args()
+    
+    levels = [int(users) for users in args.users.split(',') if users.strip()]
+    rng = random.Random(args.seed)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(tmp, args)
+        from app import create_app
+        app = create_app()
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=KeepAliveHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+        print(f'serving on http://{host}:{port} (progress buffer {"off" if args.no_buffer else "on"})')
+        
+        pdf_path = os.path.join(tmp, 'loadtest.pdf')
+        write_latin_pdf(pdf_path, args.pages, seed=args.seed)
+        
+        # Setup is not measured: every user gets an account and a copy of the
+        # document (the first upload is extracted, the rest are deduplicated)
+        readers = []
+        setup_start = time.perf_counter()
+        for index in range(max(levels)):
+            client = ReaderClient(host, port)
+            sign_up(client, index)
+            document_id, word_count = upload_document(client, pdf_path)
+            readers.append((client, document_id, word_count))
+        print(f'set up {len(readers)} users in {time.perf_counter() - setup_start:.1f}s '
+              f'({word_count} words per document)')
+        
+        results = []
+        for users in levels:
+            stats = EndpointStats()
+            simulated = []
+            for client, document_id, word_count in readers[:users]:
+                client.stats = stats
+                simulated.append(SimulatedReader(client, document_id, word_count, args,
+                                                 random.Random(rng.random())))
+            start = time.perf_counter()
+            run_level(simulated, time.monotonic() + args.duration)
+            elapsed = time.perf_counter() - start
+            report = stats.report(elapsed)
+            print_report(users, report)
+            results.append({'users': users, 'seconds': elapsed, 'endpoints': report})
+        
+        print_summary(results, 'POST /api/progress/events' if args.progress_api == 'events' else 'POST /api/progress')
+        
+        for client, _, _ in readers:
+            client.close()
+        server.shutdown()
+        from app.utils.progress_buffer import progress_buffer
+        progress_buffer.shutdown()
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'levels': results}, f, indent=2)
+        print(f'results written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Dependency-free generator for synthetic text PDFs used by the benchmarks.
+
+ASCII runs are set in Helvetica; everything else goes through a Type0 font
+with Identity-H encoding whose CIDs are the Unicode code points and a
+ToUnicode map, so extractors recover CJK text without an embedded font.
+"""
+import random
+import re
+
+LOREM = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+    'incididunt ut labore et dolore magna aliqua ut enim ad minim veniam quis '
+    'nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat'
+).split()
+
+
+# Common CJK ideographs, and the kana and hangul ranges the tokenizer splits on
+CJK_CHARS = [chr(c) for c in range(0x4E00, 0x4E00 + 2000)]
+KANA_CHARS = [chr(c) for c in range(0x3041, 0x3097)] + [chr(c) for c in range(0x30A1, 0x30FB)]
+HANGUL_CHARS = [chr(c) for c in range(0xAC00, 0xAC00 + 400)]
+
+TO_UNICODE_CMAP = b"""/CIDInit /ProcSet findresource begin
+12 dict begin
+begincmap
+/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def
+/CMapName /Adobe-Identity-UCS def
+/CMapType 2 def
+1 begincodespacerange
+<0000> <FFFF>
+endcodespacerange
+1 beginbfrange
+<0000> <FFFF> <0000>
+endbfrange
+endcmap
+CMapName currentdict /CMap defineresource pop
+end
+end"""
+
+_RUN = re.compile(r'[\x00-\x7f]+|[^\x00-\x7f]+')
+
+
+def _escape(text):
+    """Escape a string for use inside a PDF literal string."""
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def latin_lines(page_num, lines_per_page=45, words_per_line=12, seed=0):
+    """Generate deterministic pseudo-random Latin text lines for one page."""
+    rng = random.Random(seed * 100003 + page_num)
+    return [' '.join(rng.choice(LOREM) for _ in range(words_per_line)) for _ in range(lines_per_page)]
+
+
+def cjk_lines(page_num, lines_per_page=45, chars_per_line=36, seed=0):
+    """Generate deterministic CJK lines: ideographs with some kana and hangul, no spaces."""
+    rng = random.Random(seed * 100003 + page_num)
+    pools = rng.choices([CJK_CHARS, KANA_CHARS, HANGUL_CHARS], [6, 3, 1], k=lines_per_page)
+    return [''.join(rng.choice(pool) for _ in range(chars_per_line)) for pool in pools]
+
+
+def mixed_lines(page_num, lines_per_page=45, seed=0):
+    """Generate lines alternating Latin words and CJK runs, as in bilingual documents."""
+    rng = random.Random(seed * 100003 + page_num)
+    lines = []
+    for _ in range(lines_per_page):
+        parts = []
+        for _ in range(rng.randint(3, 6)):
+            if rng.random() < 0.5:
+                parts.append(' '.join(rng.choice(LOREM) for _ in range(rng.randint(1, 3))))
+            else:
+                parts.append(''.join(rng.choice(CJK_CHARS) for _ in range(rng.randint(2, 8))))
+        lines.append(' '.join(parts))
+    return lines
+
+
+def _show_line(line):
+    """Content stream operators that show one line, switching fonts between runs."""
+    ops = [b'T*']
+    for run in _RUN.findall(line):
+        if run[0] < '\x80':
+            ops.append(b'/F1 11 Tf (' + _escape(run).encode('latin-1') + b') Tj')
+        else:
+            ops.append(b'/F2 11 Tf <' + run.encode('utf-16-be').hex().upper().encode('ascii') + b'> Tj')
+    return b' '.join(ops)
+
+
+def write_pdf(path, pages):
+    """
+    Write a minimal PDF with one text page per entry in pages.
+    
+    Args:
+        path: Output file path
+        pages: List of pages, each a list of text lines (BMP characters only)
+    """
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None,
+               b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+               b'<< /Type /Font /Subtype /Type0 /BaseFont /WordFlowCJK /Encoding /Identity-H '
+               b'/DescendantFonts [5 0 R] /ToUnicode 7 0 R >>',
+               b'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /WordFlowCJK '
+               b'/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> '
+               b'/FontDescriptor 6 0 R /DW 1000 /W [32 126 500] /CIDToGIDMap /Identity >>',
+               b'<< /Type /FontDescriptor /FontName /WordFlowCJK /Flags 4 /FontBBox [0 -120 1000 880] '
+               b'/ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 700 /StemV 80 >>',
+               b'<< /Length %d >>\nstream\n' % len(TO_UNICODE_CMAP) + TO_UNICODE_CMAP + b'\nendstream']
+    kids = []
+    
+    for lines in pages:
+        body = b'BT 50 764 Td 14 TL ' + b' '.join(_show_line(line) for line in lines) + b' ET'
+        objects.append(b'<< /Length %d >>\nstream\n' % len(body) + body + b'\nendstream')
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>' % len(objects)
+        )
+        kids.append(len(objects))
+    
+    objects[1] = b'<< /Type /Pages /Kids [' + b' '.join(b'%d 0 R' % k for k in kids) + \
+        b'] /Count %d >>' % len(kids)
+    
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for num, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % num + obj + b'\nendobj\n'
+    
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def write_latin_pdf(path, page_count, seed=0):
+    """Write a synthetic Latin-text PDF with page_count pages."""
+    write_pdf(path, [latin_lines(page_num, seed=seed) for page_num in range(page_count)])
+
+
+SCRIPTS = {'latin': latin_lines, 'cjk': cjk_lines, 'mixed': mixed_lines}
+
+
+def synthetic_pages(script, page_count, seed=0):
+    """Text lines of every page of a synthetic document in the given script."""
+    return [SCRIPTS[script](page_num, seed=seed) for page_num in range(page_count)]
+
+
+def write_synthetic_pdf(path, script, page_count, seed=0):
+    """Write a synthetic PDF in script ('latin', 'cjk' or 'mixed'); returns its pages' lines."""
+    pages = synthetic_pages(script, page_count, seed)
+    write_pdf(path, pages)
+    return pages
@@ -1,5 +1,13 @@
+import os
 from app import create_app
 
+if __name__ == '__main__':
+    # The development server applies pending migrations at startup and runs
+    # extraction itself; deployments run 'flask wordflow db-upgrade' once
+    # before starting workers, and one 'flask wordflow ingest-worker'
+    os.environ.setdefault('AUTO_MIGRATE', '1')
+    os.environ.setdefault('INGEST_IN_WEB', '1')
+
 app = create_app()
 
 if __name__ == '__main__':
@@ -0,0 +1,41 @@
+"""The regex tokenizer must reproduce the original per-character tokenizer exactly."""
+import pytest
+
+from app.utils.tokenizer import CJK_RANGES, iter_tokens, tokenize
+from benchmarks.bench_tokenizer import CORPUS, differential_check, legacy_tokenize_text
+
+# Every str.isspace() character, including the ones str.split() and \s must agree on
+WHITESPACE = [chr(c) for c in range(0x110000) if chr(c).isspace()]
+
+
+@pytest.mark.parametrize('text', CORPUS, ids=lambda text: repr(text)[:40])
+def test_corpus_matches_legacy(text):
+    assert tokenize(text) == legacy_tokenize_text(text)
+
+
+@pytest.mark.parametrize('space', WHITESPACE, ids=lambda space: f'U+{ord(space):04X}')
+def test_whitespace_classes_match_legacy(space):
+    for text in (f'one{space}two', f'{space}lead', f'trail{space}', f'日{space}本', f'x{space}{space}語y'):
+        assert tokenize(text) == legacy_tokenize_text(text)
+
+
+@pytest.mark.parametrize('low, high', CJK_RANGES)
+def test_cjk_range_edges_match_legacy(low, high):
+    text = ''.join(f'a{chr(c)}b ' for c in (low - 1, low, low + 1, high - 1, high, high + 1))
+    assert tokenize(text) == legacy_tokenize_text(text)
+
+
+def test_mixed_script_tokens():
+    assert tokenize('中文，混合English与数字123！') == ['中', '文', '，', '混', '合', 'English', '与', '数', '字', '123！']
+    assert tokenize('한국어 텍스트와 English') == ['한', '국', '어', '텍', '스', '트', '와', 'English']
+
+
+def test_iter_tokens_matches_per_page_tokenize():
+    pages = [text for text in CORPUS if text]
+    expected = [token for page in pages for token in legacy_tokenize_text(page)]
+    assert list(iter_tokens(pages)) == expected
+
+
+def test_differential_check_passes():
+    # Random texts plus every code point between Latin letters
+    assert differential_check(random_cases=200, seed=7) > len(CORPUS)
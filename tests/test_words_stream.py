@@ -0,0 +1,97 @@
+"""Whole-document /api/words responses: streamed bodies match buffered ones in flat memory."""
+import json
+import os
+
+import pytest
+
+from benchmarks.bench_words_stream import PASSWORD, consume, page_boundaries, synthetic_words
+
+SIZES = (20000, 200000)
+MAX_STREAMED_PEAK = 1024 * 1024  # Bytes; well below the larger response
+
+
+@pytest.fixture(scope='module')
+def served(tmp_path_factory):
+    """A logged-in client and the ids of word-store documents of each size."""
+    tmp = str(tmp_path_factory.mktemp('words_stream'))
+    from app.config import Config
+    overrides = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "test.db")}',
+        'AUTO_MIGRATE': True,
+        'UPLOAD_FOLDER': os.path.join(tmp, 'uploads'),
+        'WORD_STORE_FOLDER': os.path.join(tmp, 'word_store'),
+        'PREVIEW_FOLDER': os.path.join(tmp, 'previews'),
+        'INGEST_QUEUE_ENABLED': False,
+        'PROGRESS_BUFFER_ENABLED': False
+    }
+    saved = {name: getattr(Config, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(Config, name, value)
+    
+    from app import create_app, db
+    from app.models.document import Document
+    from app.models.user import User
+    from app.utils.word_store import new_word_store_key, write_word_store
+    
+    try:
+        app = create_app()
+        document_ids = {}
+        with app.app_context():
+            user = User(email='stream@example.invalid', name='Stream')
+            user.set_password(PASSWORD)
+            db.session.add(user)
+            db.session.commit()
+            for size in SIZES:
+                key = new_word_store_key()
+                write_word_store(app.config['WORD_STORE_FOLDER'], key, synthetic_words(size))
+                document = Document(user_id=user.id, file_path=os.path.join(tmp, f'{size}.pdf'),
+                                    original_name=f'{size}.pdf', word_count=size, word_store=key,
+                                    page_boundaries=json.dumps(page_boundaries(size)), is_complete=True)
+                db.session.add(document)
+                db.session.commit()
+                document_ids[size] = document.id
+        
+        client = app.test_client()
+        client.post('/login', data={'email': 'stream@example.invalid', 'password': PASSWORD})
+        yield app, client, document_ids
+    finally:
+        for name, value in saved.items():
+            setattr(Config, name, value)
+
+
+def fetch(app, client, path, stream):
+    app.config['WORDS_STREAM_MIN_BYTES'] = 0 if stream else float('inf')
+    response = client.get(path)
+    assert response.status_code == 200
+    return response.get_data()
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_streamed_body_matches_buffered(served, size):
+    app, client, document_ids = served
+    path = f'/api/words/{document_ids[size]}'
+    buffered = fetch(app, client, path, stream=False)
+    streamed = fetch(app, client, path, stream=True)
+    assert streamed == buffered
+    payload = json.loads(streamed)
+    assert payload['words'] == synthetic_words(size)
+    assert payload['total'] == size
+
+
+def test_streamed_peak_memory_stays_flat(served):
+    app, client, document_ids = served
+    peaks = {}
+    for size in SIZES:
+        path = f'/api/words/{document_ids[size]}'
+        client.get(path).close()  # Warm the decoded page boundary cache
+        app.config['WORDS_STREAM_MIN_BYTES'] = 0
+        response_size, _, peaks[size] = consume(client, path)
+        assert response_size > MAX_STREAMED_PEAK or size == SIZES[0]
+    
+    assert max(peaks.values()) < MAX_STREAMED_PEAK
+    # Ten times the words must not mean ten times the memory
+    assert peaks[SIZES[-1]] < 2 * peaks[SIZES[0]] + 256 * 1024
+    
+    app.config['WORDS_STREAM_MIN_BYTES'] = float('inf')
+    buffered_size, _, buffered_peak = consume(client, f'/api/words/{document_ids[SIZES[-1]]}')
+    assert buffered_peak > buffered_size > peaks[SIZES[-1]]